@@ -18,6 +18,11 @@ from backend.blueprints.reviews import reviews_bp
 
 # Import scheduler
 from backend.scheduler import init_scheduler
+from backend.utils.view_counter import init_view_counter
+from backend.utils.translations import init_translations
+from backend.utils.pubsub import init_pubsub
+from backend.utils.instrumentation import init_instrumentation
+from backend.utils.prometheus import init_prometheus
 
 mail = Mail()
 
@@ -45,6 +50,21 @@ def createApp():
     # Initialize caches
     init_products_cache(app)
     
+    # Initialize buffered product view counter (flushed by the scheduler)
+    init_view_counter(app)
+    
+    # Load and precompile translation bundles
+    init_translations(app)
+    
+    # Initialize pub/sub for live updates (auction streams)
+    init_pubsub(app)
+    
+    # Count queries and time requests per endpoint
+    init_instrumentation(app)
+    
+    # Expose request, pool, cache, job, notification and bid metrics at /metrics
+    init_prometheus(app)
+    
     # Initialize auth blueprint with app and datastore
     init_auth_blueprint(app, datastore)
     
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, make_response, current_app as app
 from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime
+from backend.utils.rollups import metric_counters, daily_trends, DISPUTE_STATUSES, DAILY_METRICS
+from backend.utils.instrumentation import endpoint_stats, reset_stats
 import json
 
 admin_bp = Blueprint('admin', __name__)
@@ -140,18 +142,15 @@ def admin_dispute_stats():
     if not any(role.name == 'Admin' for role in current_user.roles):
         return jsonify({'error': 'Admin access required'}), 403
     
-    # Get counts by status
-    status_counts = {}
-    for status in ['open', 'in_progress', 'resolved', 'closed']:
-        status_counts[status] = Dispute.query.filter_by(status=status).count()
+    # Get counts by status from the maintained counters
+    counters = metric_counters()
+    status_counts = {status: counters.get(f'disputes.{status}', 0) for status in DISPUTE_STATUSES}
     
     # Get recent disputes
     recent_disputes = Dispute.query.order_by(Dispute.created_at.desc()).limit(5).all()
     
-    # Get disputes by date (for chart data)
-    from datetime import datetime, timedelta
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_disputes_count = Dispute.query.filter(Dispute.created_at >= thirty_days_ago).count()
+    # Disputes opened in the last 30 days, from the daily buckets
+    recent_disputes_count = sum(daily_trends(['disputes'], days=30)['series']['disputes'])
     
     return jsonify({
         'status_counts': status_counts,
@@ -173,18 +172,13 @@ def admin_dashboard():
     if not any(role.name == 'Admin' for role in current_user.roles):
         return jsonify({'error': 'Admin access required'}), 403
     
-    # Get user statistics
-    total_users = User.query.count()
-    active_users = User.query.filter_by(active=True).count()
-    
-    # Get product statistics
-    total_products = Product.query.count()
-    active_products = Product.query.filter_by(is_active=True, is_sold=False).count()
-    
-    # Get dispute statistics
-    status_counts = {}
-    for status in ['open', 'in_progress', 'resolved', 'closed']:
-        status_counts[status] = Dispute.query.filter_by(status=status).count()
+    # User, product and dispute statistics from the maintained counters
+    counters = metric_counters()
+    total_users = counters.get('users.total', 0)
+    active_users = counters.get('users.active', 0)
+    total_products = counters.get('products.total', 0)
+    active_products = counters.get('products.active', 0)
+    status_counts = {status: counters.get(f'disputes.{status}', 0) for status in DISPUTE_STATUSES}
     
     # Get recent activity
     recent_users = User.query.order_by(User.id.desc()).limit(5).all()
@@ -214,6 +208,43 @@ def admin_dashboard():
         } for product in recent_products]
     }), 200
 
+@admin_bp.route('/api/admin/metrics/trends', methods=['GET'])
+@auth_required()
+def admin_metric_trends():
+    """Daily signups, listings, sales and disputes for trend charts (e.g. ?days=90&metric=sales)"""
+    # Check if user is admin
+    if not any(role.name == 'Admin' for role in current_user.roles):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    days = request.args.get('days', 30, type=int)
+    metrics = request.args.getlist('metric') or list(DAILY_METRICS)
+    unknown = [metric for metric in metrics if metric not in DAILY_METRICS]
+    if unknown:
+        return jsonify({'error': f'Unknown metric. Must be one of: {list(DAILY_METRICS)}'}), 400
+    
+    return jsonify(daily_trends(metrics, days)), 200
+
+@admin_bp.route('/api/admin/instrumentation', methods=['GET'])
+@auth_required()
+def admin_instrumentation():
+    """Per-endpoint request, latency and query count histograms of this worker process"""
+    # Check if user is admin
+    if not any(role.name == 'Admin' for role in current_user.roles):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    return jsonify({'endpoints': endpoint_stats()}), 200
+
+@admin_bp.route('/api/admin/instrumentation', methods=['DELETE'])
+@auth_required()
+def admin_reset_instrumentation():
+    """Clear the recorded histograms, e.g. before measuring a change"""
+    # Check if user is admin
+    if not any(role.name == 'Admin' for role in current_user.roles):
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    reset_stats()
+    return jsonify({'message': 'Instrumentation reset'}), 200
+
 @admin_bp.route('/api/admin/users', methods=['GET'])
 @auth_required()
 def admin_get_users():
@@ -3,6 +3,9 @@ from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime
 from sqlalchemy import or_, and_
+from backend.utils.product_cache import invalidate_products
+from backend.utils.dashboard import invalidate_dashboards
+from backend.utils.serializers import serialize_purchases, serialize_sales
 import json
 
 cart_bp = Blueprint('cart', __name__)
@@ -153,10 +156,15 @@ def checkout():
         
         db.session.add(purchase)
     
+    sold_product_ids = [item.product_id for item in cart_items]
+    seller_ids = {item.product.seller_id for item in cart_items}
+    
     # Clear cart
     CartItem.query.filter_by(user_id=current_user.id).delete()
     
     db.session.commit()
+    invalidate_products(*sold_product_ids)
+    invalidate_dashboards(current_user.id, *seller_ids)
     
     return jsonify({
         'message': 'Purchase completed successfully',
@@ -175,19 +183,7 @@ def get_purchases():
     )
     
     return jsonify({
-        'purchases': [{
-            'id': purchase.id,
-            'product': {
-                'id': purchase.product_id,
-                'title': Product.query.get(purchase.product_id).title,
-                'images': json.loads(Product.query.get(purchase.product_id).images) if Product.query.get(purchase.product_id).images else []
-            },
-            'seller': User.query.get(purchase.seller_id).username,
-            'amount': purchase.amount,
-            'status': purchase.status,
-            'delivery_address': purchase.delivery_address,
-            'purchase_date': purchase.purchase_date.isoformat()
-        } for purchase in purchases.items],
+        'purchases': serialize_purchases(purchases.items),
         'total': purchases.total,
         'pages': purchases.pages,
         'current_page': page
@@ -204,18 +200,7 @@ def get_sales():
     )
     
     return jsonify({
-        'sales': [{
-            'id': sale.id,
-            'product': {
-                'id': sale.product_id,
-                'title': Product.query.get(sale.product_id).title
-            },
-            'buyer': User.query.get(sale.buyer_id).username,
-            'amount': sale.amount,
-            'status': sale.status,
-            'delivery_address': sale.delivery_address,
-            'purchase_date': sale.purchase_date.isoformat()
-        } for sale in sales.items],
+        'sales': serialize_sales(sales.items),
         'total': sales.total,
         'pages': sales.pages,
         'current_page': page
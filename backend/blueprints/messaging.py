@@ -2,7 +2,12 @@ from flask import Blueprint, request, jsonify, make_response, current_app as app
 from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case
+from sqlalchemy.orm import aliased
+from backend.utils.unread import message_sent
+from backend.utils.conversations import record_message, read_conversation, chat_channel, serialize_message
+from backend.utils.pubsub import publish
+from backend.utils.sse import stream_subscription, sse_response, open_stream, rejected_response, StreamRejected, stream_token_user
 import json
 
 messaging_bp = Blueprint('messaging', __name__)
@@ -12,64 +17,56 @@ messaging_bp = Blueprint('messaging', __name__)
 @messaging_bp.route('/api/chats', methods=['GET'])
 @auth_required()
 def get_chats():
-    """Get all conversations for the current user."""
+    """Get the current user's conversations, most recently active first."""
+    page = request.args.get('page', 1, type=int)
+    per_page = min(request.args.get('per_page', 50, type=int), 100)
+
     try:
-        # Get unique conversations
-        sent_chats = db.session.query(Chat.receiver_id, Chat.product_id).filter_by(sender_id=current_user.id).distinct()
-        received_chats = db.session.query(Chat.sender_id, Chat.product_id).filter_by(receiver_id=current_user.id).distinct()
-        
-        conversations = []
-        processed_pairs = set()
-        
-        for chat in sent_chats.union(received_chats):
-            other_user_id = chat[0] if chat[0] != current_user.id else (chat[1] if chat[1] else 0)
-            product_id = chat[1]
-            
-            # Skip if we've already processed this conversation
-            pair_key = (min(current_user.id, other_user_id), max(current_user.id, other_user_id), product_id or 0)
-            if pair_key in processed_pairs:
-                continue
-            processed_pairs.add(pair_key)
-            
-            # Get last message
-            last_message = Chat.query.filter(
-                or_(
-                    and_(Chat.sender_id == current_user.id, Chat.receiver_id == other_user_id),
-                    and_(Chat.sender_id == other_user_id, Chat.receiver_id == current_user.id)
-                )
-            ).filter(or_(Chat.product_id == product_id, Chat.product_id == None)).order_by(Chat.created_at.desc()).first()
-            
-            if last_message:
-                other_user = User.query.get(other_user_id)
-                product = Product.query.get(product_id) if product_id else None
-                
-                if other_user:
-                    conversations.append({
-                        'other_user': {
-                            'id': other_user.id,
-                            'username': other_user.username,
-                            'first_name': other_user.user_detail.first_name if other_user.user_detail else None
-                        },
-                        'product': {
-                            'id': product.id,
-                            'title': product.title,
-                            'price': product.price,
-                            'images': json.loads(product.images) if product.images else []
-                        } if product else None,
-                        'last_message': {
-                            'message': last_message.message,
-                            'created_at': last_message.created_at.isoformat(),
-                            'is_from_me': last_message.sender_id == current_user.id
-                        },
-                        'unread_count': Chat.query.filter_by(
-                            sender_id=other_user_id,
-                            receiver_id=current_user.id,
-                            product_id=product_id,
-                            is_read=False
-                        ).count()
-                    })
-        
-        return jsonify({'conversations': conversations}), 200
+        # One query over the conversation table: peer, product and last message are joined in
+        is_a = Conversation.user_a_id == current_user.id
+        peer_id = case((is_a, Conversation.user_b_id), else_=Conversation.user_a_id)
+        unread = case((is_a, Conversation.unread_a), else_=Conversation.unread_b)
+        Peer = aliased(User)
+
+        rows = db.session.query(
+            Peer.id, Peer.username, UserDetail.first_name,
+            Product.id, Product.title, Product.price, Product.images,
+            Chat.message, Chat.created_at, Chat.sender_id, unread
+        ).select_from(Conversation)\
+            .join(Peer, Peer.id == peer_id)\
+            .outerjoin(UserDetail, UserDetail.user_id == Peer.id)\
+            .outerjoin(Product, Product.id == Conversation.product_id)\
+            .outerjoin(Chat, Chat.id == Conversation.last_message_id)\
+            .filter(or_(Conversation.user_a_id == current_user.id, Conversation.user_b_id == current_user.id))\
+            .order_by(Conversation.last_activity_at.desc(), Conversation.id.desc())\
+            .offset((max(page, 1) - 1) * per_page).limit(per_page + 1).all()
+
+        conversations = [{
+            'other_user': {
+                'id': other_id,
+                'username': username,
+                'first_name': first_name
+            },
+            'product': {
+                'id': product_id,
+                'title': title,
+                'price': price,
+                'images': json.loads(images) if images else []
+            } if product_id else None,
+            'last_message': {
+                'message': message,
+                'created_at': created_at.isoformat(),
+                'is_from_me': sender_id == current_user.id
+            },
+            'unread_count': unread_count
+        } for (other_id, username, first_name, product_id, title, price, images,
+               message, created_at, sender_id, unread_count) in rows[:per_page]]
+
+        return jsonify({
+            'conversations': conversations,
+            'page': page,
+            'has_more': len(rows) > per_page
+        }), 200
     except Exception as e:
         print(f"Error getting chats: {e}")
         return jsonify({'error': 'Failed to fetch conversations'}), 500
@@ -77,10 +74,19 @@ def get_chats():
 @messaging_bp.route('/api/chats/<int:other_user_id>', methods=['GET'])
 @auth_required()
 def get_chat_messages(other_user_id):
-    """Get messages between current user and another user for a specific product."""
+    """
+    Get messages between current user and another user for a specific product.
+
+    Without a cursor the newest page is returned. ``before_id`` pages back
+    through older messages and ``after_id`` returns only messages newer than the
+    last one the client has. Messages are always returned oldest first.
+    """
+    product_id = request.args.get('product_id', type=int)
+    before_id = request.args.get('before_id', type=int)
+    after_id = request.args.get('after_id', type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+
     try:
-        product_id = request.args.get('product_id', type=int)
-        
         query = Chat.query.filter(
             or_(
                 and_(Chat.sender_id == current_user.id, Chat.receiver_id == other_user_id),
@@ -93,16 +99,24 @@ def get_chat_messages(other_user_id):
         else:
             query = query.filter(Chat.product_id.is_(None))
         
-        messages = query.order_by(Chat.created_at).all()
+        # Fetch one extra row to tell whether another page follows
+        if after_id:
+            messages = query.filter(Chat.id > after_id)\
+                .order_by(Chat.created_at, Chat.id).limit(limit + 1).all()
+            has_more = len(messages) > limit
+            messages = messages[:limit]
+        else:
+            if before_id:
+                query = query.filter(Chat.id < before_id)
+            messages = query.order_by(Chat.created_at.desc(), Chat.id.desc()).limit(limit + 1).all()
+            has_more = len(messages) > limit
+            messages = messages[:limit][::-1]
         
-        # Mark messages as read
-        Chat.query.filter_by(
-            sender_id=other_user_id,
-            receiver_id=current_user.id,
-            product_id=product_id,
-            is_read=False
-        ).update({'is_read': True})
+        # Mark messages as read (no write when nothing is unread)
+        marked = read_conversation(current_user.id, other_user_id, product_id)
         db.session.commit()
+        if marked:
+            publish_read_receipt(other_user_id, product_id, None)
         
         return jsonify({
             'messages': [{
@@ -110,7 +124,8 @@ def get_chat_messages(other_user_id):
                 'message': msg.message,
                 'is_from_me': msg.sender_id == current_user.id,
                 'created_at': msg.created_at.isoformat()
-            } for msg in messages]
+            } for msg in messages],
+            'has_more': has_more
         }), 200
     except Exception as e:
         print(f"Error getting chat messages: {e}")
@@ -137,12 +152,99 @@ def send_message():
         )
         
         db.session.add(message)
+        db.session.flush()
+        record_message(message)
+        message_sent(message.receiver_id)
         db.session.commit()
         
+        # Deliver to the receiver and to the sender's other open clients
+        event = {'type': 'message', 'message': serialize_message(message)}
+        publish(chat_channel(message.receiver_id), event)
+        publish(chat_channel(current_user.id), event)
+        
         return jsonify({
             'message': 'Message sent successfully',
             'message_id': message.id
         }), 201
     except Exception as e:
         print(f"Error sending message: {e}")
-        return jsonify({'error': 'Failed to send message'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to send message'}), 500
+
+def publish_read_receipt(peer_id, product_id, last_read_id):
+    """Tell a peer the current user has read their messages in a thread (up to last_read_id, or all if None)."""
+    publish(chat_channel(peer_id), {
+        'type': 'read',
+        'user_id': current_user.id,
+        'product_id': product_id,
+        'last_read_id': last_read_id
+    })
+
+@messaging_bp.route('/api/chats/stream', methods=['GET'])
+def stream_chats():
+    """
+    Server-Sent Events stream of the user's chat events: new messages, typing and read receipts.
+    
+    EventSource can't send headers, so clients authenticate with a stream_token
+    query parameter from POST /api/stream-token. Events are not replayed; after
+    a reconnect clients catch up with GET /api/chats/<id>?after_id=<last id>.
+    """
+    user = stream_token_user(request.args.get('stream_token'), 'chats')
+    if user is None:
+        return jsonify({'error': 'Invalid or expired stream token'}), 401
+    
+    try:
+        subscription = open_stream(chat_channel(user.id), user.id)
+    except StreamRejected as e:
+        return rejected_response(e)
+    # Don't hold a pooled connection for the life of the stream
+    db.session.close()
+    return sse_response(stream_subscription(subscription), subscription)
+
+@messaging_bp.route('/api/chats/<int:other_user_id>/typing', methods=['POST'])
+@auth_required()
+def send_typing(other_user_id):
+    """Tell another user the current user is typing; nothing is stored."""
+    data = request.get_json(silent=True) or {}
+    publish(chat_channel(other_user_id), {
+        'type': 'typing',
+        'user_id': current_user.id,
+        'product_id': data.get('product_id')
+    })
+    return jsonify({'message': 'Typing sent'}), 200
+
+@messaging_bp.route('/api/chats/read', methods=['POST'])
+@auth_required()
+def mark_chats_read():
+    """
+    Acknowledge read messages of one or more threads in a single transaction.
+    
+    Clients collect what the user has seen and send it in one request, e.g.
+    {"reads": [{"user_id": 2, "product_id": 5, "last_read_id": 120}]}.
+    """
+    data = request.get_json(silent=True) or {}
+    reads = data.get('reads')
+    if not isinstance(reads, list) or not reads:
+        return jsonify({'error': 'reads must be a non-empty list'}), 400
+    
+    try:
+        receipts = []
+        for read in reads[:100]:
+            try:
+                peer_id = int(read['user_id'])
+                product_id = int(read['product_id']) if read.get('product_id') else None
+                last_read_id = int(read['last_read_id']) if read.get('last_read_id') else None
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Each read needs a user_id'}), 400
+            
+            if read_conversation(current_user.id, peer_id, product_id, last_read_id):
+                receipts.append((peer_id, product_id, last_read_id))
+        db.session.commit()
+        
+        for peer_id, product_id, last_read_id in receipts:
+            publish_read_receipt(peer_id, product_id, last_read_id)
+        
+        return jsonify({'marked_threads': len(receipts)}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error marking messages read: {e}")
+        return jsonify({'error': 'Failed to mark messages read'}), 500
@@ -2,7 +2,19 @@ from flask import Blueprint, request, jsonify, make_response, current_app as app
 from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime, timedelta
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, case
+from backend.utils.search import apply_search
+from backend.utils.pagination import keyset_page
+from backend.utils.listings import listing_card
+from backend.utils.conditional import conditional
+from backend.utils.translations import get_bundle as get_translation_bundle, namespaces as translation_namespaces
+from backend.utils.percolator import invalidate_index as invalidate_saved_search_index
+from backend.utils.notifications import notification_channel, serialize_notification, evaluate_price_alerts
+from backend.utils.unread import unread_counts, notifications_read
+from backend.utils.sse import (
+    format_event, stream_subscription, sse_response, open_stream, rejected_response, StreamRejected,
+    STREAM_NAMES, issue_stream_token, stream_token_user
+)
 import json
 
 # Add imports for caching
@@ -22,471 +34,39 @@ def init_cache(app_instance):
 
 misc_bp = Blueprint('misc', __name__)
 
+# Keyset (cursor) equivalents of the search sort options: (column, descending)
+SEARCH_KEYSET_SORTS = {
+    'price_low': (Product.price, False),
+    'price_high': (Product.price, True),
+    'newest': (Product.created_at, True),
+    'popular': (Product.views, True)
+}
+
 # ============= TRANSLATIONS =============
 
 @misc_bp.route('/api/translations', methods=['GET'])
 def get_translations():
-    """Return UI translations for the specified language"""
+    """Return UI translations for the specified language, optionally limited to some namespaces"""
     lang = request.args.get('lang', 'en')
+    namespace = request.args.get('namespace')
     
-    # Define translations for different languages
-    translations = {
-        'en': {
-            # Header and Navigation
-            'welcome': 'Welcome to EcoFinds',
-            'search_placeholder': 'Search for products...',
-            'categories': 'Categories',
-            'my_account': 'My Account',
-            'cart': 'Cart',
-            'messages': 'Messages',
-            'saved_items': 'Saved Items',
-            'dashboard': 'Dashboard',
-            'profile': 'Profile',
-            'logout': 'Logout',
-            'language': 'Language',
-            
-            # Common Actions
-            'save': 'Save',
-            'cancel': 'Cancel',
-            'delete': 'Delete',
-            'edit': 'Edit',
-            'view': 'View',
-            'close': 'Close',
-            'submit': 'Submit',
-            'update': 'Update',
-            
-            # Dashboard
-            'my_dashboard': 'My Dashboard',
-            'total_listings': 'Total Listings',
-            'active_listings': 'Active Listings',
-            'sold_items': 'Sold Items',
-            'total_purchases': 'Total Purchases',
-            'total_sales': 'Total Sales',
-            'unread_messages': 'Unread Messages',
-            'user_rating': 'User Rating',
-            'total_reviews': 'Total Reviews',
-            
-            # Product Related
-            'products': 'Products',
-            'add_product': 'Add Product',
-            'my_listings': 'My Listings',
-            'browse_products': 'Browse Products',
-            'product_details': 'Product Details',
-            'price': 'Price',
-            'condition': 'Condition',
-            'location': 'Location',
-            'description': 'Description',
-            'seller': 'Seller',
-            'contact_seller': 'Contact Seller',
-            
-            # User Profile
-            'personal_information': 'Personal Information',
-            'full_name': 'Full Name',
-            'email': 'Email',
-            'date_of_birth': 'Date of Birth',
-            'gender': 'Gender',
-            'bio': 'Bio',
-            'joined': 'Joined',
-            'status': 'Status',
-            'active': 'Active',
-            'rating': 'Rating',
-            'no_bio_available': 'No bio available',
-            
-            # Reviews
-            'reviews': 'Reviews',
-            'leave_review': 'Leave Review',
-            'review_comment': 'Review Comment',
-            'submit_review': 'Submit Review',
-            
-            # Disputes
-            'disputes': 'Disputes',
-            'file_dispute': 'File Dispute',
-            'dispute_title': 'Dispute Title',
-            'dispute_description': 'Dispute Description',
-            'submit_dispute': 'Submit Dispute',
-            
-            # Notifications
-            'notifications': 'Notifications',
-            'mark_all_read': 'Mark All Read',
-            'unread_notifications': 'unread notifications',
-            'loading': 'Loading',
-            'no_notifications': 'No notifications',
-            'related_product': 'Related product',
-            'view_all_notifications': 'View all notifications',
-            'failed_mark_all_read': 'Failed to mark all notifications as read',
-            'days_ago': 'd ago',
-            'hours_ago': 'h ago',
-            'minutes_ago': 'm ago',
-            'just_now': 'Just now',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'No conversations yet',
-            'conversations_will_appear_here': 'Your conversations with other users will appear here.',
-            'general_conversation': 'General conversation',
-            'failed_load_conversations': 'Failed to load conversations. Please try again.',
-            
-            # Saved Searches
-            'saved_searches': 'Saved Searches',
-            'save_search': 'Save Search',
-            
-            # Price Alerts
-            'price_alerts': 'Price Alerts',
-            'create_alert': 'Create Alert',
-            'target_price': 'Target Price',
-            
-            # Authentication
-            'login': 'Login',
-            'signup': 'Sign Up',
-            'forgot_password': 'Forgot Password',
-            'reset_password': 'Reset Password',
-            'verify_email': 'Verify Email',
-            'verify_phone': 'Verify Phone',
-            'i_accept_terms': 'I accept the',
-            'terms_and_conditions': 'Terms and Conditions',
-            
-            # Form Labels
-            'username': 'Username',
-            'password': 'Password',
-            'confirm_password': 'Confirm Password',
-            'first_name': 'First Name',
-            'last_name': 'Last Name',
-            'phone_number': 'Phone Number',
-            'address': 'Address',
-            
-            # Status Labels
-            'open': 'Open',
-            'in_progress': 'In Progress',
-            'resolved': 'Resolved',
-            'closed': 'Closed',
-            
-            # Home Page
-            'why_use_ecofinds': 'Why Use EcoFinds?',
-            'eco_friendly_focus': 'Eco-Friendly Focus',
-            'eco_friendly_description': 'We list only verified sustainable and eco-conscious businesses.',
-            'local_discovery': 'Local Discovery',
-            'local_discovery_description': 'Find green shops, cafes, and services in your neighborhood.',
-            'support_good_causes': 'Support Good Causes',
-            'support_good_causes_description': 'Your purchases make a difference for the planet and people.',
-            'ready_to_make_difference': 'Ready to Make a Difference?',
-            'join_eco_conscious_shoppers': 'Join thousands of eco-conscious shoppers today.',
-            'about_ecofinds': 'About EcoFinds',
-            'mission_statement': "We're on a mission to connect eco-conscious consumers with sustainable businesses worldwide.",
-            'all_rights_reserved': 'All rights reserved.',
-            
-            # NavBar
-            'home': 'Home',
-            'browse': 'Browse',
-            'about': 'About',
-            'users': 'Users',
-            'expand_sidebar': 'Expand Sidebar',
-            'collapse_sidebar': 'Collapse Sidebar',
-            'confirm_logout': 'Are you sure you want to logout?'
-        },
-        'hi': {
-            # Header and Navigation
-            'welcome': 'EcoFinds में आपका स्वागत है',
-            'search_placeholder': 'उत्पादों के लिए खोजें...',
-            'categories': 'श्रेणियाँ',
-            'my_account': 'मेरा खाता',
-            'cart': 'गाड़ी',
-            'messages': 'संदेश',
-            'saved_items': 'सहेजे गए आइटम',
-            'dashboard': 'डैशबोर्ड',
-            'profile': 'प्रोफ़ाइल',
-            'logout': 'लॉग आउट',
-            'language': 'भाषा',
-            
-            # Common Actions
-            'save': 'सहेजें',
-            'cancel': 'रद्द करें',
-            'delete': 'हटाएँ',
-            'edit': 'संपादित करें',
-            'view': 'देखें',
-            'close': 'बंद करें',
-            'submit': 'जमा करें',
-            'update': 'अपडेट करें',
-            
-            # Dashboard
-            'my_dashboard': 'मेरा डैशबोर्ड',
-            'total_listings': 'कुल लिस्टिंग',
-            'active_listings': 'सक्रिय लिस्टिंग',
-            'sold_items': 'बेचे गए आइटम',
-            'total_purchases': 'कुल खरीदारी',
-            'total_sales': 'कुल बिक्री',
-            'unread_messages': 'अपठित संदेश',
-            'user_rating': 'उपयोगकर्ता रेटिंग',
-            'total_reviews': 'कुल समीक्षाएँ',
-            
-            # Product Related
-            'products': 'उत्पाद',
-            'add_product': 'उत्पाद जोड़ें',
-            'my_listings': 'मेरी लिस्टिंग',
-            'browse_products': 'उत्पाद ब्राउज़ करें',
-            'product_details': 'उत्पाद विवरण',
-            'price': 'कीमत',
-            'condition': 'शर्त',
-            'location': 'स्थान',
-            'description': 'विवरण',
-            'seller': 'विक्रेता',
-            'contact_seller': 'विक्रेता से संपर्क करें',
-            
-            # User Profile
-            'personal_information': 'व्यक्तिगत जानकारी',
-            'full_name': 'पूरा नाम',
-            'email': 'ईमेल',
-            'date_of_birth': 'जन्म तिथि',
-            'gender': 'लिंग',
-            'bio': 'जैव',
-            'joined': 'शामिल हुए',
-            'status': 'स्थिति',
-            'active': 'सक्रिय',
-            'rating': 'रेटिंग',
-            'no_bio_available': 'कोई जैव उपलब्ध नहीं है',
-            
-            # Reviews
-            'reviews': 'समीक्षाएँ',
-            'leave_review': 'समीक्षा छोड़ें',
-            'review_comment': 'समीक्षा टिप्पणी',
-            'submit_review': 'समीक्षा जमा करें',
-            
-            # Disputes
-            'disputes': 'विवाद',
-            'file_dispute': 'विवाद दर्ज करें',
-            'dispute_title': 'विवाद शीर्षक',
-            'dispute_description': 'विवाद विवरण',
-            'submit_dispute': 'विवाद जमा करें',
-            
-            # Notifications
-            'notifications': 'अधिसूचनाएँ',
-            'mark_all_read': 'सभी को पढ़ा हुआ चिह्नित करें',
-            'unread_notifications': 'अपठित अधिसूचनाएँ',
-            'loading': 'लोड हो रहा है',
-            'no_notifications': 'कोई अधिसूचनाएँ नहीं',
-            'related_product': 'संबंधित उत्पाद',
-            'view_all_notifications': 'सभी अधिसूचनाएँ देखें',
-            'failed_mark_all_read': 'सभी अधिसूचनाओं को पढ़ा हुआ चिह्नित करने में विफल',
-            'days_ago': 'दिन पहले',
-            'hours_ago': 'घंटे पहले',
-            'minutes_ago': 'मिनट पहले',
-            'just_now': 'अभी',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'अभी तक कोई वार्तालाप नहीं',
-            'conversations_will_appear_here': 'अन्य उपयोगकर्ताओं के साथ आपके वार्तालाप यहाँ दिखाई देंगे।',
-            'general_conversation': 'सामान्य वार्तालाप',
-            'failed_load_conversations': 'वार्तालाप लोड करने में विफल। कृपया पुनः प्रयास करें।',
-            
-            # Saved Searches
-            'saved_searches': 'सहेजी गई खोजें',
-            'save_search': 'खोज सहेजें',
-            
-            # Price Alerts
-            'price_alerts': 'मूल्य अलर्ट',
-            'create_alert': 'अलर्ट बनाएँ',
-            'target_price': 'लक्ष्य मूल्य',
-            
-            # Authentication
-            'login': 'लॉगिन',
-            'signup': 'साइन अप',
-            'forgot_password': 'पासवर्ड भूल गए',
-            'reset_password': 'पासवर्ड रीसेट करें',
-            'verify_email': 'ईमेल सत्यापित करें',
-            'verify_phone': 'फ़ोन सत्यापित करें',
-            'i_accept_terms': 'मैं स्वीकार करता हूँ',
-            'terms_and_conditions': 'नियम और शर्तें',
-            
-            # Form Labels
-            'username': 'उपयोगकर्ता नाम',
-            'password': 'पासवर्ड',
-            'confirm_password': 'पासवर्ड की पुष्टि करें',
-            'first_name': 'पहला नाम',
-            'last_name': 'अंतिम नाम',
-            'phone_number': 'फ़ोन नंबर',
-            'address': 'पता',
-            
-            # Status Labels
-            'open': 'खुला',
-            'in_progress': 'प्रगति पर',
-            'resolved': 'हल किया गया',
-            'closed': 'बंद',
-            
-            # Home Page
-            'why_use_ecofinds': 'EcoFinds का उपयोग क्यों करें?',
-            'eco_friendly_focus': 'पर्यावरण अनुकूल ध्यान',
-            'eco_friendly_description': 'हम केवल सत्यापित स्थायी और पर्यावरण-सचेत व्यवसायों को सूचीबद्ध करते हैं।',
-            'local_discovery': 'स्थानीय खोज',
-            'local_discovery_description': 'अपने पड़ोस में हरे दुकानों, कैफे और सेवाओं को खोजें।',
-            'support_good_causes': 'अच्छे कारणों का समर्थन करें',
-            'support_good_causes_description': 'आपकी खरीदारी पृथ्वी और लोगों के लिए अंतर लाती है।',
-            'ready_to_make_difference': 'अंतर बनाने के लिए तैयार हैं?',
-            'join_eco_conscious_shoppers': 'हजारों पर्यावरण-सचेत खरीदारों के साथ जुड़ें।',
-            'about_ecofinds': 'EcoFinds के बारे में',
-            'mission_statement': "हम पर्यावरण-सचेत उपभोक्ताओं को स्थायी व्यवसायों से जोड़ने के लिए एक मिशन पर हैं।",
-            'all_rights_reserved': 'सर्वाधिकार सुरक्षित।',
-            
-            # NavBar
-            'home': 'होम',
-            'browse': 'ब्राउज़',
-            'about': 'बारे में',
-            'users': 'उपयोगकर्ता',
-            'expand_sidebar': 'साइडबार विस्तार करें',
-            'collapse_sidebar': 'साइडबार संक्षिप्त करें',
-            'confirm_logout': 'क्या आप लॉगआउट करना चाहते हैं?'
-        },
-        'gu': {
-            # Header and Navigation
-            'welcome': 'EcoFinds માં આપનું સ્વાગત છે',
-            'search_placeholder': 'ઉત્પાદનો માટે શોધો...',
-            'categories': 'શ્રેણીઓ',
-            'my_account': 'મારું એકાઉન્ટ',
-            'cart': 'કાર્ટ',
-            'messages': 'સંદેશા',
-            'saved_items': 'સાચવેલ વસ્તુઓ',
-            'dashboard': 'ડૅશબોર્ડ',
-            'profile': 'પ્રોફાઇલ',
-            'logout': 'લૉગઆઉટ',
-            'language': 'ભાષા',
-            
-            # Common Actions
-            'save': 'સાચવો',
-            'cancel': 'રદ કરો',
-            'delete': 'કાઢી મૂકો',
-            'edit': 'સંપાદિત કરો',
-            'view': 'જુઓ',
-            'close': 'બંધ કરો',
-            'submit': 'સબમિટ કરો',
-            'update': 'અપડેટ કરો',
-            
-            # Dashboard
-            'my_dashboard': 'મારું ડૅશબોર્ડ',
-            'total_listings': 'કુલ લિસ્ટિંગ્સ',
-            'active_listings': 'સક્રિય લિસ્ટિંગ્સ',
-            'sold_items': 'વેચાયેલ વસ્તુઓ',
-            'total_purchases': 'કુલ ખરીદીઓ',
-            'total_sales': 'કુલ વેચાણ',
-            'unread_messages': 'ન વાંચેલા સંદેશા',
-            'user_rating': 'વપરાશકર્તા રેટિંગ',
-            'total_reviews': 'કુલ સમીક્ષાઓ',
-            
-            # Product Related
-            'products': 'ઉત્પાદનો',
-            'add_product': 'ઉત્પાદન ઉમેરો',
-            'my_listings': 'મારી લિસ્ટિંગ્સ',
-            'browse_products': 'ઉત્પાદનો બ્રાઉઝ કરો',
-            'product_details': 'ઉત્પાદન વિગતો',
-            'price': 'કિંમત',
-            'condition': 'શરત',
-            'location': 'સ્થાન',
-            'description': 'વર્ણન',
-            'seller': 'વેચનાર',
-            'contact_seller': 'વેચનારનો સંપર્ક કરો',
-            
-            # User Profile
-            'personal_information': 'વ્યક્તિગત માહિતી',
-            'full_name': 'પૂરું નામ',
-            'email': 'ઇમેઇલ',
-            'date_of_birth': 'જન્મ તારીખ',
-            'gender': 'લિંગ',
-            'bio': 'બાયો',
-            'joined': 'જોડાયા',
-            'status': 'સ્થિતિ',
-            'active': 'સક્રિય',
-            'rating': 'રેટિંગ',
-            'no_bio_available': 'કોઈ બાયો ઉપલબ્ધ નથી',
-            
-            # Reviews
-            'reviews': 'સમીક્ષાઓ',
-            'leave_review': 'સમીક્ષા આપો',
-            'review_comment': 'સમીક્ષા ટિપ્પણી',
-            'submit_review': 'સમીક્ષા સબમિટ કરો',
-            
-            # Disputes
-            'disputes': 'વિવાદો',
-            'file_dispute': 'વિવાદ દાખલ કરો',
-            'dispute_title': 'વિવાદ શીર્ષક',
-            'dispute_description': 'વિવાદ વર્ણન',
-            'submit_dispute': 'વિવાદ સબમિટ કરો',
-            
-            # Notifications
-            'notifications': 'સૂચનાઓ',
-            'mark_all_read': 'બધાને વાંચેલ તરીકે ચિહ્નિત કરો',
-            'unread_notifications': 'ન વાંચેલી સૂચનાઓ',
-            'loading': 'લોડ થઈ રહ્યું છે',
-            'no_notifications': 'કોઈ સૂચનાઓ નથી',
-            'related_product': 'સંબંધિત ઉત્પાદન',
-            'view_all_notifications': 'બધી સૂચનાઓ જુઓ',
-            'failed_mark_all_read': 'બધી સૂચનાઓને વાંચેલ તરીકે ચિહ્નિત કરવામાં નિષ્ફળ',
-            'days_ago': 'દિવસ પહેલાં',
-            'hours_ago': 'કલાક પહેલાં',
-            'minutes_ago': 'મિનિટ પહેલાં',
-            'just_now': 'હમણાં',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'હજુ સુધી કોઈ વાતચીત નથી',
-            'conversations_will_appear_here': 'અન્ય વપરાશકર્તાઓ સાથેની તમારી વાતચીત અહીં દેખાશે.',
-            'general_conversation': 'સામાન્ય વાતચીત',
-            'failed_load_conversations': 'વાતચીત લોડ કરવામાં નિષ્ફળ. કૃપા કરીને ફરી પ્રયત્ન કરો.',
-            
-            # Saved Searches
-            'saved_searches': 'સાચવેલ શોધો',
-            'save_search': 'શોધ સાચવો',
-            
-            # Price Alerts
-            'price_alerts': 'કિંમત ચેતવણીઓ',
-            'create_alert': 'ચેતવણી બનાવો',
-            'target_price': 'લક્ષ્ય કિંમત',
-            
-            # Authentication
-            'login': 'લૉગિન',
-            'signup': 'સાઇન અપ',
-            'forgot_password': 'પાસવર્ડ ભૂલી ગયા',
-            'reset_password': 'પાસવર્ડ રીસેટ કરો',
-            'verify_email': 'ઇમેઇલ ચકાસો',
-            'verify_phone': 'ફોન ચકાસો',
-            'i_accept_terms': 'હું સ્વીકારું છું',
-            'terms_and_conditions': 'નિયમો અને શરતો',
-            
-            # Form Labels
-            'username': 'વપરાશકર્તા નામ',
-            'password': 'પાસવર્ડ',
-            'confirm_password': 'પાસવર્ડની પુષ્ટિ કરો',
-            'first_name': 'પ્રથમ નામ',
-            'last_name': 'છેલ્લું નામ',
-            'phone_number': 'ફોન નંબર',
-            'address': 'સરનામું',
-            
-            # Status Labels
-            'open': 'ખુલ્લું',
-            'in_progress': 'પ્રગતિ પર',
-            'resolved': 'ઉકેલાયેલ',
-            'closed': 'બંધ',
-            
-            # Home Page
-            'why_use_ecofinds': 'EcoFinds શા માટે વાપરવું?',
-            'eco_friendly_focus': 'પર્યાવરણ મૈત્રીપૂર્ણ ધ્યાન',
-            'eco_friendly_description': 'અમે ફક્ત ચકાસાયેલ ટકાઉ અને પર્યાવરણ-સચેત વ્યવસાયોની યાદી કરીએ છીએ.',
-            'local_discovery': 'સ્થાનિક શોધ',
-            'local_discovery_description': 'તમારી પડોશમાં લીલી દુકાનો, કેફે અને સેવાઓ શોધો.',
-            'support_good_causes': 'સારા કારણોને આધાર આપો',
-            'support_good_causes_description': 'તમારી ખરીદી પૃથ્વી અને લોકો માટે તફાવત લાવે છે.',
-            'ready_to_make_difference': 'તફાવત લાવવા માટે તૈયાર છો?',
-            'join_eco_conscious_shoppers': 'હજારો પર્યાવરણ-સચેત ખરીદદારો સાથે જોડાઓ.',
-            'about_ecofinds': 'EcoFinds વિશે',
-            'mission_statement': "અમે પર્યાવરણ-સચેત ગ્રાહકોને ટકાઉ વ્યવસાયો સાથે જોડવાનું મિશન પર છીએ.",
-            'all_rights_reserved': 'સર્વાધિકાર સુરક્ષિત.',
-            
-            # NavBar
-            'home': 'હોમ',
-            'browse': 'બ્રાઉઝ',
-            'about': 'વિશે',
-            'users': 'વપરાશકર્તાઓ',
-            'expand_sidebar': 'સાઇડબાર વિસ્તારો',
-            'collapse_sidebar': 'સાઇડબાર સંકુચિત કરો',
-            'confirm_logout': 'શું તમે લૉગઆઉટ કરવા માંગતા હોય?'
-        }
-    }
-    
-    return jsonify(translations.get(lang, translations['en'])), 200
+    try:
+        bundle = get_translation_bundle(lang, namespace)
+    except KeyError as e:
+        return jsonify({'error': f'Unknown namespace: {e.args[0]}. Available: {translation_namespaces(lang)}'}), 400
+    
+    # Bundles are serialized and gzipped once at startup
+    use_gzip = 'gzip' in request.accept_encodings
+    response = make_response(bundle.gzipped if use_gzip else bundle.body)
+    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # Each encoding is a different representation, so it needs its own strong validator
+    response.set_etag(f'{bundle.etag}-gzip' if use_gzip else bundle.etag)
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    
+    return response.make_conditional(request)
 
 # ============= SAVED ITEMS =============
 
@@ -584,6 +164,7 @@ def save_search():
     
     db.session.add(saved_search)
     db.session.commit()
+    invalidate_saved_search_index()
     
     return jsonify({'message': 'Search saved successfully'}), 201
 
@@ -594,6 +175,7 @@ def delete_saved_search(search_id):
     
     db.session.delete(saved_search)
     db.session.commit()
+    invalidate_saved_search_index()
     
     return jsonify({'message': 'Saved search deleted successfully'}), 200
 
@@ -723,18 +305,14 @@ def search_products():
     sort_by = request.args.get('sort_by', 'relevance')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    # Passing cursor (empty for the first page) switches to keyset pagination without a total count
+    cursor = request.args.get('cursor')
     
     products_query = Product.query.filter_by(is_active=True, is_sold=False)
     
     if query:
-        products_query = products_query.filter(
-            or_(
-                Product.title.contains(query),
-                Product.description.contains(query),
-                Product.brand.contains(query),
-                Product.model.contains(query)
-            )
-        )
+        # Full-text match, ranked by relevance when that is the requested sort
+        products_query = apply_search(products_query, query, rank=(sort_by == 'relevance'))
     
     if category_id:
         products_query = products_query.filter_by(category_id=category_id)
@@ -751,6 +329,9 @@ def search_products():
     if location:
         products_query = products_query.filter(Product.location.contains(location))
     
+    # Serve the results from the denormalized read model, loaded in the same query
+    products_query = products_query.options(db.joinedload(Product.listing))
+    
     # Apply sorting
     if sort_by == 'price_low':
         products_query = products_query.order_by(Product.price)
@@ -760,25 +341,38 @@ def search_products():
         products_query = products_query.order_by(Product.created_at.desc())
     elif sort_by == 'popular':
         products_query = products_query.order_by(Product.views.desc())
-    else:  # relevance
+    else:  # relevance (rank applied by the search above, newest first as tie-breaker)
         products_query = products_query.order_by(Product.created_at.desc())
     
-    products = products_query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        # Relevance rank can't be resumed from a cursor, so it pages newest first
+        column, descending = SEARCH_KEYSET_SORTS.get(sort_by, SEARCH_KEYSET_SORTS['newest'])
+        try:
+            items, next_cursor = keyset_page(
+                products_query, column, Product.id, sort_by,
+                descending=descending, cursor=cursor, limit=per_page
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        products = products_query.paginate(page=page, per_page=per_page, error_out=False)
+        items = products.items
     
-    return jsonify({
-        'products': [{
-            'id': p.id,
-            'title': p.title,
-            'price': p.price,
-            'condition': p.condition,
+    results = [dict(listing_card(p), **{
             'location': p.location,
-            'images': json.loads(p.images) if p.images else [],
-            'seller': p.seller.username,
-            'seller_rating': p.seller.rating,
-            'is_auction': p.is_auction,
             'current_bid': p.current_bid,
             'views': p.views
-        } for p in products.items],
+        }) for p in items]
+    
+    if cursor is not None:
+        return jsonify({
+            'products': results,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }), 200
+    
+    return jsonify({
+        'products': results,
         'total': products.total,
         'pages': products.pages,
         'current_page': page
@@ -850,522 +444,21 @@ def get_recommendations():
         
     return result
 
-# ============= DASHBOARD AND ANALYTICS =============
-
-@misc_bp.route('/api/dashboard', methods=['GET'])
-@auth_required()
-def get_dashboard():
-    # User's statistics
-    total_listings = Product.query.filter_by(seller_id=current_user.id).count()
-    active_listings = Product.query.filter_by(seller_id=current_user.id, is_active=True, is_sold=False).count()
-    sold_items = Product.query.filter_by(seller_id=current_user.id, is_sold=True).count()
-    total_purchases = Purchase.query.filter_by(buyer_id=current_user.id).count()
-    total_sales = Purchase.query.filter_by(seller_id=current_user.id).count()
-    unread_messages = Chat.query.filter_by(receiver_id=current_user.id, is_read=False).count()
-    
-    # Recent activity
-    recent_listings = Product.query.filter_by(seller_id=current_user.id).order_by(Product.created_at.desc()).limit(5).all()
-    recent_purchases = Purchase.query.filter_by(buyer_id=current_user.id).order_by(Purchase.purchase_date.desc()).limit(5).all()
-    recent_sales = Purchase.query.filter_by(seller_id=current_user.id).order_by(Purchase.purchase_date.desc()).limit(5).all()
-    
-    return jsonify({
-        'stats': {
-            'total_listings': total_listings,
-            'active_listings': active_listings,
-            'sold_items': sold_items,
-            'total_purchases': total_purchases,
-            'total_sales': total_sales,
-            'unread_messages': unread_messages,
-            'user_rating': current_user.rating,
-            'total_reviews': current_user.total_reviews
-        },
-        'recent_listings': [{
-            'id': p.id,
-            'title': p.title,
-            'price': p.price,
-            'views': p.views,
-            'is_sold': p.is_sold,
-            'created_at': p.created_at.isoformat()
-        } for p in recent_listings],
-        'recent_purchases': [{
-            'id': purchase.id,
-            'product_title': Product.query.get(purchase.product_id).title,
-            'amount': purchase.amount,
-            'purchase_date': purchase.purchase_date.isoformat()
-        } for purchase in recent_purchases],
-        'recent_sales': [{
-            'id': sale.id,
-            'product_title': Product.query.get(sale.product_id).title,
-            'amount': sale.amount,
-            'buyer': User.query.get(sale.buyer_id).username,
-            'purchase_date': sale.purchase_date.isoformat()
-        } for sale in recent_sales]
-    }), 200
-
-
-    
-    translations = {
-        'en': {
-            # Header and Navigation
-            'welcome': 'Welcome to EcoFinds',
-            'search_placeholder': 'Search for products...',
-            'categories': 'Categories',
-            'my_account': 'My Account',
-            'cart': 'Cart',
-            'messages': 'Messages',
-            'saved_items': 'Saved Items',
-            'dashboard': 'Dashboard',
-            'profile': 'Profile',
-            'logout': 'Logout',
-            'language': 'Language',
-            
-            # Common Actions
-            'save': 'Save',
-            'cancel': 'Cancel',
-            'delete': 'Delete',
-            'edit': 'Edit',
-            'view': 'View',
-            'close': 'Close',
-            'submit': 'Submit',
-            'update': 'Update',
-            
-            # Dashboard
-            'my_dashboard': 'My Dashboard',
-            'total_listings': 'Total Listings',
-            'active_listings': 'Active Listings',
-            'sold_items': 'Sold Items',
-            'total_purchases': 'Total Purchases',
-            'total_sales': 'Total Sales',
-            'unread_messages': 'Unread Messages',
-            'user_rating': 'User Rating',
-            'total_reviews': 'Total Reviews',
-            
-            # Product Related
-            'products': 'Products',
-            'add_product': 'Add Product',
-            'my_listings': 'My Listings',
-            'browse_products': 'Browse Products',
-            'product_details': 'Product Details',
-            'price': 'Price',
-            'condition': 'Condition',
-            'location': 'Location',
-            'description': 'Description',
-            'seller': 'Seller',
-            'contact_seller': 'Contact Seller',
-            
-            # User Profile
-            'personal_information': 'Personal Information',
-            'full_name': 'Full Name',
-            'email': 'Email',
-            'date_of_birth': 'Date of Birth',
-            'gender': 'Gender',
-            'bio': 'Bio',
-            'joined': 'Joined',
-            'status': 'Status',
-            'active': 'Active',
-            'rating': 'Rating',
-            'no_bio_available': 'No bio available',
-            
-            # Reviews
-            'reviews': 'Reviews',
-            'leave_review': 'Leave Review',
-            'review_comment': 'Review Comment',
-            'submit_review': 'Submit Review',
-            
-            # Disputes
-            'disputes': 'Disputes',
-            'file_dispute': 'File Dispute',
-            'dispute_title': 'Dispute Title',
-            'dispute_description': 'Dispute Description',
-            'submit_dispute': 'Submit Dispute',
-            
-            # Notifications
-            'notifications': 'Notifications',
-            'mark_all_read': 'Mark All Read',
-            'unread_notifications': 'unread notifications',
-            'loading': 'Loading',
-            'no_notifications': 'No notifications',
-            'related_product': 'Related product',
-            'view_all_notifications': 'View all notifications',
-            'failed_mark_all_read': 'Failed to mark all notifications as read',
-            'days_ago': 'd ago',
-            'hours_ago': 'h ago',
-            'minutes_ago': 'm ago',
-            'just_now': 'Just now',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'No conversations yet',
-            'conversations_will_appear_here': 'Your conversations with other users will appear here.',
-            'general_conversation': 'General conversation',
-            'failed_load_conversations': 'Failed to load conversations. Please try again.',
-            
-            # Saved Searches
-            'saved_searches': 'Saved Searches',
-            'save_search': 'Save Search',
-            
-            # Price Alerts
-            'price_alerts': 'Price Alerts',
-            'create_alert': 'Create Alert',
-            'target_price': 'Target Price',
-            
-            # Authentication
-            'login': 'Login',
-            'signup': 'Sign Up',
-            'forgot_password': 'Forgot Password',
-            'reset_password': 'Reset Password',
-            'verify_email': 'Verify Email',
-            'verify_phone': 'Verify Phone',
-            'i_accept_terms': 'I accept the',
-            'terms_and_conditions': 'Terms and Conditions',
-            
-            # Form Labels
-            'username': 'Username',
-            'password': 'Password',
-            'confirm_password': 'Confirm Password',
-            'first_name': 'First Name',
-            'last_name': 'Last Name',
-            'phone_number': 'Phone Number',
-            'address': 'Address',
-            
-            # Status Labels
-            'open': 'Open',
-            'in_progress': 'In Progress',
-            'resolved': 'Resolved',
-            'closed': 'Closed',
-            
-            # Home Page
-            'why_use_ecofinds': 'Why Use EcoFinds?',
-            'eco_friendly_focus': 'Eco-Friendly Focus',
-            'eco_friendly_description': 'We list only verified sustainable and eco-conscious businesses.',
-            'local_discovery': 'Local Discovery',
-            'local_discovery_description': 'Find green shops, cafes, and services in your neighborhood.',
-            'support_good_causes': 'Support Good Causes',
-            'support_good_causes_description': 'Your purchases make a difference for the planet and people.',
-            'ready_to_make_difference': 'Ready to Make a Difference?',
-            'join_eco_conscious_shoppers': 'Join thousands of eco-conscious shoppers today.',
-            'about_ecofinds': 'About EcoFinds',
-            'mission_statement': "We're on a mission to connect eco-conscious consumers with sustainable businesses worldwide.",
-            'all_rights_reserved': 'All rights reserved.',
-            
-            # NavBar
-            'home': 'Home',
-            'browse': 'Browse',
-            'about': 'About',
-            'users': 'Users',
-            'expand_sidebar': 'Expand Sidebar',
-            'collapse_sidebar': 'Collapse Sidebar',
-            'confirm_logout': 'Are you sure you want to logout?'
-        },
-        'hi': {
-            # Header and Navigation
-            'welcome': 'EcoFinds में आपका स्वागत है',
-            'search_placeholder': 'उत्पादों की खोज करें...',
-            'categories': 'श्रेणियाँ',
-            'my_account': 'मेरा खाता',
-            'cart': 'कार्ट',
-            'messages': 'संदेश',
-            'saved_items': 'सहेजी गई वस्तुएँ',
-            'dashboard': 'डैशबोर्ड',
-            'profile': 'प्रोफ़ाइल',
-            'logout': 'लॉग आउट',
-            'language': 'भाषा',
-            
-            # Common Actions
-            'save': 'सहेजें',
-            'cancel': 'रद्द करें',
-            'delete': 'हटाएँ',
-            'edit': 'संपादित करें',
-            'view': 'देखें',
-            'close': 'बंद करें',
-            'submit': 'जमा करें',
-            'update': 'अपडेट करें',
-            
-            # Dashboard
-            'my_dashboard': 'मेरा डैशबोर्ड',
-            'total_listings': 'कुल लिस्टिंग',
-            'active_listings': 'सक्रिय लिस्टिंग',
-            'sold_items': 'बेचे गए आइटम',
-            'total_purchases': 'कुल खरीदारी',
-            'total_sales': 'कुल बिक्री',
-            'unread_messages': 'अपठित संदेश',
-            'user_rating': 'उपयोगकर्ता रेटिंग',
-            'total_reviews': 'कुल समीक्षाएँ',
-            
-            # Product Related
-            'products': 'उत्पाद',
-            'add_product': 'उत्पाद जोड़ें',
-            'my_listings': 'मेरी लिस्टिंग',
-            'browse_products': 'उत्पाद ब्राउज़ करें',
-            'product_details': 'उत्पाद विवरण',
-            'price': 'मूल्य',
-            'condition': 'शर्त',
-            'location': 'स्थान',
-            'description': 'विवरण',
-            'seller': 'विक्रेता',
-            'contact_seller': 'विक्रेता से संपर्क करें',
-            
-            # User Profile
-            'personal_information': 'व्यक्तिगत जानकारी',
-            'full_name': 'पूरा नाम',
-            'email': 'ईमेल',
-            'date_of_birth': 'जन्म तिथि',
-            'gender': 'लिंग',
-            'bio': 'जीवनी',
-            'joined': 'शामिल हुए',
-            'status': 'स्थिति',
-            'active': 'सक्रिय',
-            'rating': 'रेटिंग',
-            'no_bio_available': 'कोई जीवनी उपलब्ध नहीं है',
-            
-            # Reviews
-            'reviews': 'समीक्षाएँ',
-            'leave_review': 'समीक्षा छोड़ें',
-            'review_comment': 'समीक्षा टिप्पणी',
-            'submit_review': 'समीक्षा जमा करें',
-            
-            # Disputes
-            'disputes': 'विवाद',
-            'file_dispute': 'विवाद दर्ज करें',
-            'dispute_title': 'विवाद शीर्षक',
-            'dispute_description': 'विवाद विवरण',
-            'submit_dispute': 'विवाद जमा करें',
-            
-            # Notifications
-            'notifications': 'अधिसूचनाएँ',
-            'mark_all_read': 'सभी को पढ़ा हुआ चिह्नित करें',
-            'unread_notifications': 'अपठित अधिसूचनाएँ',
-            'loading': 'लोड हो रहा है',
-            'no_notifications': 'कोई अधिसूचनाएँ नहीं',
-            'related_product': 'संबंधित उत्पाद',
-            'view_all_notifications': 'सभी अधिसूचनाएँ देखें',
-            'failed_mark_all_read': 'सभी अधिसूचनाओं को पढ़ा हुआ चिह्नित करने में विफल',
-            'days_ago': 'दिन पहले',
-            'hours_ago': 'घंटे पहले',
-            'minutes_ago': 'मिनट पहले',
-            'just_now': 'अभी',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'अभी तक कोई वार्तालाप नहीं',
-            'conversations_will_appear_here': 'आपके अन्य उपयोगकर्ताओं के साथ वार्तालाप यहाँ दिखाई देंगे।',
-            'general_conversation': 'सामान्य वार्तालाप',
-            'failed_load_conversations': 'वार्तालाप लोड करने में विफल। कृपया पुनः प्रयास करें।',
-            
-            # Saved Searches
-            'saved_searches': 'सहेजी गई खोजें',
-            'save_search': 'खोज सहेजें',
-            
-            # Price Alerts
-            'price_alerts': 'मूल्य अलर्ट',
-            'create_alert': 'अलर्ट बनाएँ',
-            'target_price': 'लक्ष्य मूल्य',
-            
-            # Authentication
-            'login': 'लॉग इन करें',
-            'signup': 'साइन अप करें',
-            'forgot_password': 'पासवर्ड भूल गए',
-            'reset_password': 'पासवर्ड रीसेट करें',
-            'verify_email': 'ईमेल सत्यापित करें',
-            'verify_phone': 'फ़ोन सत्यापित करें',
-            'i_accept_terms': 'मैं स्वीकार करता हूँ',
-            'terms_and_conditions': 'नियम और शर्तें',
-            
-            # Form Labels
-            'username': 'उपयोगकर्ता नाम',
-            'password': 'पासवर्ड',
-            'confirm_password': 'पासवर्ड की पुष्टि करें',
-            'first_name': 'पहला नाम',
-            'last_name': 'अंतिम नाम',
-            'phone_number': 'फ़ोन नंबर',
-            'address': 'पता',
-            
-            # Status Labels
-            'open': 'खुला',
-            'in_progress': 'प्रगति पर है',
-            'resolved': 'हल किया गया',
-            'closed': 'बंद',
-            
-            # Home Page
-            'why_use_ecofinds': 'EcoFinds क्यों उपयोग करें?',
-            'eco_friendly_focus': 'पर्यावरण अनुकूल ध्यान',
-            'eco_friendly_description': 'हम केवल सत्यापित स्थायी और पर्यावरण जागरूक व्यवसायों की सूची बनाते हैं।',
-            'local_discovery': 'स्थानीय खोज',
-            'local_discovery_description': 'अपने पड़ोस में हरित दुकानें, कैफे और सेवाएं खोजें।',
-            'support_good_causes': 'अच्छे कारणों का समर्थन करें',
-            'support_good_causes_description': 'आपकी खरीदारी पृथ्वी और लोगों के लिए अंतर लाती है।',
-            'ready_to_make_difference': 'अंतर लाने के लिए तैयार हैं?',
-            'join_eco_conscious_shoppers': 'आज हजारों पर्यावरण जागरूक खरीदारों के साथ जुड़ें।',
-            'about_ecofinds': 'EcoFinds के बारे में',
-            'mission_statement': 'हम पर्यावरण जागरूक उपभोक्ताओं को विश्वव्यापी स्थायी व्यवसायों से जोड़ने के लिए प्रतिबद्ध हैं।',
-            'all_rights_reserved': 'सर्वाधिकार सुरक्षित।',
-            
-            # NavBar
-            'home': 'होम',
-            'browse': 'ब्राउज़ करें',
-            'about': 'हमारे बारे में',
-            'users': 'उपयोगकर्ता',
-            'expand_sidebar': 'साइडबार विस्तार करें',
-            'collapse_sidebar': 'साइडबार संक्षिप्त करें',
-            'confirm_logout': 'क्या आप वाकई लॉगआउट करना चाहते हैं?'
-        },
-        'gu': {
-            # Header and Navigation
-            'welcome': 'EcoFinds માં આપનું સ્વાગત છે',
-            'search_placeholder': 'ઉત્પાદનો માટે શોધો...',
-            'categories': 'શ્રેણીઓ',
-            'my_account': 'મારું એકાઉન્ટ',
-            'cart': 'કાર્ટ',
-            'messages': 'સંદેશા',
-            'saved_items': 'સાચવેલી વસ્તુઓ',
-            'dashboard': 'ડેશબોર્ડ',
-            'profile': 'પ્રોફાઇલ',
-            'logout': 'લૉગ આઉટ',
-            'language': 'ભાષા',
-            
-            # Common Actions
-            'save': 'સાચવો',
-            'cancel': 'રદ કરો',
-            'delete': 'કાઢી મૂકો',
-            'edit': 'સંપાદિત કરો',
-            'view': 'જુઓ',
-            'close': 'બંધ કરો',
-            'submit': 'સબમિટ કરો',
-            'update': 'અપડેટ કરો',
-            
-            # Dashboard
-            'my_dashboard': 'મારું ડેશબોર્ડ',
-            'total_listings': 'કુલ લિસ્ટિંગ',
-            'active_listings': 'સક્રિય લિસ્ટિંગ',
-            'sold_items': 'વેચાયેલ વસ્તુઓ',
-            'total_purchases': 'કુલ ખરીદીઓ',
-            'total_sales': 'કુલ વેચાણ',
-            'unread_messages': 'અપઠાયેલ સંદેશા',
-            'user_rating': 'વપરાશકર્તા રેટિંગ',
-            'total_reviews': 'કુલ સમીક્ષાઓ',
-            
-            # Product Related
-            'products': 'ઉત્પાદનો',
-            'add_product': 'ઉત્પાદન ઉમેરો',
-            'my_listings': 'મારી લિસ્ટિંગ',
-            'browse_products': 'ઉત્પાદનો બ્રાઉઝ કરો',
-            'product_details': 'ઉત્પાદન વિગતો',
-            'price': 'કિંમત',
-            'condition': 'શરત',
-            'location': 'સ્થાન',
-            'description': 'વર્ણન',
-            'seller': 'વિક્રેતા',
-            'contact_seller': 'વિક્રેતાનો સંપર્ક કરો',
-            
-            # User Profile
-            'personal_information': 'વ્યક્તિગત માહિતી',
-            'full_name': 'પૂરું નામ',
-            'email': 'ઇમેઇલ',
-            'date_of_birth': 'જન્મ તારીખ',
-            'gender': 'લિંગ',
-            'bio': 'બાયો',
-            'joined': 'જોડાયો',
-            'status': 'સ્થિતિ',
-            'active': 'સક્રિય',
-            'rating': 'રેટિંગ',
-            'no_bio_available': 'કોઈ બાયો ઉપલબ્ધ નથી',
-            
-            # Reviews
-            'reviews': 'સમીક્ષાઓ',
-            'leave_review': 'સમીક્ષા આપો',
-            'review_comment': 'સમીક્ષા ટિપ્પણી',
-            'submit_review': 'સમીક્ષા સબમિટ કરો',
-            
-            # Disputes
-            'disputes': 'વિવાદો',
-            'file_dispute': 'વિવાદ ફાઇલ કરો',
-            'dispute_title': 'વિવાદ શીર્ષક',
-            'dispute_description': 'વિવાદ વર્ણન',
-            'submit_dispute': 'વિવાદ સબમિટ કરો',
-            
-            # Notifications
-            'notifications': 'સૂચનો',
-            'mark_all_read': 'બધાને વાંચેલ તરીકે ચિહ્નિત કરો',
-            'unread_notifications': 'અપઠાયેલ સૂચનો',
-            'loading': 'લોડ થઈ રહ્યું છે',
-            'no_notifications': 'કોઈ સૂચનો નથી',
-            'related_product': 'સંબંધિત ઉત્પાદન',
-            'view_all_notifications': 'બધી સૂચનો જુઓ',
-            'failed_mark_all_read': 'બધી સૂચનોને વાંચેલ તરીકે ચિહ્નિત કરવામાં નિષ્ફળ',
-            'days_ago': 'દિવસ પહેલાં',
-            'hours_ago': 'કલાક પહેલાં',
-            'minutes_ago': 'મિનિટ પહેલાં',
-            'just_now': 'હમણાં',
-            
-            # Chats/Messages
-            'no_conversations_yet': 'હજુ સુધી કોઈ વાર્તાલાપ નથી',
-            'conversations_will_appear_here': 'તમારા અન્ય વપરાશકર્તાઓ સાથેના વાર્તાલાપ અહીં દેખાશે.',
-            'general_conversation': 'સામાન્ય વાર્તાલાપ',
-            'failed_load_conversations': 'વાર્તાલાપ લોડ કરવામાં નિષ્ફળ. કૃપા કરીને ફરી પ્રયત્ન કરો.',
-            
-            # Saved Searches
-            'saved_searches': 'સાચવેલી શોધો',
-            'save_search': 'શોધ સાચવો',
-            
-            # Price Alerts
-            'price_alerts': 'કિંમત ચેતવણીઓ',
-            'create_alert': 'ચેતવણી બનાવો',
-            'target_price': 'લક્ષ્ય કિંમત',
-            
-            # Authentication
-            'login': 'લૉગ ઇન કરો',
-            'signup': 'સાઇન અપ કરો',
-            'forgot_password': 'પાસવર્ડ ભૂલી ગયા',
-            'reset_password': 'પાસવર્ડ રીસેટ કરો',
-            'verify_email': 'ઇમેઇલ ચકાસો',
-            'verify_phone': 'ફોન ચકાસો',
-            'i_accept_terms': 'હું સ્વીકારું છું',
-            'terms_and_conditions': 'નિયમો અને શરતો',
-            
-            # Form Labels
-            'username': 'વપરાશકર્તા નામ',
-            'password': 'પાસવર્ડ',
-            'confirm_password': 'પાસવર્ડની પુષ્ટિ કરો',
-            'first_name': 'પ્રથમ નામ',
-            'last_name': 'છેલ્લું નામ',
-            'phone_number': 'ફોન નંબર',
-            'address': 'સરનામું',
-            
-            # Status Labels
-            'open': 'ખોલો',
-            'in_progress': 'પ્રગતિ પર છે',
-            'resolved': 'ઉકેલાયો',
-            'closed': 'બંધ',
-            
-            # Home Page
-            'why_use_ecofinds': 'EcoFinds શા માટે વાપરવું?',
-            'eco_friendly_focus': 'પર્યાવરણ મૈત્રીપૂર્ણ ધ્યાન',
-            'eco_friendly_description': 'અમે ફક્ત ચકાસાયેલ ટકાઉ અને પર્યાવરણ મૈત્રીપૂર્ણ વ્યવસાયોની યાદી કરીએ છીએ.',
-            'local_discovery': 'સ્થાનિક શોધ',
-            'local_discovery_description': 'તમારા પડોશમાં લીલી દુકાનો, કેફે અને સેવાઓ શોધો.',
-            'support_good_causes': 'સારા કારણોને આધાર આપો',
-            'support_good_causes_description': 'તમારી ખરીદી પૃથ્વી અને લોકો માટે તફાવત લાવે છે.',
-            'ready_to_make_difference': 'તફાવત લાવવા માટે તૈયાર છો?',
-            'join_eco_conscious_shoppers': 'આજે હજારો પર્યાવરણ મૈત્રીપૂર્ણ ખરીદદારો સાથે જોડાઓ.',
-            'about_ecofinds': 'EcoFinds વિશે',
-            'mission_statement': 'અમે પર્યાવરણ મૈત્રીપૂર્ણ ગ્રાહકોને વિશ્વવ્યાપી ટકાઉ વ્યવસાયો સાથે જોડવાનું મિશન ધરાવીએ છીએ.',
-            'all_rights_reserved': 'સર્વાધિકાર સુરક્ષિત',
-            
-            # NavBar
-            'home': 'હોમ',
-            'browse': 'બ્રાઉઝ કરો',
-            'about': 'અમારા વિશે',
-            'users': 'વપરાશકર્તાઓ',
-            'expand_sidebar': 'સાઇડબાર વિસ્તારો',
-            'collapse_sidebar': 'સાઇડબાર સંકુચિત કરો',
-            'confirm_logout': 'શું તમે ખરેખર લૉગઆઉટ કરવા માંગો છો?'
-        }
-    }
-    
-    return jsonify(translations.get(lang, translations['en'])), 200
-
 # ============= NOTIFICATIONS =============
 
+def notifications_version():
+    """Version of the current user's notifications: changes on new notifications and on reads."""
+    row = db.session.query(
+        func.count(Notification.id),
+        func.sum(case((Notification.is_read == True, 1), else_=0)),
+        func.max(Notification.id)
+    ).filter(Notification.user_id == current_user.id).first()
+    # Marking as read doesn't touch created_at, so only the ETag is reliable here
+    return (current_user.id,) + tuple(row), None
+
 @misc_bp.route('/api/notifications', methods=['GET'])
 @auth_required()
+@conditional(notifications_version, private=True)
 def get_notifications():
     """Get user's notifications with pagination and filtering options"""
     # Get query parameters for pagination and filtering
@@ -1387,28 +480,104 @@ def get_notifications():
     
     # Return notifications in JSON format
     return jsonify({
-        'notifications': [{
-            'id': n.id,
-            'title': n.title,
-            'message': n.message,
-            'is_read': n.is_read,
-            'related_product_id': n.related_product_id,
-            'created_at': n.created_at.isoformat()
-        } for n in notifications.items],
+        'notifications': [serialize_notification(n) for n in notifications.items],
         'total': notifications.total,
         'pages': notifications.pages,
         'current_page': page
     }), 200
 
+@misc_bp.route('/api/unread-counts', methods=['GET'])
+@auth_required()
+def get_unread_counts():
+    """Unread notification and message counts for badges, read from the maintained counters"""
+    return jsonify(unread_counts(current_user.id)), 200
+
+@misc_bp.route('/api/stream-token', methods=['POST'])
+@auth_required()
+def create_stream_token():
+    """Issue a short-lived token that opens one event stream, e.g. {"stream": "notifications"}"""
+    data = request.get_json(silent=True) or {}
+    stream = data.get('stream')
+    if stream not in STREAM_NAMES:
+        return jsonify({'error': f"stream must be one of: {', '.join(STREAM_NAMES)}"}), 400
+    
+    return jsonify({
+        'stream_token': issue_stream_token(current_user, stream),
+        'expires_in': app.config.get('STREAM_TOKEN_SECONDS', 60)
+    }), 201
+
+@misc_bp.route('/api/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Server-Sent Events stream of the user's new notifications.
+    
+    EventSource can't send headers, so clients authenticate with a stream_token
+    query parameter from POST /api/stream-token. Each event's id is the
+    notification ID; reconnects resume after the Last-Event-ID header (or
+    last_event_id parameter) so nothing is lost.
+    """
+    user = stream_token_user(request.args.get('stream_token'), 'notifications')
+    if user is None:
+        return jsonify({'error': 'Invalid or expired stream token'}), 401
+    user_id = user.id
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    
+    # Subscribe before reading so nothing created in between is missed
+    try:
+        subscription = open_stream(notification_channel(user_id), user_id)
+    except StreamRejected as e:
+        return rejected_response(e)
+    
+    flask_app = app._get_current_object()
+    position = {}
+    
+    def new_events(message=None):
+        # Runs inside the stream after the request has finished, so it needs its own context
+        events = []
+        with flask_app.app_context():
+            while True:
+                batch = Notification.query.filter(
+                    Notification.user_id == user_id,
+                    Notification.id > position['last_id']
+                ).order_by(Notification.id).limit(100).all()
+                for n in batch:
+                    events.append(format_event(json.dumps(serialize_notification(n)), event_id=n.id))
+                    position['last_id'] = n.id
+                if len(batch) < 100:
+                    break
+        return ''.join(events)
+    
+    try:
+        if last_event_id is None:
+            # New connection: the client already loaded its list, so start from the latest notification
+            last_event_id = db.session.query(func.max(Notification.id)).filter(Notification.user_id == user_id).scalar() or 0
+        position['last_id'] = last_event_id
+        # Don't hold a pooled connection for the life of the stream
+        db.session.close()
+        initial = new_events()
+    except Exception:
+        # Give the stream slot back if the stream never starts
+        subscription.close()
+        raise
+    
+    return sse_response(stream_subscription(subscription, initial=[initial], encode=new_events), subscription)
+
 @misc_bp.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
 @auth_required()
 def mark_notification_as_read(notification_id):
     """Mark a specific notification as read"""
-    # Find notification belonging to current user
-    notification = Notification.query.filter_by(id=notification_id, user_id=current_user.id).first_or_404()
-    
-    # Mark as read and save to database
-    notification.is_read = True
+    # Conditional UPDATE: of two concurrent requests only one marks the row, so the counter drops once
+    marked = Notification.query.filter_by(id=notification_id, user_id=current_user.id, is_read=False)\
+        .update({'is_read': True}, synchronize_session=False)
+    if marked == 1:
+        notifications_read(current_user.id, 1)
+    elif not db.session.query(Notification.query.filter_by(id=notification_id, user_id=current_user.id).exists()).scalar():
+        db.session.rollback()
+        return jsonify({'error': 'Notification not found'}), 404
     db.session.commit()
     
     return jsonify({'message': 'Notification marked as read'}), 200
@@ -1418,7 +587,8 @@ def mark_notification_as_read(notification_id):
 def mark_all_notifications_as_read():
     """Mark all of the user's unread notifications as read"""
     # Update all unread notifications for current user
-    Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
+    marked = Notification.query.filter_by(user_id=current_user.id, is_read=False).update({'is_read': True})
+    notifications_read(current_user.id, marked)
     db.session.commit()
     
     return jsonify({'message': 'All notifications marked as read'}), 200
@@ -1494,6 +664,10 @@ def create_price_alert():
     )
     
     db.session.add(price_alert)
+    db.session.flush()
+    
+    # A target at or above the current price is met already; trigger it now, not at the next sweep
+    evaluate_price_alerts(product)
     db.session.commit()
     
     return jsonify({
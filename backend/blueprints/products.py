@@ -2,7 +2,22 @@ from flask import Blueprint, request, jsonify, make_response, current_app as app
 from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime, timedelta
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, select
+from backend.utils.search import apply_search
+from backend.utils.pagination import keyset_page
+from backend.utils.facets import compute_facets, parse_price_bins, MAX_PRICE_BINS
+from backend.utils.listings import refresh_listing, listing_card
+from backend.utils.view_counter import record_view, pending_views
+from backend.utils.product_cache import get_product_detail, set_product_detail, invalidate_products, views_version
+from backend.utils.conditional import conditional
+from backend.utils import bidding
+from backend.utils.auctions import schedule_auction_close
+from backend.utils.notifications import build_notification, dispatch_notifications, evaluate_price_alerts
+from backend.utils.percolator import notify_saved_search_matches
+from backend.utils.pubsub import publish
+from backend.utils.sse import format_event, stream_subscription, sse_response, open_stream, rejected_response, StreamRejected
+from backend.utils.dashboard import invalidate_dashboards
+from backend.utils.prometheus import bid_placed
 import json
 
 # Add imports for caching
@@ -22,7 +37,57 @@ def init_cache(app_instance):
 
 products_bp = Blueprint('products', __name__)
 
+# Sort columns that can be served by keyset (cursor) pagination
+KEYSET_SORTS = {
+    'created_at': Product.created_at,
+    'price': Product.price,
+    'views': Product.views
+}
+
+# ============= CONDITIONAL GET VALIDATORS =============
+# View flushes, deletions and seller ratings change these versions without moving
+# updated_at, so they return no Last-Modified; clients revalidate with the ETag only
+
+def catalog_version():
+    """Version of the whole catalog: changes on any product edit, new listing, read model refresh or view flush."""
+    latest, count, refreshed = db.session.query(
+        func.max(Product.updated_at),
+        func.count(Product.id),
+        select(func.max(ProductListing.refreshed_at)).scalar_subquery()
+    ).first()
+    return (latest, count, refreshed, views_version()), None
+
+def product_version(product_id):
+    """Version of a product detail page: the product plus the seller data shown with it."""
+    row = db.session.query(Product.updated_at, Product.views, User.rating, User.total_reviews, UserDetail.updated_at)\
+        .join(User, User.id == Product.seller_id)\
+        .outerjoin(UserDetail, UserDetail.user_id == User.id)\
+        .filter(Product.id == product_id)\
+        .first()
+    if row is None:
+        return None, None
+    return tuple(row), None
+
+def categories_version():
+    """Version of the category tree (categories are only ever added)."""
+    return tuple(db.session.query(func.count(Category.id), func.max(Category.id)).first()), None
+
+def auction_version(auction_id):
+    """Version of an auction page: the product, its seller rating, its number of bids and whether it has ended."""
+    row = db.session.query(
+        Product.updated_at, Product.views, User.rating, Product.bid_count,
+        Product.auction_closed, Product.auction_end_time
+    ).join(User, User.id == Product.seller_id)\
+        .filter(Product.id == auction_id, Product.is_auction == True)\
+        .first()
+    if row is None:
+        return None, None
+    # The status turns to 'ended' when the end time passes, before anything is written
+    ended = row.auction_end_time is not None and datetime.utcnow() > row.auction_end_time
+    return tuple(row) + (ended,), None
+
 @products_bp.route('/api/products', methods=['GET'])
+@conditional(catalog_version)
 def get_products():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
@@ -34,6 +99,18 @@ def get_products():
     sort_by = request.args.get('sort_by', 'created_at')
     sort_order = request.args.get('sort_order', 'desc')
     is_auction = request.args.get('is_auction', type=bool)
+    # Passing cursor (empty for the first page) switches to keyset pagination without a total count
+    cursor = request.args.get('cursor')
+    # facets=true adds per-facet counts over the filtered set (price_bins="0,50,100" customises the histogram)
+    include_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        price_bins = parse_price_bins(request.args.get('price_bins'))
+    except ValueError:
+        return jsonify({'error': f'price_bins must be a comma separated list of at most {MAX_PRICE_BINS} finite numbers'}), 400
+    
+    if cursor is not None and sort_by not in KEYSET_SORTS:
+        return jsonify({'error': f'Cursor pagination supports sort_by: {list(KEYSET_SORTS)}'}), 400
     
     query = Product.query.filter_by(is_active=True, is_sold=False)
     
@@ -42,14 +119,8 @@ def get_products():
         query = query.filter_by(category_id=category_id)
     
     if search:
-        query = query.filter(
-            or_(
-                Product.title.contains(search),
-                Product.description.contains(search),
-                Product.brand.contains(search),
-                Product.model.contains(search)
-            )
-        )
+        # Full-text match; ranked by relevance only when sort_by=relevance
+        query = apply_search(query, search, rank=(sort_by == 'relevance'))
     
     if condition:
         query = query.filter_by(condition=condition)
@@ -63,33 +134,38 @@ def get_products():
     if is_auction is not None:
         query = query.filter_by(is_auction=is_auction)
     
+    # One grouped aggregation over the filtered set, before ordering and paging
+    facets = compute_facets(query, price_bins) if include_facets else None
+    
+    # Serve the grid from the denormalized read model, loaded in the same query
+    query = query.options(db.joinedload(Product.listing))
+    
     # Apply sorting
-    if sort_order == 'desc':
+    if sort_by == 'relevance':
+        # Relevance order was applied by the search; newest first otherwise / as tie-breaker
+        query = query.order_by(Product.created_at.desc())
+    elif sort_order == 'desc':
         query = query.order_by(getattr(Product, sort_by).desc())
     else:
         query = query.order_by(getattr(Product, sort_by))
     
-    products = query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        try:
+            items, next_cursor = keyset_page(
+                query, KEYSET_SORTS[sort_by], Product.id, sort_by,
+                descending=(sort_order == 'desc'), cursor=cursor, limit=per_page
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    else:
+        products = query.paginate(page=page, per_page=per_page, error_out=False)
+        items = products.items
     
-    # Optimize by joining related tables to avoid N+1 queries
     products_with_details = []
-    for p in products.items:
-        # Pre-fetch related data to avoid additional queries
-        category_name = p.category.name if p.category else None
-        seller_username = p.seller.username if p.seller else None
-        seller_rating = p.seller.rating if p.seller else None
-        
-        product_dict = {
-            'id': p.id,
-            'title': p.title,
+    for p in items:
+        product_dict = listing_card(p)
+        product_dict.update({
             'description': p.description,
-            'price': p.price,
-            'condition': p.condition,
-            'category': category_name,
-            'seller': seller_username,
-            'seller_rating': seller_rating,
-            'images': json.loads(p.images) if p.images else [],
-            'is_auction': p.is_auction,
             'current_bid': p.current_bid,
             'auction_end_time': p.auction_end_time.isoformat() if p.auction_end_time else None,
             'location': p.location,
@@ -97,63 +173,81 @@ def get_products():
             'model': p.model,
             'views': p.views,
             'created_at': p.created_at.isoformat()
-        }
+        })
         products_with_details.append(product_dict)
     
-    return jsonify({
-        'products': products_with_details,
-        'total': products.total,
-        'pages': products.pages,
-        'current_page': page
-    }), 200
+    if cursor is not None:
+        response = {
+            'products': products_with_details,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+    else:
+        response = {
+            'products': products_with_details,
+            'total': products.total,
+            'pages': products.pages,
+            'current_page': page
+        }
+    
+    if facets is not None:
+        response['facets'] = facets
+    
+    return jsonify(response), 200
 
+# Count the view in the buffered counter (written to the database in bulk later),
+# also when a revalidating client is answered with a 304
 @products_bp.route('/api/products/<int:product_id>', methods=['GET'])
+@conditional(product_version, before=record_view)
 def get_product(product_id):
-    # Optimize by joining related tables
-    product = db.session.query(Product)\
-        .options(db.joinedload(Product.category))\
-        .options(db.joinedload(Product.seller).joinedload(User.user_detail))\
-        .filter(Product.id == product_id)\
-        .first_or_404()
-    
-    # Increment view count
-    product.views += 1
-    db.session.commit()
-    
-    seller_detail = product.seller.user_detail
+    body = get_product_detail(product_id)
+    
+    if body is None:
+        # Optimize by joining related tables
+        product = db.session.query(Product)\
+            .options(db.joinedload(Product.category))\
+            .options(db.joinedload(Product.seller).joinedload(User.user_detail))\
+            .filter(Product.id == product_id)\
+            .first_or_404()
+        
+        seller_detail = product.seller.user_detail
+        
+        body = {
+            'id': product.id,
+            'title': product.title,
+            'description': product.description,
+            'price': product.price,
+            'condition': product.condition,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name
+            },
+            'seller': {
+                'id': product.seller.id,
+                'username': product.seller.username,
+                'rating': product.seller.rating,
+                'total_reviews': product.seller.total_reviews,
+                'first_name': seller_detail.first_name if seller_detail else None,
+                'last_name': seller_detail.last_name if seller_detail else None
+            },
+            'images': json.loads(product.images) if product.images else [],
+            'is_auction': product.is_auction,
+            'current_bid': product.current_bid,
+            'minimum_bid': product.minimum_bid,
+            'reserve_price': product.reserve_price,
+            'auction_end_time': product.auction_end_time.isoformat() if product.auction_end_time else None,
+            'location': product.location,
+            'brand': product.brand,
+            'model': product.model,
+            'material': product.material,
+            'views': product.views,
+            'is_sold': product.is_sold,
+            'created_at': product.created_at.isoformat()
+        }
+        set_product_detail(product_id, body)
     
-    return jsonify({
-        'id': product.id,
-        'title': product.title,
-        'description': product.description,
-        'price': product.price,
-        'condition': product.condition,
-        'category': {
-            'id': product.category.id,
-            'name': product.category.name
-        },
-        'seller': {
-            'id': product.seller.id,
-            'username': product.seller.username,
-            'rating': product.seller.rating,
-            'total_reviews': product.seller.total_reviews,
-            'first_name': seller_detail.first_name if seller_detail else None,
-            'last_name': seller_detail.last_name if seller_detail else None
-        },
-        'images': json.loads(product.images) if product.images else [],
-        'is_auction': product.is_auction,
-        'current_bid': product.current_bid,
-        'minimum_bid': product.minimum_bid,
-        'reserve_price': product.reserve_price,
-        'auction_end_time': product.auction_end_time.isoformat() if product.auction_end_time else None,
-        'location': product.location,
-        'brand': product.brand,
-        'model': product.model,
-        'material': product.material,
-        'views': product.views,
-        'is_sold': product.is_sold,
-        'created_at': product.created_at.isoformat()
-    }), 200
+    # Merge in views not yet flushed (the cache is invalidated when they are)
+    return jsonify(dict(body, views=body['views'] + pending_views(product_id))), 200
 
 @products_bp.route('/api/products', methods=['POST'])
 @auth_required()
@@ -194,7 +288,16 @@ def create_product():
         product.auction_end_time = datetime.utcnow() + timedelta(days=auction_duration)
     
     db.session.add(product)
+    refresh_listing(product)
+    
+    # Tell users whose saved searches match the new listing
+    notify_saved_search_matches(product)
     db.session.commit()
+    invalidate_dashboards(current_user.id)
+    
+    # Close the auction exactly when it ends
+    if product.is_auction:
+        schedule_auction_close(app._get_current_object(), product.id, product.auction_end_time)
     
     return jsonify({
         'message': 'Product created successfully',
@@ -216,6 +319,7 @@ def update_product(product_id):
         product.title = data['title']
     if 'description' in data:
         product.description = data['description']
+    price_changed = 'price' in data and data['price'] != product.price
     if 'price' in data:
         product.price = data['price']
     if 'condition' in data:
@@ -234,7 +338,18 @@ def update_product(product_id):
     if 'images' in data:
         product.images = json.dumps(data['images'])
     
+    refresh_listing(product)
+    
+    # Notify users whose price alert the new price satisfies, in the same transaction
+    if price_changed:
+        evaluate_price_alerts(product)
+    
+    # The edit may make the listing match saved searches it didn't match before
+    notify_saved_search_matches(product)
+    
     db.session.commit()
+    invalidate_products(product.id)
+    invalidate_dashboards(product.seller_id)
     
     return jsonify({'message': 'Product updated successfully'}), 200
 
@@ -248,6 +363,8 @@ def delete_product(product_id):
     
     product.is_active = False
     db.session.commit()
+    invalidate_products(product.id)
+    invalidate_dashboards(product.seller_id)
     
     return jsonify({'message': 'Product deleted successfully'}), 200
 
@@ -282,6 +399,7 @@ def get_my_products():
 # ============= CATEGORY MANAGEMENT =============
 
 @products_bp.route('/api/categories', methods=['GET'])
+@conditional(categories_version)
 def get_categories():
     categories = Category.query.filter_by(parent_id=None).all()
     
@@ -321,6 +439,7 @@ def create_category():
 # ============= AUCTION SYSTEM =============
 
 @products_bp.route('/api/auctions/<int:auction_id>', methods=['GET'])
+@conditional(auction_version)
 def get_auction(auction_id):
     """Get detailed auction information"""
     product = Product.query.filter_by(id=auction_id, is_auction=True).first_or_404()
@@ -351,7 +470,7 @@ def get_auction(auction_id):
         'minimum_bid': product.minimum_bid,
         'reserve_price': product.reserve_price,
         'current_highest_bid': product.current_bid if product.current_bid > 0 else None,
-        'bid_count': len(bids),
+        'bid_count': product.bid_count,
         'bids': [{
             'id': bid.id,
             'bidder': {
@@ -375,7 +494,7 @@ def get_auction(auction_id):
             'created_at': winning_bid.created_at.isoformat()
         } if winning_bid else None,
         'end_time': product.auction_end_time.isoformat() if product.auction_end_time else None,
-        'status': 'ended' if datetime.utcnow() > product.auction_end_time else 'active',
+        'status': 'ended' if product.auction_closed or datetime.utcnow() > product.auction_end_time else 'active',
         'seller': {
             'id': product.seller.id,
             'username': product.seller.username,
@@ -386,6 +505,47 @@ def get_auction(auction_id):
         }
     }), 200
 
+@products_bp.route('/api/auctions/<int:auction_id>/stream', methods=['GET'])
+def stream_auction(auction_id):
+    """Server-Sent Events stream of bids on an auction, starting with its current state"""
+    # Subscribe before reading the state so no bid can slip in between
+    try:
+        subscription = open_stream(bidding.auction_channel(auction_id), request.remote_addr)
+    except StreamRejected as e:
+        return rejected_response(e)
+    
+    row = db.session.query(
+        Product.current_bid, Product.bid_count, Product.auction_end_time, Product.is_sold,
+        Product.auction_closed, User.username
+    ).outerjoin(User, User.id == Product.highest_bidder_id)\
+        .filter(Product.id == auction_id, Product.is_auction == True)\
+        .first()
+    if row is None:
+        subscription.close()
+        return jsonify({'error': 'Auction not found'}), 404
+    
+    current_bid, bid_count, end_time, is_sold, closed, highest_bidder = row
+    # Don't hold a pooled connection for the life of the stream
+    db.session.close()
+    if is_sold:
+        status = 'sold'
+    elif closed or (end_time and datetime.utcnow() > end_time):
+        status = 'ended'
+    else:
+        status = 'active'
+    
+    snapshot = format_event(json.dumps({
+        'type': 'snapshot',
+        'auction_id': auction_id,
+        'current_highest_bid': current_bid if current_bid and current_bid > 0 else None,
+        'bidder': bidding.bidder_alias(highest_bidder) if highest_bidder else None,
+        'bid_count': bid_count,
+        'end_time': end_time.isoformat() if end_time else None,
+        'status': status
+    }))
+    
+    return sse_response(stream_subscription(subscription, initial=[snapshot]), subscription)
+
 @products_bp.route('/api/auctions/<int:auction_id>/confirm-sale', methods=['POST'])
 @auth_required()
 def confirm_auction_sale(auction_id):
@@ -415,7 +575,9 @@ def confirm_auction_sale(auction_id):
     product.is_sold = True
     
     # Create purchase record
-    winning_bid = Bid.query.filter_by(product_id=product.id, amount=product.current_bid).first()
+    winning_bid = Bid.query.filter_by(
+        product_id=product.id, bidder_id=product.highest_bidder_id, amount=product.current_bid
+    ).first()
     if winning_bid:
         purchase = Purchase(
             buyer_id=winning_bid.bidder_id,
@@ -446,6 +608,9 @@ def confirm_auction_sale(auction_id):
     db.session.add(seller_notification)
     
     db.session.commit()
+    invalidate_products(product.id)
+    invalidate_dashboards(product.seller_id, winning_bid.bidder_id if winning_bid else None)
+    publish(bidding.auction_channel(product.id), {'type': 'sold', 'auction_id': product.id})
     
     return jsonify({'message': 'Sale confirmed successfully'}), 200
 
@@ -453,72 +618,57 @@ def confirm_auction_sale(auction_id):
 @auth_required()
 def place_bid(product_id):
     """Place a bid on an auction item"""
-    product = Product.query.get_or_404(product_id)
-    data = request.get_json()
-    bid_amount = data.get('amount')
-    
-    # Validate that product is an auction
-    if not product.is_auction:
-        return jsonify({'error': 'Product is not an auction item'}), 400
-    
-    # Prevent seller from bidding on their own product
-    if product.seller_id == current_user.id:
-        return jsonify({'error': 'Cannot bid on your own product'}), 400
-    
-    # Check if auction has ended
-    if datetime.utcnow() > product.auction_end_time:
-        return jsonify({'error': 'Auction has ended'}), 400
-    
-    # Validate bid amount is higher than current bid and minimum bid
-    if bid_amount <= product.current_bid or bid_amount < product.minimum_bid:
-        return jsonify({'error': 'Bid amount must be higher than current bid and minimum bid'}), 400
-    
-    # Create new bid record
-    bid = Bid(
-        product_id=product_id,
-        bidder_id=current_user.id,
-        amount=bid_amount
-    )
-    
-    # Update product's current highest bid
-    product.current_bid = bid_amount
-    
-    db.session.add(bid)
+    data = request.get_json() or {}
     
-    # Send notification to seller if this is a new highest bid
-    if product.current_bid == bid_amount:
-        notification = Notification(
-            user_id=product.seller_id,
-            title="New bid on your auction",
-            message=f"Someone has placed a new bid of ${bid_amount} on your auction '{product.title}'.",
-            related_product_id=product.id,
-            related_bid_id=bid.id
-        )
-        db.session.add(notification)
-    
-    # Send notification to previous highest bidder if they've been outbid
-    previous_highest_bid = Bid.query.filter(
-        Bid.product_id == product_id,
-        Bid.amount < bid_amount,
-        Bid.bidder_id != current_user.id
-    ).order_by(Bid.amount.desc()).first()
-    
-    if previous_highest_bid:
-        outbid_notification = Notification(
-            user_id=previous_highest_bid.bidder_id,
+    try:
+        placed = bidding.place_bid(product_id, current_user.id, data.get('amount'))
+    except bidding.BidRejected as e:
+        bid_placed(False)
+        return jsonify({'error': str(e)}), 400
+    if placed is None:
+        return jsonify({'error': 'Product not found'}), 404
+    
+    bid = placed.bid
+    
+    # Notify the seller and the previous highest bidder in one insert
+    notifications = [build_notification(
+        'new_bid', placed.seller_id,
+        title="New bid on your auction",
+        message=f"Someone has placed a new bid of ${bid.amount} on your auction '{placed.title}'.",
+        related_product_id=product_id,
+        related_bid_id=bid.id,
+        ref=bid.id
+    )]
+    if placed.previous_bidder_id and placed.previous_bidder_id != current_user.id:
+        notifications.append(build_notification(
+            'outbid', placed.previous_bidder_id,
             title="You've been outbid",
-            message=f"Your bid on '{product.title}' has been outbid. The new highest bid is ${bid_amount}.",
-            related_product_id=product.id
-        )
-        db.session.add(outbid_notification)
+            message=f"Your bid on '{placed.title}' has been outbid. The new highest bid is ${bid.amount}.",
+            related_product_id=product_id,
+            ref=bid.id
+        ))
+    dispatch_notifications(notifications)
     
     db.session.commit()
+    bid_placed(True)
+    invalidate_products(product_id)
+    
+    # Push the new state to everyone watching the auction
+    publish(bidding.auction_channel(product_id), {
+        'type': 'bid',
+        'auction_id': product_id,
+        'amount': bid.amount,
+        'bidder': bidding.bidder_alias(current_user.username),
+        'bid_count': placed.bid_count,
+        'current_highest_bid': bid.amount,
+        'end_time': placed.end_time.isoformat() if placed.end_time else None
+    })
     
     # Return updated bid information
     return jsonify({
         'message': 'Bid placed successfully',
-        'amount': bid_amount,
-        'bid_count': len(product.bids)
+        'amount': bid.amount,
+        'bid_count': placed.bid_count
     }), 201
 
 @products_bp.route('/api/products/<int:product_id>/bids', methods=['GET'])
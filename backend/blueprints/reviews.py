@@ -3,6 +3,10 @@ from flask_security import auth_required, current_user
 from backend.models import *
 from datetime import datetime
 from sqlalchemy import or_, and_
+from backend.utils.listings import refresh_seller_listings
+from backend.utils.product_cache import invalidate_seller_products
+from backend.utils.ratings import review_added, review_removed, rating_distribution, STAR_VALUES
+from backend.utils.serializers import serialize_received_reviews, serialize_given_reviews
 import json
 
 reviews_bp = Blueprint('reviews', __name__)
@@ -45,10 +49,11 @@ def create_review():
     if existing_review:
         return jsonify({'error': 'Review already exists'}), 400
     
-    # Validate rating
+    # Validate rating; the star histogram only has whole stars
     rating = data.get('rating')
-    if not rating or rating < 1 or rating > 5:
-        return jsonify({'error': 'Rating must be between 1 and 5'}), 400
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or rating not in STAR_VALUES:
+        return jsonify({'error': 'Rating must be a whole number between 1 and 5'}), 400
+    rating = int(rating)
     
     review = Review(
         reviewer_id=current_user.id,
@@ -60,19 +65,17 @@ def create_review():
     
     db.session.add(review)
     
-    # Update user's average rating
-    reviewee = User.query.get(data['reviewee_id'])
+    # Update user's average rating from the running totals
+    reviewee = review_added(review)
     if reviewee:
-        reviews = Review.query.filter_by(reviewee_id=data['reviewee_id']).all()
-        if reviews:
-            reviewee.rating = sum(r.rating for r in reviews) / len(reviews)
-            reviewee.total_reviews = len(reviews)
-        else:
-            reviewee.rating = 0.0
-            reviewee.total_reviews = 0
+        # Keep the seller rating shown in the product grid current
+        refresh_seller_listings(reviewee)
     
     db.session.commit()
     
+    # Seller rating is shown on the cached product detail pages
+    invalidate_seller_products(data['reviewee_id'])
+    
     return jsonify({'message': 'Review created successfully'}), 201
 
 @reviews_bp.route('/api/users/<int:user_id>/reviews', methods=['GET'])
@@ -85,23 +88,18 @@ def get_user_reviews(user_id):
     )
     
     return jsonify({
-        'reviews': [{
-            'id': review.id,
-            'reviewer': {
-                'id': review.reviewer.id,
-                'username': review.reviewer.username,
-                'rating': review.reviewer.rating
-            },
-            'rating': review.rating,
-            'comment': review.comment,
-            'product_title': Product.query.get(review.product_id).title if review.product_id else None,
-            'created_at': review.created_at.isoformat()
-        } for review in reviews.items],
+        'reviews': serialize_received_reviews(reviews.items),
         'total': reviews.total,
         'pages': reviews.pages,
-        'current_page': page
+        'current_page': page,
+        'rating_summary': rating_distribution(user_id)
     }), 200
 
+@reviews_bp.route('/api/users/<int:user_id>/rating', methods=['GET'])
+def get_user_rating(user_id):
+    """Average rating, number of ratings and star distribution of a user"""
+    return jsonify(rating_distribution(user_id)), 200
+
 @reviews_bp.route('/api/reviews/<int:review_id>', methods=['DELETE'])
 @auth_required()
 def delete_review(review_id):
@@ -117,8 +115,12 @@ def delete_review(review_id):
     # For regular users, we'll mark as reported rather than delete
     # For admins, we'll actually delete
     if any(role.name == 'Admin' for role in current_user.roles):
+        reviewee = review_removed(review)
+        if reviewee:
+            refresh_seller_listings(reviewee)
         db.session.delete(review)
         db.session.commit()
+        invalidate_seller_products(review.reviewee_id)
         return jsonify({'message': 'Review deleted successfully'}), 200
     else:
         # Mark review as reported for admin review
@@ -149,21 +151,7 @@ def get_my_reviews():
     )
     
     return jsonify({
-        'reviews': [{
-            'id': review.id,
-            'reviewee': {
-                'id': review.reviewee.id,
-                'username': review.reviewee.username,
-                'rating': review.reviewee.rating
-            },
-            'product': {
-                'id': review.product.id,
-                'title': review.product.title
-            } if review.product else None,
-            'rating': review.rating,
-            'comment': review.comment,
-            'created_at': review.created_at.isoformat()
-        } for review in reviews.items],
+        'reviews': serialize_given_reviews(reviews.items),
         'total': reviews.total,
         'pages': reviews.pages,
         'current_page': page
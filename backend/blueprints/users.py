@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, make_response, current_app as app
 from flask_security import auth_required, current_user
 from backend.models import *
+from backend.utils.product_cache import invalidate_seller_products
+from backend.utils.dashboard import get_dashboard as get_user_dashboard
 from datetime import datetime
 import json
 
@@ -87,6 +89,9 @@ def update_profile(id):
         
         db.session.commit()
         
+        # Seller names are shown on the cached product detail pages
+        invalidate_seller_products(id)
+        
         # Return updated profile data
         return jsonify({
             'message': 'Profile updated successfully',
@@ -165,49 +170,5 @@ def update_user_language():
 @users_bp.route('/api/dashboard', methods=['GET'])
 @auth_required()
 def get_dashboard():
-    # User's statistics
-    total_listings = Product.query.filter_by(seller_id=current_user.id).count()
-    active_listings = Product.query.filter_by(seller_id=current_user.id, is_active=True, is_sold=False).count()
-    sold_items = Product.query.filter_by(seller_id=current_user.id, is_sold=True).count()
-    total_purchases = Purchase.query.filter_by(buyer_id=current_user.id).count()
-    total_sales = Purchase.query.filter_by(seller_id=current_user.id).count()
-    unread_messages = Chat.query.filter_by(receiver_id=current_user.id, is_read=False).count()
-    
-    # Recent activity
-    recent_listings = Product.query.filter_by(seller_id=current_user.id).order_by(Product.created_at.desc()).limit(5).all()
-    recent_purchases = Purchase.query.filter_by(buyer_id=current_user.id).order_by(Purchase.purchase_date.desc()).limit(5).all()
-    recent_sales = Purchase.query.filter_by(seller_id=current_user.id).order_by(Purchase.purchase_date.desc()).limit(5).all()
-    
-    return jsonify({
-        'stats': {
-            'total_listings': total_listings,
-            'active_listings': active_listings,
-            'sold_items': sold_items,
-            'total_purchases': total_purchases,
-            'total_sales': total_sales,
-            'unread_messages': unread_messages,
-            'user_rating': current_user.rating,
-            'total_reviews': current_user.total_reviews
-        },
-        'recent_listings': [{
-            'id': p.id,
-            'title': p.title,
-            'price': p.price,
-            'views': p.views,
-            'is_sold': p.is_sold,
-            'created_at': p.created_at.isoformat()
-        } for p in recent_listings],
-        'recent_purchases': [{
-            'id': purchase.id,
-            'product_title': Product.query.get(purchase.product_id).title,
-            'amount': purchase.amount,
-            'purchase_date': purchase.purchase_date.isoformat()
-        } for purchase in recent_purchases],
-        'recent_sales': [{
-            'id': sale.id,
-            'product_title': Product.query.get(sale.product_id).title,
-            'amount': sale.amount,
-            'buyer': User.query.get(sale.buyer_id).username,
-            'purchase_date': sale.purchase_date.isoformat()
-        } for sale in recent_sales]
-    }), 200
\ No newline at end of file
+    """User's listing and purchase statistics and recent activity"""
+    return jsonify(get_user_dashboard(current_user)), 200
\ No newline at end of file
@@ -8,13 +8,48 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     # Add Redis configuration for caching
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    
+    # Product view counting: 'memory' (per process) or 'redis' (shared by all workers)
+    VIEW_COUNTER_BACKEND = os.getenv("VIEW_COUNTER_BACKEND", "memory")
+    # How often buffered views are written to the database
+    VIEW_COUNTER_FLUSH_SECONDS = int(os.getenv("VIEW_COUNTER_FLUSH_SECONDS", 30))
+    # Ignore repeat views of a product by the same user/client within this window (0 disables)
+    VIEW_DEDUPE_SECONDS = int(os.getenv("VIEW_DEDUPE_SECONDS", 1800))
+
+    # Live update fan-out: 'memory' (single process) or 'redis' (several workers)
+    PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")
+    # Server-Sent Event streams each worker process keeps open, in total and per user/address
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", 200))
+    SSE_MAX_STREAMS_PER_CLIENT = int(os.getenv("SSE_MAX_STREAMS_PER_CLIENT", 5))
+    # How long a stream token (POST /api/stream-token) can be used to open a stream
+    STREAM_TOKEN_SECONDS = int(os.getenv("STREAM_TOKEN_SECONDS", 60))
+
+    # Run the background scheduler (periodic jobs and auction close jobs) in this process
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "True") == "True"
+
+    # Per-request query counting and timing (see utils/instrumentation.py)
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "True") == "True"
+    # Log requests slower than this many milliseconds or running more queries than this (0 disables)
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+    SLOW_REQUEST_QUERIES = int(os.getenv("SLOW_REQUEST_QUERIES", 30))
+
+    # Prometheus metrics at /metrics (see utils/prometheus.py); with several workers
+    # also set PROMETHEUS_MULTIPROC_DIR in the environment before they start
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+    # Who may scrape /metrics: clients sending "Authorization: Bearer <METRICS_TOKEN>",
+    # or connecting from one of these comma-separated addresses
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1")
 
 class LocalDevelopmentConfig(Config):
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = "sqlite:///appDB.sqlite3"
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///appDB.sqlite3")
 
     # For disabling CSRF in WTF forms (note the typo fix)
     WTF_CSRF_ENABLED = False    
+
+    # Show query count and database time in the browser's network panel
+    SERVER_TIMING = True
     
     # Flask-Security / Flask-Security-Too settings
     SECRET_KEY = os.getenv("SECRET_KEY", "fallback_secret") 
@@ -1,6 +1,13 @@
 from flask import current_app as app
 from flask_security import Security, hash_password
 from backend.models import *
+from backend.utils.search import init_search_index
+from backend.utils.listings import rebuild_missing_listings
+from backend.utils.auctions import schedule_open_auctions
+from backend.utils.unread import rebuild_unread_counters
+from backend.utils.conversations import rebuild_conversations
+from backend.utils.rollups import rebuild_metrics
+from backend.utils.ratings import rebuild_seller_stats
 from datetime import datetime
 
 # Only run this code if we're in an application context
@@ -12,6 +19,27 @@ if app:
         except Exception as e:
             print(f"An error occurred while creating tables: {e}")
 
+        # Create the full-text search index for product listings
+        init_search_index()
+
+        # Build listing read model rows for products that don't have one yet
+        rebuild_missing_listings()
+
+        # Register close jobs for open auctions (scheduler jobs are kept in memory)
+        schedule_open_auctions(app._get_current_object())
+
+        # Build the chat inbox from existing messages
+        rebuild_conversations()
+
+        # Seed unread counters from existing notifications and messages
+        rebuild_unread_counters()
+
+        # Seed admin metric counters and daily buckets from existing data
+        rebuild_metrics()
+
+        # Seed seller rating totals from existing reviews
+        rebuild_seller_stats()
+
         # Create roles
         try:
             with db.session.begin():
@@ -0,0 +1,48 @@
+"""
+Migration script to add the auction_closed flag to the Product table.
+"""
+
+def upgrade():
+    """Add auction_closed to the Product table and mark auctions that already ended as closed."""
+    import sqlite3
+    import os
+
+    # Connect to the database
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Add auction_closed column
+    try:
+        cursor.execute("ALTER TABLE product ADD COLUMN auction_closed BOOLEAN NOT NULL DEFAULT 0")
+        print("Added auction_closed column")
+
+        # Auctions that already ended were handled by the old notification sweep
+        cursor.execute("""
+            UPDATE product SET auction_closed = 1
+            WHERE is_auction = 1 AND auction_end_time <= strftime('%Y-%m-%d %H:%M:%f', 'now')
+        """)
+        print(f"Marked {cursor.rowcount} ended auctions as closed")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e).lower():
+            print(f"Error adding auction_closed column: {e}")
+        else:
+            print("auction_closed column already exists")
+
+    # Index used to find open auctions
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_product_open_auctions
+        ON product (is_auction, auction_closed, auction_end_time)
+    """)
+
+    # Commit changes and close connection
+    conn.commit()
+    conn.close()
+
+def downgrade():
+    """In SQLite, columns cannot be easily dropped, so this is a no-op."""
+    print("Downgrade not supported for SQLite - columns cannot be dropped easily")
+    pass
+
+if __name__ == "__main__":
+    upgrade()
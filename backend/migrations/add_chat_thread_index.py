@@ -0,0 +1,37 @@
+"""
+Migration script to add the message history index to the Chat table.
+"""
+
+def upgrade():
+    """Create the (sender_id, receiver_id, product_id, created_at) index on the Chat table."""
+    import sqlite3
+    import os
+
+    # Connect to the database
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_chat_thread_created
+        ON chat (sender_id, receiver_id, product_id, created_at)
+    """)
+    print("Created ix_chat_thread_created index")
+
+    # Commit changes and close connection
+    conn.commit()
+    conn.close()
+
+def downgrade():
+    """Drop the index again."""
+    import sqlite3
+    import os
+
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX IF EXISTS ix_chat_thread_created")
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,40 @@
+"""
+Migration script to add the idempotency key to the Notification table.
+"""
+
+def upgrade():
+    """Add idempotency_key and its unique index to the Notification table."""
+    import sqlite3
+    import os
+
+    # Connect to the database
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Add idempotency_key column (existing notifications keep NULL, which never conflicts)
+    try:
+        cursor.execute("ALTER TABLE notification ADD COLUMN idempotency_key VARCHAR(200)")
+        print("Added idempotency_key column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e).lower():
+            print(f"Error adding idempotency_key column: {e}")
+        else:
+            print("idempotency_key column already exists")
+
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_notification_idempotency_key
+        ON notification (idempotency_key)
+    """)
+
+    # Commit changes and close connection
+    conn.commit()
+    conn.close()
+
+def downgrade():
+    """In SQLite, columns cannot be easily dropped, so this is a no-op."""
+    print("Downgrade not supported for SQLite - columns cannot be dropped easily")
+    pass
+
+if __name__ == "__main__":
+    upgrade()
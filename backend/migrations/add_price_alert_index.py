@@ -0,0 +1,37 @@
+"""
+Migration script to add the price change lookup index to the PriceAlert table.
+"""
+
+def upgrade():
+    """Create the (product_id, status, target_price) index on the PriceAlert table."""
+    import sqlite3
+    import os
+
+    # Connect to the database
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_pricealert_product_status_target
+        ON pricealert (product_id, status, target_price)
+    """)
+    print("Created ix_pricealert_product_status_target index")
+
+    # Commit changes and close connection
+    conn.commit()
+    conn.close()
+
+def downgrade():
+    """Drop the index again."""
+    import sqlite3
+    import os
+
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX IF EXISTS ix_pricealert_product_status_target")
+    conn.commit()
+    conn.close()
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,58 @@
+"""
+Migration script to add the bid engine columns to the Product table.
+"""
+
+def upgrade():
+    """Add bid_count and highest_bidder_id to the Product table and backfill them from the bids."""
+    import sqlite3
+    import os
+
+    # Connect to the database
+    db_path = os.path.join('instance', 'appDB.sqlite3')
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Add bid_count column
+    try:
+        cursor.execute("ALTER TABLE product ADD COLUMN bid_count INTEGER NOT NULL DEFAULT 0")
+        print("Added bid_count column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e).lower():
+            print(f"Error adding bid_count column: {e}")
+        else:
+            print("bid_count column already exists")
+
+    # Add highest_bidder_id column
+    try:
+        cursor.execute("ALTER TABLE product ADD COLUMN highest_bidder_id INTEGER REFERENCES user(id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_product_highest_bidder_id ON product (highest_bidder_id)")
+        print("Added highest_bidder_id column")
+    except sqlite3.OperationalError as e:
+        if "duplicate column name" not in str(e).lower():
+            print(f"Error adding highest_bidder_id column: {e}")
+        else:
+            print("highest_bidder_id column already exists")
+
+    # Backfill from the existing bids
+    cursor.execute("""
+        UPDATE product SET
+            bid_count = (SELECT COUNT(*) FROM bid WHERE bid.product_id = product.id),
+            highest_bidder_id = (
+                SELECT bid.bidder_id FROM bid WHERE bid.product_id = product.id
+                ORDER BY bid.amount DESC, bid.id ASC LIMIT 1
+            )
+        WHERE is_auction = 1
+    """)
+    print(f"Backfilled bid columns for {cursor.rowcount} auctions")
+
+    # Commit changes and close connection
+    conn.commit()
+    conn.close()
+
+def downgrade():
+    """In SQLite, columns cannot be easily dropped, so this is a no-op."""
+    print("Downgrade not supported for SQLite - columns cannot be dropped easily")
+    pass
+
+if __name__ == "__main__":
+    upgrade()
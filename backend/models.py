@@ -37,7 +37,7 @@ class User(db.Model, UserMixin):
     # Relationships
     roles = db.relationship('Role', secondary='user_roles', backref='bearers')
     user_detail = db.relationship('UserDetail', backref='user', uselist=False, lazy=True)
-    products = db.relationship('Product', backref='seller', lazy=True)
+    products = db.relationship('Product', foreign_keys='Product.seller_id', backref='seller', lazy=True)
     bids = db.relationship('Bid', backref='bidder', lazy=True)
     cart_items = db.relationship('CartItem', backref='user', lazy=True)
     purchases = db.relationship('Purchase', backref='buyer', lazy=True)
@@ -102,6 +102,11 @@ class Product(db.Model):
     minimum_bid = db.Column(db.Float)
     reserve_price = db.Column(db.Float)
     current_bid = db.Column(db.Float, default=0.0)
+    # Maintained by the bid engine; bid_count also versions concurrent bid updates
+    bid_count = db.Column(db.Integer, default=0, nullable=False)
+    highest_bidder_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    # Set exactly once by the auction close job when the auction ends
+    auction_closed = db.Column(db.Boolean, default=False, nullable=False)
     is_sold = db.Column(db.Boolean, default=False, index=True)
     is_active = db.Column(db.Boolean, default=True, index=True)
     views = db.Column(db.Integer, default=0, index=True)
@@ -116,6 +121,33 @@ class Product(db.Model):
     bids = db.relationship('Bid', backref='product', lazy=True, cascade='all, delete-orphan')
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     saved_by = db.relationship('SavedItem', backref='product', lazy=True)
+    
+    __table_args__ = (
+        # Open auctions by end time, for scheduling closes without scanning the catalog
+        db.Index('ix_product_open_auctions', 'is_auction', 'auction_closed', 'auction_end_time'),
+    )
+
+class ProductListing(db.Model):
+    """Denormalized read model for the product grid, refreshed on product, user and review writes"""
+    __tablename__ = 'product_listing'
+    
+    # One row per product, sharing the product's primary key
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    
+    # Seller id is kept so seller writes can refresh all of their rows in one UPDATE
+    seller_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    
+    # Copies of related data the grid would otherwise lazy load per row
+    category_name = db.Column(db.String(50))
+    seller_username = db.Column(db.String(80))
+    seller_rating = db.Column(db.Float, default=0.0)
+    thumbnail = db.Column(db.Text)
+    
+    # Timestamp of the last refresh
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # One-to-one link so list queries can joinedload the read model with the product
+    product = db.relationship('Product', backref=db.backref('listing', uselist=False, lazy=True))
 
 class Bid(db.Model):
     __tablename__ = 'bid'
@@ -154,6 +186,11 @@ class Chat(db.Model):
     is_read = db.Column(db.Boolean, default=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # Messages of one direction of a thread in time order, for paging through history
+        db.Index('ix_chat_thread_created', 'sender_id', 'receiver_id', 'product_id', 'created_at'),
+    )
+
 class Review(db.Model):
     __tablename__ = 'review'
     id = db.Column(db.Integer, primary_key=True)
@@ -208,6 +245,11 @@ class PriceAlert(db.Model):
     # Relationships to other models
     user = db.relationship('User', backref='price_alerts')
     product = db.relationship('Product', backref='price_alerts')
+    
+    __table_args__ = (
+        # Alerts a price change on one product can trigger, found without scanning all alerts
+        db.Index('ix_pricealert_product_status_target', 'product_id', 'status', 'target_price'),
+    )
 
 class Dispute(db.Model):
     __tablename__='dispute'
@@ -248,7 +290,93 @@ class Notification(db.Model):
     # Timestamp of when notification was created
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    # Identifies the event being announced, so re-running a dispatch doesn't notify twice
+    idempotency_key = db.Column(db.String(200), unique=True, index=True)
+    
     # Relationships to other models
     user = db.relationship('User', backref='notifications')
     product = db.relationship('Product', backref='notifications')
     bid = db.relationship('Bid', backref='notifications')
+
+class UnreadCounter(db.Model):
+    """Per-user unread counts, maintained on insert and mark-read so badges never count rows"""
+    __tablename__ = 'unread_counter'
+    
+    # Owner of the count
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    
+    # What is counted: 'notifications' or 'chats' (all unread messages)
+    kind = db.Column(db.String(20), primary_key=True)
+    
+    # Sub-key within a kind; empty for the per-user totals
+    key = db.Column(db.String(50), primary_key=True, default='')
+    
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class Conversation(db.Model):
+    """One row per chat thread, updated on every message so the inbox is a single query"""
+    __tablename__ = 'conversation'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Participants, ordered so user_a_id < user_b_id
+    user_a_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # Product the thread is about; product_key is product_id or 0, so threads without a product stay unique
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
+    product_key = db.Column(db.Integer, nullable=False, default=0)
+    
+    last_message_id = db.Column(db.Integer, db.ForeignKey('chat.id'))
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Messages not yet read by user A / user B
+    unread_a = db.Column(db.Integer, nullable=False, default=0)
+    unread_b = db.Column(db.Integer, nullable=False, default=0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    last_message = db.relationship('Chat', foreign_keys=[last_message_id])
+    product = db.relationship('Product')
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_a_id', 'user_b_id', 'product_key', name='uq_conversation_participants'),
+        # Inbox of each participant, newest first
+        db.Index('ix_conversation_user_a_activity', 'user_a_id', 'last_activity_at'),
+        db.Index('ix_conversation_user_b_activity', 'user_b_id', 'last_activity_at'),
+    )
+
+class MetricCounter(db.Model):
+    """Site-wide totals for the admin dashboard, maintained on insert and status change"""
+    __tablename__ = 'metric_counter'
+    
+    # e.g. 'users.total', 'products.active', 'disputes.open'
+    name = db.Column(db.String(100), primary_key=True)
+    
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyMetric(db.Model):
+    """Per-day event counts (signups, listings, sales, disputes) for admin trend charts"""
+    __tablename__ = 'daily_metric'
+    
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class SellerStats(db.Model):
+    """Running rating totals per reviewed user, so ratings update in O(1) per review"""
+    __tablename__ = 'seller_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    
+    # Sum and number of ratings; the average is rating_sum / rating_count
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Number of ratings with each star value
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
@@ -1,12 +1,48 @@
 """
 Background task scheduler for the EcoFinds application.
-Handles periodic tasks like sending auction notifications and price alerts.
+Handles periodic tasks like sending auction notifications and price alerts,
+and the one-shot jobs that close each auction at its end time.
 """
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from backend.utils.notifications import send_auction_ending_soon_notifications, send_auction_ended_notifications, send_price_alert_notifications
+from apscheduler.triggers.cron import CronTrigger
+from backend.utils.notifications import send_auction_ending_soon_notifications, send_price_alert_notifications
+from backend.utils.auctions import close_overdue_auctions
+from backend.utils.view_counter import flush_views
+from backend.utils.product_cache import invalidate_products, bump_views_version
+from backend.utils.rollups import reconcile_metrics
+from backend.utils.prometheus import job_finished
 import atexit
+import functools
+import time
+
+def in_app_context(app, func):
+    """
+    Wrap a job so it runs inside an application context.
+    
+    Scheduler jobs run in worker threads, where the context pushed at startup isn't visible.
+    Each run's duration, and whether it raised, is recorded in the job metrics.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        failed = True
+        try:
+            with app.app_context():
+                result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            job_finished(func.__name__, time.perf_counter() - start, failed)
+    return wrapper
+
+def flush_product_views():
+    """Write buffered product views and drop the cached detail pages whose count changed."""
+    flushed = flush_views()
+    if flushed:
+        invalidate_products(*flushed)
+        bump_views_version()
 
 def init_scheduler(app):
     """
@@ -16,43 +52,67 @@ def init_scheduler(app):
         app (Flask): Flask application instance
         
     Returns:
-        BackgroundScheduler: The initialized scheduler instance
+        BackgroundScheduler: The initialized scheduler instance, or None if SCHEDULER_ENABLED is off
     """
+    if not app.config.get('SCHEDULER_ENABLED', True):
+        app.scheduler = None
+        return None
+    
     # Create background scheduler instance
     scheduler = BackgroundScheduler()
     
     # Add job to send notifications for auctions ending soon (runs every hour)
     scheduler.add_job(
-        func=send_auction_ending_soon_notifications,
+        func=in_app_context(app, send_auction_ending_soon_notifications),
         trigger=IntervalTrigger(hours=1),  # Run every hour
         id='auction_ending_soon',
         name='Send auction ending soon notifications',
         replace_existing=True
     )
     
-    # Add job to send notifications for auctions that have ended (runs every 30 minutes)
+    # Auctions are closed by one-shot jobs at their end time (see utils/auctions.py);
+    # this sweep only catches auctions whose job was lost (runs every 10 minutes)
     scheduler.add_job(
-        func=send_auction_ended_notifications,
-        trigger=IntervalTrigger(minutes=30),  # Run every 30 minutes
-        id='auction_ended',
-        name='Send auction ended notifications',
+        func=in_app_context(app, close_overdue_auctions),
+        trigger=IntervalTrigger(minutes=10),
+        id='close_overdue_auctions',
+        name='Close overdue auctions',
         replace_existing=True
     )
     
-    # Add job to check for price alerts (runs every 2 hours)
+    # Price alerts are evaluated when a price changes; this sweep only reconciles (runs every 6 hours)
     scheduler.add_job(
-        func=send_price_alert_notifications,
-        trigger=IntervalTrigger(hours=2),  # Run every 2 hours
+        func=in_app_context(app, send_price_alert_notifications),
+        trigger=IntervalTrigger(hours=6),  # Run every 6 hours
         id='price_alerts',
-        name='Check and send price alert notifications',
+        name='Reconcile price alert notifications',
+        replace_existing=True
+    )
+    
+    # Add job to write buffered product views to the database in one bulk UPDATE
+    scheduler.add_job(
+        func=in_app_context(app, flush_product_views),
+        trigger=IntervalTrigger(seconds=app.config.get('VIEW_COUNTER_FLUSH_SECONDS', 30)),
+        id='flush_product_views',
+        name='Flush buffered product view counts',
+        replace_existing=True
+    )
+    
+    # Admin metrics are maintained on every write; this recomputes them to repair drift (runs nightly)
+    scheduler.add_job(
+        func=in_app_context(app, reconcile_metrics),
+        trigger=CronTrigger(hour=3, minute=0),
+        id='reconcile_metrics',
+        name='Reconcile admin metric rollups',
         replace_existing=True
     )
     
     # Start the scheduler in the background
     scheduler.start()
     
-    # Ensure scheduler shuts down cleanly when app exits
+    # Ensure scheduler shuts down cleanly when app exits, writing any views still buffered
     atexit.register(lambda: scheduler.shutdown())
+    atexit.register(in_app_context(app, flush_product_views))
     
     # Store scheduler reference in app for potential future use
     app.scheduler = scheduler
@@ -0,0 +1,215 @@
+"""
+Auction lifecycle: closing auctions when they end.
+
+Each open auction gets a one-shot scheduler job at its ``auction_end_time``.
+The jobs live in the scheduler's memory, so they are rebuilt at startup from the
+open auctions (an indexed query on is_auction / auction_closed / end time), and a
+reconciliation sweep closes anything a lost job missed. Closing flips
+``auction_closed`` with a conditional UPDATE, so however many jobs or sweeps
+reach the same auction, its notifications are sent exactly once.
+
+Every worker process runs its own scheduler with its own in-memory jobs, on
+purpose. APScheduler 3 doesn't support several schedulers sharing one
+persistent job store, and the conditional UPDATE already makes duplicate jobs
+harmless. Each worker schedules every open auction at startup. An auction
+created or rescheduled later is held only by the worker that handled the
+request; if that worker restarts, the startup rebuild or the sweep closes the
+auction. With SCHEDULER_ENABLED off, a process registers no close jobs and
+relies on the processes that run a scheduler, and so on the sweep for auctions
+created in it.
+"""
+
+from datetime import datetime, timezone
+from sqlalchemy import update
+from apscheduler.triggers.date import DateTrigger
+from backend.models import db, Product, Bid
+from backend.utils.bidding import auction_channel
+from backend.utils.product_cache import invalidate_products
+from backend.utils.pubsub import publish
+from backend.utils.notifications import build_notification, dispatch_notifications
+
+def close_job_id(auction_id):
+    """Scheduler job ID of an auction's close job."""
+    return f'auction_close_{auction_id}'
+
+def close_auction(auction_id):
+    """
+    Close an ended auction and notify the seller and bidders.
+
+    Does nothing if the auction is already closed or hasn't ended yet. Must run
+    inside an application context.
+
+    Args:
+        auction_id (int): ID of the auction product
+
+    Returns:
+        bool: True if this call closed the auction
+
+    Raises:
+        Exception: Any database error, after rolling back, so the job counts as failed
+    """
+    now = datetime.utcnow()
+
+    try:
+        # Step 1: Claim the auction; only one caller can flip the flag. Closing changes
+        # the auction's status, so updated_at moves and the ETags / cache keys see it
+        result = db.session.execute(
+            update(Product)
+            .where(
+                Product.id == auction_id,
+                Product.is_auction == True,
+                Product.auction_closed == False,
+                Product.auction_end_time <= now
+            )
+            .values(auction_closed=True, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return False
+
+        auction = db.session.query(
+            Product.title, Product.seller_id, Product.current_bid, Product.highest_bidder_id
+        ).filter(Product.id == auction_id).one()
+
+        # Step 2: Notify the seller, the winner and everyone else who bid, in one insert
+        winning_bid = None
+        if auction.highest_bidder_id:
+            winning_bid = Bid.query.filter_by(
+                product_id=auction_id, bidder_id=auction.highest_bidder_id, amount=auction.current_bid
+            ).first()
+
+        if winning_bid:
+            seller_message = f"Your auction for '{auction.title}' has ended. The winning bid was ${auction.current_bid}."
+        else:
+            seller_message = f"Your auction for '{auction.title}' has ended without any bids."
+        notifications = [build_notification(
+            'auction_ended', auction.seller_id,
+            title="Your auction has ended",
+            message=seller_message,
+            related_product_id=auction_id
+        )]
+
+        if winning_bid:
+            notifications.append(build_notification(
+                'auction_won', winning_bid.bidder_id,
+                title="Congratulations! You've won an auction",
+                message=f"You've won the auction for '{auction.title}' with a bid of ${auction.current_bid}.",
+                related_product_id=auction_id,
+                related_bid_id=winning_bid.id
+            ))
+
+        # One message per losing bidder, not per losing bid
+        other_bidders = db.session.query(Bid.bidder_id)\
+            .filter(Bid.product_id == auction_id, Bid.bidder_id != auction.highest_bidder_id)\
+            .distinct()
+        notifications.extend(build_notification(
+            'auction_lost', bidder_id,
+            title="Auction you bid on has ended",
+            message=f"The auction for '{auction.title}' has ended. Unfortunately, your bid was not the winning bid.",
+            related_product_id=auction_id
+        ) for (bidder_id,) in other_bidders)
+
+        dispatch_notifications(notifications)
+
+        # Step 3: Commit the flag and notifications together
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error closing auction {auction_id}: {e}")
+        raise
+
+    # Drop the cached detail page only now, so a concurrent read can't re-cache the open state
+    invalidate_products(auction_id)
+    publish(auction_channel(auction_id), {'type': 'ended', 'auction_id': auction_id})
+    return True
+
+def close_overdue_auctions(limit=500):
+    """
+    Close auctions whose end time has passed but that are still open.
+
+    Reconciliation for close jobs that were lost (e.g. the process was down at the
+    end time). This function is called periodically by the background scheduler.
+
+    Args:
+        limit (int): Maximum number of auctions closed per run
+
+    Returns:
+        int: Number of auctions closed
+
+    Raises:
+        RuntimeError: If any auction could not be closed; the others are still closed
+    """
+    overdue = db.session.query(Product.id).filter(
+        Product.is_auction == True,
+        Product.auction_closed == False,
+        Product.auction_end_time <= datetime.utcnow()
+    ).limit(limit).all()
+    db.session.commit()
+
+    # One failing auction must not hold up the rest of the sweep
+    closed = failed = 0
+    for (auction_id,) in overdue:
+        try:
+            closed += close_auction(auction_id)
+        except Exception:
+            failed += 1
+
+    if failed:
+        raise RuntimeError(f"{failed} of {len(overdue)} overdue auctions could not be closed")
+    return closed
+
+def schedule_auction_close(app, auction_id, end_time):
+    """
+    Register (or move) the one-shot job that closes an auction at its end time.
+
+    Args:
+        app (Flask): Flask application instance holding the scheduler
+        auction_id (int): ID of the auction product
+        end_time (datetime): Naive UTC end time of the auction
+    """
+    from backend.scheduler import in_app_context
+
+    scheduler = getattr(app, 'scheduler', None)
+    if scheduler is None or end_time is None:
+        return
+
+    scheduler.add_job(
+        func=in_app_context(app, close_auction),
+        trigger=DateTrigger(run_date=end_time.replace(tzinfo=timezone.utc)),
+        args=[auction_id],
+        id=close_job_id(auction_id),
+        name=f'Close auction {auction_id}',
+        replace_existing=True,
+        # Run even if the scheduler was busy or the end time passed while it was paused
+        misfire_grace_time=None
+    )
+
+def schedule_open_auctions(app, batch_size=1000):
+    """
+    Register close jobs for every open auction.
+
+    Called at startup, since the scheduler keeps its jobs in memory. Auctions that
+    ended while the app was down are closed straight away.
+
+    Args:
+        app (Flask): Flask application instance holding the scheduler
+        batch_size (int): Number of auctions read per query
+    """
+    last_id = 0
+    while True:
+        rows = db.session.query(Product.id, Product.auction_end_time).filter(
+            Product.is_auction == True,
+            Product.auction_closed == False,
+            Product.id > last_id
+        ).order_by(Product.id).limit(batch_size).all()
+
+        for auction_id, end_time in rows:
+            schedule_auction_close(app, auction_id, end_time)
+
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1].id
+
+    # Always end the transaction, even when there was nothing to schedule
+    db.session.commit()
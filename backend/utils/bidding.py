@@ -0,0 +1,147 @@
+"""
+Concurrency-safe bid placement.
+
+A bid is accepted with a single conditional UPDATE of the product row that only
+succeeds if nobody else has bid since the auction state was read (``bid_count``
+acts as the row version), the auction is still open and unsold, and the new
+amount is still the highest. When two
+bidders race, exactly one UPDATE matches; the other re-reads the auction and is
+validated again against the new highest bid. The bid count and highest bidder
+are kept on the product, so placing a bid never scans the bid history.
+"""
+
+import math
+from datetime import datetime
+from sqlalchemy import update, func
+from sqlalchemy.exc import OperationalError
+from backend.models import db, Product, Bid
+
+# Attempts before giving up on a heavily contended auction
+MAX_ATTEMPTS = 5
+
+class BidRejected(Exception):
+    """The bid is not valid for the current state of the auction."""
+
+class PlacedBid:
+    """Outcome of an accepted bid."""
+
+    def __init__(self, bid, title, seller_id, previous_bidder_id, bid_count, end_time):
+        self.bid = bid
+        self.title = title
+        self.seller_id = seller_id
+        self.previous_bidder_id = previous_bidder_id
+        self.bid_count = bid_count
+        self.end_time = end_time
+
+def auction_channel(auction_id):
+    """Pub/sub channel carrying live updates of an auction."""
+    return f'auction:{auction_id}'
+
+def bidder_alias(username):
+    """Masked bidder name shown to other watchers, e.g. 'j***n'."""
+    if not username:
+        return 'Anonymous'
+    if len(username) <= 2:
+        return username[0] + '***'
+    return f'{username[0]}***{username[-1]}'
+
+def _validate(auction, bidder_id, amount, now):
+    if not auction.is_auction:
+        raise BidRejected('Product is not an auction item')
+    if auction.seller_id == bidder_id:
+        raise BidRejected('Cannot bid on your own product')
+    if auction.is_sold or not auction.is_active:
+        raise BidRejected('Auction is no longer available')
+    if auction.auction_closed or auction.auction_end_time is None or now > auction.auction_end_time:
+        raise BidRejected('Auction has ended')
+    if amount <= (auction.current_bid or 0) or amount < (auction.minimum_bid or 0):
+        raise BidRejected('Bid amount must be higher than current bid and minimum bid')
+
+def place_bid(product_id, bidder_id, amount):
+    """
+    Place a bid, retrying if another bid lands between the read and the write.
+
+    The bid row is added and flushed but not committed, so callers can add
+    notifications referencing it in the same transaction.
+
+    Args:
+        product_id (int): ID of the auctioned product
+        bidder_id (int): ID of the bidding user
+        amount (float): Bid amount
+
+    Returns:
+        PlacedBid: The new bid and the auction state it produced, or None if the product doesn't exist
+
+    Raises:
+        BidRejected: If the bid is invalid or the auction stayed too contended to bid on
+    """
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise BidRejected('Bid amount must be a number')
+    if not math.isfinite(amount):
+        # NaN fails every comparison and inf can never be outbid
+        raise BidRejected('Bid amount must be a number')
+
+    for attempt in range(MAX_ATTEMPTS):
+        # Step 1: Read the auction state (locks the row on databases that support FOR UPDATE)
+        auction = db.session.query(
+            Product.title, Product.seller_id, Product.is_auction, Product.is_sold, Product.is_active,
+            Product.auction_end_time, Product.minimum_bid, Product.current_bid,
+            Product.bid_count, Product.highest_bidder_id, Product.auction_closed
+        ).filter(Product.id == product_id).with_for_update().first()
+        if auction is None:
+            db.session.rollback()
+            return None
+
+        # Step 2: Validate against that state
+        now = datetime.utcnow()
+        try:
+            _validate(auction, bidder_id, amount, now)
+        except BidRejected:
+            db.session.rollback()
+            raise
+
+        # Step 3: Apply the bid only if the state is unchanged
+        try:
+            result = db.session.execute(
+                update(Product)
+                .where(
+                    Product.id == product_id,
+                    Product.bid_count == auction.bid_count,
+                    Product.is_sold == False,
+                    Product.is_active == True,
+                    Product.auction_closed == False,
+                    func.coalesce(Product.current_bid, 0) < amount,
+                    Product.auction_end_time >= now
+                )
+                .values(
+                    current_bid=amount,
+                    bid_count=Product.bid_count + 1,
+                    highest_bidder_id=bidder_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+        except OperationalError as e:
+            # SQLite reports a concurrent writer as "database is locked"
+            db.session.rollback()
+            print(f"Error placing bid on product {product_id} (attempt {attempt + 1}): {e}")
+            continue
+
+        if result.rowcount == 1:
+            bid = Bid(product_id=product_id, bidder_id=bidder_id, amount=amount)
+            db.session.add(bid)
+            db.session.flush()
+            return PlacedBid(
+                bid=bid,
+                title=auction.title,
+                seller_id=auction.seller_id,
+                previous_bidder_id=auction.highest_bidder_id,
+                bid_count=auction.bid_count + 1,
+                end_time=auction.auction_end_time
+            )
+
+        # Step 4: Someone else bid first - start over with the new state
+        db.session.rollback()
+
+    raise BidRejected('Auction is busy, please try again')
@@ -0,0 +1,94 @@
+"""
+Conditional GET support (ETag / Last-Modified with 304 Not Modified).
+
+Endpoints are wrapped with the ``conditional`` decorator and a validator function
+that computes a cheap version stamp (e.g. max(updated_at) and a row count) before
+the view runs. If the client's If-None-Match / If-Modified-Since still match, a
+304 is returned without building or serializing the body.
+"""
+
+import functools
+import hashlib
+from datetime import timezone
+from flask import request, make_response
+
+def _http_date(value):
+    # Timestamps are stored as naive UTC; HTTP dates have one-second resolution
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def conditional(validator=None, private=False, before=None):
+    """
+    Decorator adding ETag / Last-Modified validation to a GET view.
+
+    Args:
+        validator (callable, optional): Called with the view's URL arguments and
+            returns (version, last_modified). version is any repr-able value that
+            changes whenever the response would; last_modified is a datetime or None,
+            and must only be returned if it moves with every change to version.
+            A None version skips validation (e.g. the resource doesn't exist). Without
+            a validator the ETag is a hash of the response body.
+        private (bool): Response depends on the authenticated user
+        before (callable, optional): Called with the view's URL arguments on every
+            request, including those answered with a 304 (e.g. to count a visit);
+            skipped when the validator returns a None version
+
+    Returns:
+        callable: The decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = None, None
+
+            if validator is not None:
+                version, last_modified = validator(**kwargs)
+                if version is None:
+                    return view(*args, **kwargs)
+                if before is not None:
+                    before(**kwargs)
+                last_modified = _http_date(last_modified)
+                # The query string selects filters/pages, so it is part of the version
+                seed = repr((version, request.full_path)).encode()
+                etag = hashlib.sha1(seed).hexdigest()
+
+                if request.if_none_match:
+                    if request.if_none_match.contains_weak(etag):
+                        return _not_modified(etag, last_modified, private)
+                elif last_modified and request.if_modified_since and last_modified <= request.if_modified_since:
+                    return _not_modified(etag, last_modified, private)
+            elif before is not None:
+                before(**kwargs)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            if etag:
+                response.set_etag(etag)
+                if last_modified:
+                    response.last_modified = last_modified
+            else:
+                # No cheap validator: hash the body and let werkzeug answer the conditional request
+                response.add_etag()
+            _cache_headers(response, private)
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def _not_modified(etag, last_modified, private):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    _cache_headers(response, private)
+    return response
+
+def _cache_headers(response, private):
+    # Clients may keep the body but must revalidate before every use
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    if private:
+        response.vary.add('Authorization')
@@ -0,0 +1,149 @@
+"""
+Maintenance of the conversation table behind the chat inbox.
+
+Every message upserts its thread's row (last message, activity time and the
+receiver's unread count), and reading a thread lowers the reader's unread
+count. The inbox is then a single indexed query over ``conversation`` instead
+of a last-message, user, product and unread lookup per thread.
+
+Live chat events (new messages, typing, read receipts) are published on a
+per-user channel that the chat stream relays to the user's open clients.
+"""
+
+from datetime import datetime
+from sqlalchemy import select, insert, func, case, and_
+from backend.models import db, Conversation, Chat
+from backend.utils.db import dialect_insert
+from backend.utils.unread import messages_read
+
+def chat_channel(user_id):
+    """Pub/sub channel of a user's live chat events."""
+    return f'chats:{user_id}'
+
+def serialize_message(chat):
+    """Message as sent to both participants; clients compare sender_id to tell their own."""
+    return {
+        'id': chat.id,
+        'sender_id': chat.sender_id,
+        'receiver_id': chat.receiver_id,
+        'product_id': chat.product_id,
+        'message': chat.message,
+        'created_at': chat.created_at.isoformat()
+    }
+
+def participants(user_id, peer_id):
+    """The (user_a_id, user_b_id) pair of a thread; user_a_id is always the lower ID."""
+    return (user_id, peer_id) if user_id < peer_id else (peer_id, user_id)
+
+def record_message(chat):
+    """
+    Update a thread for a new message, creating the thread on its first message.
+
+    The message must be flushed so it has an ID. Runs in the caller's
+    transaction; the caller commits.
+
+    Args:
+        chat (Chat): The message just sent
+    """
+    # IDs may still be the raw values the message was built from
+    receiver_id = int(chat.receiver_id)
+    user_a_id, user_b_id = participants(int(chat.sender_id), receiver_id)
+    receiver_is_a = receiver_id == user_a_id
+    row = {
+        'user_a_id': user_a_id,
+        'user_b_id': user_b_id,
+        'product_id': chat.product_id,
+        'product_key': chat.product_id or 0,
+        'last_message_id': chat.id,
+        'last_activity_at': chat.created_at,
+        'unread_a': 1 if receiver_is_a else 0,
+        'unread_b': 0 if receiver_is_a else 1,
+        'created_at': datetime.utcnow()
+    }
+
+    statement = dialect_insert(Conversation)
+    if statement is not None:
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_a_id', 'user_b_id', 'product_key'],
+            set_={
+                'last_message_id': statement.excluded.last_message_id,
+                'last_activity_at': statement.excluded.last_activity_at,
+                'unread_a': Conversation.unread_a + statement.excluded.unread_a,
+                'unread_b': Conversation.unread_b + statement.excluded.unread_b
+            }
+        ), row)
+        return
+
+    # Other databases: read-modify-write through the ORM
+    conversation = Conversation.query.filter_by(
+        user_a_id=user_a_id, user_b_id=user_b_id, product_key=row['product_key']
+    ).first()
+    if conversation is None:
+        db.session.add(Conversation(**row))
+    else:
+        conversation.last_message_id = chat.id
+        conversation.last_activity_at = chat.created_at
+        conversation.unread_a += row['unread_a']
+        conversation.unread_b += row['unread_b']
+
+def read_conversation(user_id, peer_id, product_id=None, up_to_id=None):
+    """
+    Mark a peer's messages to a user as read.
+
+    The thread's unread count is checked first, so reading a thread with nothing
+    unread (the common case when a client reloads or polls) writes nothing. Runs
+    in the caller's transaction; the caller commits.
+
+    Args:
+        user_id (int): The reader
+        peer_id (int): The other participant
+        product_id (int, optional): Product the thread is about
+        up_to_id (int, optional): Only mark messages up to this ID, e.g. the last one
+            the client displayed
+
+    Returns:
+        int: Number of messages marked read
+    """
+    user_a_id, user_b_id = participants(user_id, peer_id)
+    column = Conversation.unread_a if user_id == user_a_id else Conversation.unread_b
+    thread = Conversation.query.filter_by(user_a_id=user_a_id, user_b_id=user_b_id, product_key=product_id or 0)
+
+    if not thread.with_entities(column).scalar():
+        return 0
+
+    messages = Chat.query.filter_by(sender_id=peer_id, receiver_id=user_id, product_id=product_id, is_read=False)
+    if up_to_id:
+        messages = messages.filter(Chat.id <= up_to_id)
+    marked = messages.update({'is_read': True}, synchronize_session=False)
+    if marked:
+        messages_read(user_id, marked)
+        thread.update({column: case((column > marked, column - marked), else_=0)}, synchronize_session=False)
+    return marked
+
+def rebuild_conversations():
+    """
+    Create the conversation rows from the chat history in one INSERT ... SELECT.
+
+    Run at startup; does nothing once conversations exist.
+    """
+    if db.session.query(Conversation.id).first() is not None or db.session.query(Chat.id).first() is None:
+        db.session.commit()
+        return
+
+    user_a = case((Chat.sender_id < Chat.receiver_id, Chat.sender_id), else_=Chat.receiver_id)
+    user_b = case((Chat.sender_id < Chat.receiver_id, Chat.receiver_id), else_=Chat.sender_id)
+    product_key = func.coalesce(Chat.product_id, 0)
+    unread_for = lambda side: func.sum(case((and_(Chat.is_read == False, Chat.receiver_id == side), 1), else_=0))
+
+    threads = select(
+        user_a, user_b, func.max(Chat.product_id), product_key,
+        func.max(Chat.id), func.max(Chat.created_at),
+        unread_for(user_a), unread_for(user_b), func.min(Chat.created_at)
+    ).group_by(user_a, user_b, product_key)
+
+    db.session.execute(insert(Conversation).from_select([
+        'user_a_id', 'user_b_id', 'product_id', 'product_key',
+        'last_message_id', 'last_activity_at', 'unread_a', 'unread_b', 'created_at'
+    ], threads))
+
+    db.session.commit()
@@ -0,0 +1,149 @@
+"""
+User dashboard service.
+
+Builds the /api/dashboard body with one conditional-aggregation query per
+table (products, purchases) and one joined query per recent-activity list, and
+caches it per user in the Flask-Caching instance set up by
+``products.init_cache``. Writes that change a user's listings or purchases must
+invalidate the affected users. The unread message count and the rating are not
+part of the cached data; they are merged in when the response is served, so
+chat and review writes don't have to invalidate anything.
+"""
+
+from sqlalchemy import func, case, or_
+from sqlalchemy.orm import aliased
+from backend.models import db, Product, Purchase, User
+from backend.utils.unread import unread_count
+
+# Seconds a cached dashboard may be served without being invalidated
+DASHBOARD_TIMEOUT = 300
+
+# Entries in each recent-activity list
+RECENT_LIMIT = 5
+
+def _cache():
+    # Looked up at call time because the cache is created when the app starts
+    from backend.blueprints import products
+    return products.cache
+
+def dashboard_key(user_id):
+    """Cache key of a user's dashboard body."""
+    return f'dashboard:{user_id}'
+
+def build_dashboard(user_id):
+    """
+    Compute a user's listing and purchase statistics and recent activity.
+
+    Args:
+        user_id (int): The user
+
+    Returns:
+        dict: The cacheable part of the dashboard body
+    """
+    # Listing counts in one pass over the seller's products
+    total_listings, active_listings, sold_items = db.session.query(
+        func.count(Product.id),
+        func.sum(case(((Product.is_active == True) & (Product.is_sold == False), 1), else_=0)),
+        func.sum(case((Product.is_sold == True, 1), else_=0))
+    ).filter(Product.seller_id == user_id).one()
+
+    # Purchase and sale counts in one pass over the user's purchases
+    total_purchases, total_sales = db.session.query(
+        func.sum(case((Purchase.buyer_id == user_id, 1), else_=0)),
+        func.sum(case((Purchase.seller_id == user_id, 1), else_=0))
+    ).filter(or_(Purchase.buyer_id == user_id, Purchase.seller_id == user_id)).one()
+
+    recent_listings = db.session.query(
+        Product.id, Product.title, Product.price, Product.views, Product.is_sold, Product.created_at
+    ).filter(Product.seller_id == user_id)\
+        .order_by(Product.created_at.desc()).limit(RECENT_LIMIT).all()
+
+    recent_purchases = db.session.query(
+        Purchase.id, Product.title, Purchase.amount, Purchase.purchase_date
+    ).join(Product, Product.id == Purchase.product_id)\
+        .filter(Purchase.buyer_id == user_id)\
+        .order_by(Purchase.purchase_date.desc()).limit(RECENT_LIMIT).all()
+
+    Buyer = aliased(User)
+    recent_sales = db.session.query(
+        Purchase.id, Product.title, Purchase.amount, Buyer.username, Purchase.purchase_date
+    ).join(Product, Product.id == Purchase.product_id)\
+        .join(Buyer, Buyer.id == Purchase.buyer_id)\
+        .filter(Purchase.seller_id == user_id)\
+        .order_by(Purchase.purchase_date.desc()).limit(RECENT_LIMIT).all()
+
+    return {
+        'stats': {
+            'total_listings': total_listings,
+            'active_listings': active_listings or 0,
+            'sold_items': sold_items or 0,
+            'total_purchases': total_purchases or 0,
+            'total_sales': total_sales or 0
+        },
+        'recent_listings': [{
+            'id': product_id,
+            'title': title,
+            'price': price,
+            'views': views,
+            'is_sold': is_sold,
+            'created_at': created_at.isoformat()
+        } for product_id, title, price, views, is_sold, created_at in recent_listings],
+        'recent_purchases': [{
+            'id': purchase_id,
+            'product_title': title,
+            'amount': amount,
+            'purchase_date': purchase_date.isoformat()
+        } for purchase_id, title, amount, purchase_date in recent_purchases],
+        'recent_sales': [{
+            'id': sale_id,
+            'product_title': title,
+            'amount': amount,
+            'buyer': buyer,
+            'purchase_date': purchase_date.isoformat()
+        } for sale_id, title, amount, buyer, purchase_date in recent_sales]
+    }
+
+def get_dashboard(user):
+    """
+    Return a user's dashboard body, from the cache when possible.
+
+    Args:
+        user (User): The user, usually current_user
+
+    Returns:
+        dict: The dashboard body
+    """
+    cache = _cache()
+    body = None
+    if cache is not None:
+        try:
+            body = cache.get(dashboard_key(user.id))
+        except Exception as e:
+            # Treat an unreachable cache backend as a miss
+            print(f"Error reading dashboard cache: {e}")
+
+    if body is None:
+        body = build_dashboard(user.id)
+        if cache is not None:
+            try:
+                cache.set(dashboard_key(user.id), body, timeout=DASHBOARD_TIMEOUT)
+            except Exception as e:
+                print(f"Error writing dashboard cache: {e}")
+
+    # Live values merged into a copy, so the cached body stays untouched
+    stats = dict(body['stats'],
+                 unread_messages=unread_count(user.id, 'chats'),
+                 user_rating=user.rating,
+                 total_reviews=user.total_reviews)
+    return dict(body, stats=stats)
+
+def invalidate_dashboards(*user_ids):
+    """Drop the cached dashboards of the given users."""
+    cache = _cache()
+    user_ids = [user_id for user_id in user_ids if user_id]
+    if cache is None or not user_ids:
+        return
+    try:
+        cache.delete_many(*[dashboard_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        print(f"Error invalidating dashboard cache: {e}")
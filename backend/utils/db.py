@@ -0,0 +1,102 @@
+"""
+Dialect specific SQL helpers.
+
+SQLite (development) and PostgreSQL (production) both support
+``INSERT ... ON CONFLICT``, but SQLAlchemy only exposes it through each
+dialect's own insert construct. These helpers pick the right one for the
+engine in use.
+"""
+
+from sqlalchemy import insert, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from backend.models import db
+
+def dialect_insert(model):
+    """
+    Return an INSERT for the current database that supports on_conflict_* clauses.
+
+    Args:
+        model: Model class or Table to insert into
+
+    Returns:
+        Insert: A dialect insert, or None if the database has no ON CONFLICT support
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    return None
+
+def insert_ignore(model, rows, conflict_columns, returning=None):
+    """
+    Bulk insert rows, silently skipping any that would violate a unique key.
+
+    Runs as a single executemany INSERT in the current transaction; the caller
+    commits.
+
+    Args:
+        model: Model class or Table to insert into
+        rows (list): Column value dicts, all with the same keys
+        conflict_columns (list): Columns of the unique key that decides duplicates
+        returning (list, optional): Columns to return for the rows actually inserted
+
+    Returns:
+        list: Rows of the returning columns for inserted rows (empty if returning is None)
+    """
+    if not rows:
+        return []
+
+    statement = dialect_insert(model)
+    if statement is not None:
+        statement = statement.on_conflict_do_nothing(index_elements=conflict_columns)
+        if returning:
+            return db.session.execute(statement.returning(*returning), rows).all()
+        db.session.execute(statement, rows)
+        return []
+
+    # Other databases: drop the rows whose key already exists, then insert the rest
+    table = getattr(model, '__table__', model)
+    columns = [table.c[name] for name in conflict_columns]
+    keys = {tuple(row[name] for name in conflict_columns) for row in rows}
+    existing = {tuple(found) for found in db.session.execute(db.select(*columns).where(tuple_(*columns).in_(list(keys))))}
+    rows = [row for row in rows if tuple(row[name] for name in conflict_columns) not in existing]
+    if rows:
+        db.session.execute(insert(table), rows)
+    if not returning:
+        return []
+    return [tuple(row[column.key] for column in returning) for row in rows]
+
+def upsert_add(model, rows, key_columns, column, connection=None):
+    """
+    Add to counter columns, creating the rows that don't exist yet.
+
+    Args:
+        model: Model class or Table holding the counters
+        rows (list): Dicts with the key columns and the amounts to add under `column`
+        key_columns (list): Primary/unique key columns identifying a counter
+        column (str or list): Name of the counter column, or of several counter columns
+        connection (optional): Connection to run on (e.g. from inside a flush event);
+            defaults to the current session
+    """
+    if not rows:
+        return
+    execute = connection.execute if connection is not None else db.session.execute
+    table = getattr(model, '__table__', model)
+    columns = [column] if isinstance(column, str) else list(column)
+
+    statement = dialect_insert(model)
+    if statement is not None:
+        statement = statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={name: table.c[name] + statement.excluded[name] for name in columns}
+        )
+        execute(statement, rows)
+        return
+
+    # Other databases: update existing counters, then insert the missing ones
+    for row in rows:
+        match = [table.c[name] == row[name] for name in key_columns]
+        result = execute(table.update().where(*match).values({name: table.c[name] + row[name] for name in columns}))
+        if result.rowcount == 0:
+            execute(insert(table).values(**row))
@@ -0,0 +1,97 @@
+"""
+Facet counts for product browsing.
+
+All facets (category, condition, auction/fixed price and price range) are computed
+from a single GROUP BY over the filtered result set and rolled up in Python, instead
+of one COUNT query per filter option.
+"""
+
+import math
+from sqlalchemy import func, case
+from backend.models import Product, Category
+
+# Default price histogram edges; each bin is [edge, next edge) and the last is open-ended
+DEFAULT_PRICE_BINS = [0, 25, 50, 100, 250, 500, 1000]
+
+# Most edges a client may ask for; each edge adds a branch to the grouped CASE
+MAX_PRICE_BINS = 20
+
+def parse_price_bins(raw):
+    """
+    Parse a comma separated list of price bin edges, e.g. "0,50,100,500".
+
+    Returns:
+        list: Sorted, de-duplicated edges (the defaults if raw is empty)
+
+    Raises:
+        ValueError: If an edge is not a finite number, or there are more than MAX_PRICE_BINS edges
+    """
+    if not raw:
+        return list(DEFAULT_PRICE_BINS)
+    edges = set(float(edge) for edge in raw.split(',') if edge.strip())
+    if not edges:
+        raise ValueError('price_bins must contain at least one number')
+    if not all(math.isfinite(edge) for edge in edges):
+        raise ValueError('price_bins must be finite numbers')
+    if len(edges) > MAX_PRICE_BINS:
+        raise ValueError(f'price_bins can have at most {MAX_PRICE_BINS} edges')
+    return sorted(edges)
+
+def compute_facets(query, price_bins=None):
+    """
+    Count the products of a filtered query per facet value in one grouped query.
+
+    Args:
+        query (Query): Filtered Product query (any ordering is ignored)
+        price_bins (list, optional): Price bin edges, defaults to DEFAULT_PRICE_BINS
+
+    Returns:
+        dict: Buckets keyed by facet name ('category', 'condition', 'is_auction', 'price')
+    """
+    edges = price_bins or DEFAULT_PRICE_BINS
+
+    # Bin index per row: -1 below the first edge, len(edges) - 1 for the open-ended top bin
+    price_bin = case(
+        (Product.price < edges[0], -1),
+        *[(Product.price < edge, index) for index, edge in enumerate(edges[1:])],
+        else_=len(edges) - 1
+    ).label('price_bin')
+
+    rows = query.order_by(None)\
+        .outerjoin(Category, Category.id == Product.category_id)\
+        .with_entities(
+            Product.category_id,
+            Category.name,
+            Product.condition,
+            Product.is_auction,
+            price_bin,
+            func.count(Product.id)
+        )\
+        .group_by(Product.category_id, Category.name, Product.condition, Product.is_auction, price_bin)\
+        .all()
+
+    categories, conditions, auction, prices = {}, {}, {}, {}
+    for category_id, category_name, condition, is_auction, bin_index, count in rows:
+        category = categories.setdefault(category_id, {'id': category_id, 'name': category_name, 'count': 0})
+        category['count'] += count
+        conditions[condition] = conditions.get(condition, 0) + count
+        auction[bool(is_auction)] = auction.get(bool(is_auction), 0) + count
+        prices[bin_index] = prices.get(bin_index, 0) + count
+
+    price_buckets = []
+    if prices.get(-1):
+        price_buckets.append({'min': None, 'max': edges[0], 'count': prices[-1]})
+    for index, edge in enumerate(edges):
+        price_buckets.append({
+            'min': edge,
+            'max': edges[index + 1] if index + 1 < len(edges) else None,
+            'count': prices.get(index, 0)
+        })
+
+    return {
+        'category': sorted(categories.values(), key=lambda c: -c['count']),
+        'condition': [{'value': value, 'count': count}
+                      for value, count in sorted(conditions.items(), key=lambda item: -item[1])],
+        'is_auction': [{'value': value, 'count': count} for value, count in sorted(auction.items())],
+        'price': price_buckets
+    }
@@ -0,0 +1,176 @@
+"""
+Per-request query and latency instrumentation.
+
+SQLAlchemy cursor events time every statement and add it to the current
+request's totals; Flask request hooks time the handler. When a request ends its
+query count, database time and total time are added to in-process histograms
+per endpoint, requests over the configured thresholds are logged, and in
+development a ``Server-Timing`` header shows the numbers in the browser's
+network panel.
+
+Settings (app config):
+    INSTRUMENTATION_ENABLED    turn the hooks on or off (default on)
+    SERVER_TIMING              add Server-Timing headers (default: DEBUG)
+    SLOW_REQUEST_MS            log requests slower than this (0 disables)
+    SLOW_REQUEST_QUERIES       log requests running more queries than this (0 disables)
+
+The histograms are per process; with several workers each keeps its own.
+"""
+
+import bisect
+import threading
+import time
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+# Upper bounds of the latency buckets, in milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Upper bounds of the query count buckets
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum."""
+
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def to_dict(self):
+        # Lists rather than a mapping so the bucket order survives JSON key sorting
+        return {'bounds': list(self.bounds) + ['inf'], 'counts': list(self.counts), 'sum': round(self.total, 3)}
+
+class EndpointStats:
+    """Request count and histograms of one endpoint."""
+
+    __slots__ = ('requests', 'errors', 'max_queries', 'latency', 'db_time', 'queries')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.max_queries = 0
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.db_time = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'avg_ms': round(self.latency.total / self.requests, 2) if self.requests else 0,
+            'avg_queries': round(self.queries.total / self.requests, 2) if self.requests else 0,
+            'max_queries': self.max_queries,
+            'latency_ms': self.latency.to_dict(),
+            'db_time_ms': self.db_time.to_dict(),
+            'queries': self.queries.to_dict()
+        }
+
+_stats = {}
+_lock = threading.Lock()
+
+def record_request(endpoint, status, duration_ms, db_ms, queries):
+    """Add a finished request to its endpoint's histograms."""
+    with _lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = EndpointStats()
+        stats.requests += 1
+        if status >= 500:
+            stats.errors += 1
+        stats.max_queries = max(stats.max_queries, queries)
+        stats.latency.observe(duration_ms)
+        stats.db_time.observe(db_ms)
+        stats.queries.observe(queries)
+
+def endpoint_stats():
+    """
+    Snapshot of the histograms of every endpoint seen by this process.
+
+    Returns:
+        dict: {endpoint: stats}, slowest average first
+    """
+    with _lock:
+        snapshot = {endpoint: stats.to_dict() for endpoint, stats in _stats.items()}
+    return dict(sorted(snapshot.items(), key=lambda item: item[1]['avg_ms'], reverse=True))
+
+def reset_stats():
+    """Forget all recorded requests."""
+    with _lock:
+        _stats.clear()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    # Statements run outside a request (scheduler jobs, startup) aren't attributed to anything
+    if has_request_context():
+        timing = g.get('request_timing')
+        if timing is not None:
+            timing['queries'] += 1
+            timing['db_time'] += elapsed
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def init_instrumentation(app):
+    """
+    Install the cursor and request hooks.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    if not app.config.get('INSTRUMENTATION_ENABLED', True):
+        return
+
+    server_timing = app.config.get('SERVER_TIMING', app.debug)
+    slow_ms = app.config.get('SLOW_REQUEST_MS', 500)
+    slow_queries = app.config.get('SLOW_REQUEST_QUERIES', 30)
+
+    with app.app_context():
+        from backend.models import db
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_timing():
+        g.request_timing = {'start': time.perf_counter(), 'queries': 0, 'db_time': 0.0}
+
+    @app.after_request
+    def finish_timing(response):
+        timing = g.pop('request_timing', None)
+        if timing is None:
+            return response
+
+        duration_ms = (time.perf_counter() - timing['start']) * 1000
+        db_ms = timing['db_time'] * 1000
+        queries = timing['queries']
+        endpoint = request.endpoint or 'unmatched'
+        record_request(endpoint, response.status_code, duration_ms, db_ms, queries)
+
+        if (slow_ms and duration_ms > slow_ms) or (slow_queries and queries > slow_queries):
+            print(f"Slow request {request.method} {request.path} ({endpoint}): "
+                  f"{duration_ms:.1f} ms, {queries} queries, {db_ms:.1f} ms in database")
+
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_ms:.1f};desc="{queries} queries", app;dur={duration_ms - db_ms:.1f}, total;dur={duration_ms:.1f}'
+            )
+            # The frontend runs on another origin; without this browsers hide the timings from it
+            response.headers['Timing-Allow-Origin'] = '*'
+        return response
@@ -0,0 +1,126 @@
+"""
+Maintenance of the denormalized product listing read model.
+
+The product grid needs the category name, seller username and rating and first
+image of every row. Rather than lazy loading those per product, they are
+copied into ``product_listing`` whenever the underlying product, seller or review
+data changes, so a list page is one query joining ``product`` to ``product_listing``
+on the primary key.
+"""
+
+import json
+from backend.models import db, Product, ProductListing, Category, User
+
+def first_image(images):
+    """Return the first image of a product's JSON encoded image list, or None."""
+    try:
+        images = json.loads(images) if images else []
+    except ValueError:
+        return None
+    return images[0] if images else None
+
+def listing_card(p):
+    """
+    Grid fields of a product, read from its listing row.
+
+    Queries should joinedload Product.listing so this doesn't issue extra queries.
+
+    Args:
+        p (Product): The product to serialize
+
+    Returns:
+        dict: Card fields shared by the catalog endpoints
+    """
+    listing = p.listing
+    if listing is None:
+        # Read model not built for this product yet - fall back to the related rows
+        listing = ProductListing(
+            category_name=p.category.name if p.category else None,
+            seller_username=p.seller.username if p.seller else None,
+            seller_rating=p.seller.rating if p.seller else None,
+            thumbnail=first_image(p.images)
+        )
+    
+    return {
+        'id': p.id,
+        'title': p.title,
+        'price': p.price,
+        'condition': p.condition,
+        'category': listing.category_name,
+        'seller': listing.seller_username,
+        'seller_rating': listing.seller_rating,
+        'thumbnail': listing.thumbnail,
+        'images': [listing.thumbnail] if listing.thumbnail else [],
+        'is_auction': p.is_auction,
+        'bid_count': p.bid_count or 0
+    }
+
+def refresh_listings(product_ids):
+    """
+    Recompute the listing rows of the given products.
+
+    Reads everything the read model needs in a single joined query. The caller is
+    responsible for committing the session.
+
+    Args:
+        product_ids (list): IDs of the products to refresh
+    """
+    if not product_ids:
+        return
+
+    rows = db.session.query(
+        Product.id, Product.seller_id, Product.images,
+        Category.name, User.username, User.rating
+    ).outerjoin(Category, Category.id == Product.category_id)\
+        .outerjoin(User, User.id == Product.seller_id)\
+        .filter(Product.id.in_(product_ids))\
+        .all()
+
+    for product_id, seller_id, images, category_name, username, rating in rows:
+        db.session.merge(ProductListing(
+            product_id=product_id,
+            seller_id=seller_id,
+            category_name=category_name,
+            seller_username=username,
+            seller_rating=rating,
+            thumbnail=first_image(images)
+        ))
+
+def refresh_listing(product):
+    """Recompute the listing row of a single product (flushed first so new products have an id)."""
+    db.session.flush()
+    refresh_listings([product.id])
+
+def refresh_seller_listings(user):
+    """
+    Copy a seller's current username and rating onto all of their listing rows.
+
+    Args:
+        user (User): The seller whose profile or rating changed
+    """
+    ProductListing.query.filter_by(seller_id=user.id).update({
+        'seller_username': user.username,
+        'seller_rating': user.rating
+    }, synchronize_session=False)
+
+def rebuild_missing_listings(batch_size=500):
+    """
+    Create listing rows for products that don't have one yet.
+
+    Run at startup so that products created before the read model existed are listed.
+
+    Args:
+        batch_size (int): Number of products refreshed per query
+    """
+    while True:
+        missing = db.session.query(Product.id)\
+            .outerjoin(ProductListing, ProductListing.product_id == Product.id)\
+            .filter(ProductListing.product_id.is_(None))\
+            .limit(batch_size)\
+            .all()
+        if missing:
+            refresh_listings([row.id for row in missing])
+        # Always end the transaction, even when there was nothing to build
+        db.session.commit()
+        if len(missing) < batch_size:
+            break
@@ -3,7 +3,51 @@ Notification utility functions for the EcoFinds application.
 """
 
 from backend.models import Notification, db
-from datetime import datetime
+from backend.utils.db import insert_ignore
+from backend.utils.pubsub import publish
+from backend.utils.unread import notifications_created
+from backend.utils.prometheus import notifications_inserted
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+def notification_channel(user_id):
+    """Pub/sub channel that wakes a user's notification streams."""
+    return f'notifications:{user_id}'
+
+def serialize_notification(notification):
+    """JSON fields of a notification, as returned by the API and pushed to streams."""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'related_product_id': notification.related_product_id,
+        'created_at': notification.created_at.isoformat()
+    }
+
+# New notifications are announced to their recipients' streams once the transaction
+# that created them commits; the stream then reads them from the table, so the
+# message itself only needs to say "something new".
+
+@event.listens_for(Session, 'after_flush')
+def _collect_new_notifications(session, flush_context):
+    new = [obj.user_id for obj in session.new if isinstance(obj, Notification)]
+    if new:
+        session.info.setdefault('notified_users', set()).update(new)
+        session.info['notifications_created'] = session.info.get('notifications_created', 0) + len(new)
+
+@event.listens_for(Session, 'after_commit')
+def _announce_new_notifications(session):
+    notifications_inserted(session.info.pop('notifications_created', 0))
+    for user_id in session.info.pop('notified_users', ()):
+        publish(notification_channel(user_id), {'type': 'notification'})
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_new_notifications(session):
+    session.info.pop('notified_users', None)
+    session.info.pop('notifications_created', None)
 
 def send_notification(user_id, title, message, related_product_id=None, related_bid_id=None):
     """
@@ -34,117 +78,174 @@ def send_notification(user_id, title, message, related_product_id=None, related_
     
     return notification
 
+def notification_key(event, user_id, product_id=None, ref=None):
+    """
+    Idempotency key of a notification: one per (event, product, user), optionally narrowed by a reference.
+
+    Args:
+        event (str): Event type, e.g. 'auction_won'
+        user_id (int): ID of the recipient
+        product_id (int, optional): Related product ID
+        ref (optional): Distinguishes repeatable events, e.g. the bid or alert ID
+
+    Returns:
+        str: The key
+    """
+    key = f"{event}:{product_id or ''}:{user_id}"
+    return key if ref is None else f"{key}:{ref}"
+
+def build_notification(event, user_id, title, message, related_product_id=None, related_bid_id=None, ref=None):
+    """
+    Describe one notification for dispatch_notifications.
+
+    Args:
+        event (str): Event type used for de-duplication
+        user_id (int): ID of the user to notify
+        title (str): Title of the notification
+        message (str): Message content
+        related_product_id (int, optional): Related product ID
+        related_bid_id (int, optional): Related bid ID
+        ref (optional): Extra key part for events that may repeat per user and product
+
+    Returns:
+        dict: Column values of the notification row
+    """
+    return {
+        'user_id': user_id,
+        'title': title,
+        'message': message,
+        'related_product_id': related_product_id,
+        'related_bid_id': related_bid_id,
+        'is_read': False,
+        'created_at': datetime.utcnow(),
+        'idempotency_key': notification_key(event, user_id, related_product_id, ref)
+    }
+
+def dispatch_notifications(notifications):
+    """
+    Insert a batch of notifications with a single bulk INSERT.
+
+    Notifications whose idempotency key already exists (in the table or earlier
+    in the batch) are skipped, so a sweep that crashed half way can simply be
+    run again. Runs in the caller's transaction; the caller commits.
+
+    Args:
+        notifications (list): Rows built with build_notification
+    """
+    unique = {}
+    for notification in notifications:
+        unique.setdefault(notification['idempotency_key'], notification)
+    inserted = insert_ignore(Notification, list(unique.values()), ['idempotency_key'], returning=[Notification.user_id])
+    
+    # Bulk inserts bypass the flush events, so count and announce the rows actually inserted here
+    if inserted:
+        user_ids = [row[0] for row in inserted]
+        notifications_created(user_ids)
+        db.session.info.setdefault('notified_users', set()).update(user_ids)
+        db.session.info['notifications_created'] = db.session.info.get('notifications_created', 0) + len(user_ids)
+
 def send_auction_ending_soon_notifications():
     """
     Send notifications to bidders when auctions are about to end.
     This function should be called periodically by a background task.
     """
     from backend.models import Product, Bid
-    from datetime import datetime, timedelta
     
-    # Find auctions ending in the next 24 hours that haven't sent notifications yet
-    soon_ending_auctions = Product.query.filter(
-        Product.is_auction == True,
-        Product.auction_end_time <= datetime.utcnow() + timedelta(hours=24),
-        Product.auction_end_time > datetime.utcnow()
-    ).all()
+    # Every (auction, bidder) pair for open auctions ending in the next 24 hours
+    now = datetime.utcnow()
+    bidders = db.session.query(Product.id, Product.title, Bid.bidder_id)\
+        .join(Bid, Bid.product_id == Product.id)\
+        .filter(
+            Product.is_auction == True,
+            Product.auction_closed == False,
+            Product.auction_end_time <= now + timedelta(hours=24),
+            Product.auction_end_time > now
+        ).distinct().all()
     
-    # Send notifications to all bidders for each soon-ending auction
-    for auction in soon_ending_auctions:
-        # Get all bidders for this auction
-        bids = Bid.query.filter_by(product_id=auction.id).all()
-        bidder_ids = set(bid.bidder_id for bid in bids)
-        
-        # Send notification to each bidder
-        for bidder_id in bidder_ids:
-            send_notification(
-                user_id=bidder_id,
-                title="Auction ending soon!",
-                message=f"The auction for '{auction.title}' is ending in 24 hours. Place your final bid now!",
-                related_product_id=auction.id
-            )
-
-def send_auction_ended_notifications():
+    # Each bidder is reminded once per auction, however often this runs
+    dispatch_notifications([
+        build_notification(
+            'auction_ending_soon', bidder_id,
+            title="Auction ending soon!",
+            message=f"The auction for '{title}' is ending in 24 hours. Place your final bid now!",
+            related_product_id=product_id
+        ) for product_id, title, bidder_id in bidders
+    ])
+    db.session.commit()
+
+def _trigger_price_alerts(alerts):
+    # alerts: rows of (id, user_id, product_id, target_price, title, price)
+    from backend.models import PriceAlert
+    
+    if not alerts:
+        return
+    
+    # Update alert status to prevent duplicate notifications
+    PriceAlert.query.filter(PriceAlert.id.in_([alert.id for alert in alerts])).update({
+        'status': 'triggered',
+        'triggered_at': datetime.utcnow()
+    }, synchronize_session=False)
+    
+    # Send notification to each user in one insert
+    dispatch_notifications([
+        build_notification(
+            'price_alert', alert.user_id,
+            title="Price Alert Triggered!",
+            message=f"Great news! The price for '{alert.title}' has dropped to ${alert.price}, which is at or below your target price of ${alert.target_price}.",
+            related_product_id=alert.product_id,
+            ref=alert.id
+        ) for alert in alerts
+    ])
+
+def evaluate_price_alerts(product):
     """
-    Send notifications when auctions have ended.
-    This function should be called periodically by a background task.
+    Trigger the active price alerts a product's current price satisfies.
+    
+    Called when a product's price changes. Uses the (product_id, status,
+    target_price) index, so the cost depends on the alerts for this product only.
+    Runs in the caller's transaction; the caller commits.
+    
+    Args:
+        product (Product): The product whose price changed
     """
-    from backend.models import Product, Bid
-    from datetime import datetime
+    from backend.models import PriceAlert
+    
+    if not product.is_active or product.is_sold:
+        return
     
-    # Find auctions that ended in the last hour and haven't sent notifications yet
-    recently_ended_auctions = Product.query.filter(
-        Product.is_auction == True,
-        Product.auction_end_time <= datetime.utcnow(),
-        Product.auction_end_time > datetime.utcnow() - timedelta(hours=1)
+    alerts = db.session.query(
+        PriceAlert.id, PriceAlert.user_id, PriceAlert.product_id, PriceAlert.target_price
+    ).filter(
+        PriceAlert.product_id == product.id,
+        PriceAlert.status == 'active',
+        PriceAlert.target_price >= product.price
     ).all()
     
-    # Process each ended auction
-    for auction in recently_ended_auctions:
-        # Get winning bidder
-        winning_bid = Bid.query.filter_by(
-            product_id=auction.id, 
-            amount=auction.current_bid
-        ).first()
-        
-        # Notify seller about auction ending
-        send_notification(
-            user_id=auction.seller_id,
-            title="Your auction has ended",
-            message=f"Your auction for '{auction.title}' has ended. The winning bid was ${auction.current_bid}.",
-            related_product_id=auction.id
-        )
-        
-        # Notify winning bidder about their victory
-        if winning_bid:
-            send_notification(
-                user_id=winning_bid.bidder_id,
-                title="Congratulations! You've won an auction",
-                message=f"You've won the auction for '{auction.title}' with a bid of ${auction.current_bid}.",
-                related_product_id=auction.id,
-                related_bid_id=winning_bid.id
-            )
-        
-        # Notify other bidders about auction ending
-        other_bids = Bid.query.filter(
-            Bid.product_id == auction.id,
-            Bid.id != (winning_bid.id if winning_bid else None)
-        ).all()
-        
-        for bid in other_bids:
-            send_notification(
-                user_id=bid.bidder_id,
-                title="Auction you bid on has ended",
-                message=f"The auction for '{auction.title}' has ended. Unfortunately, your bid was not the winning bid.",
-                related_product_id=auction.id
-            )
+    _trigger_price_alerts([
+        SimpleNamespace(**alert._asdict(), title=product.title, price=product.price) for alert in alerts
+    ])
 
 def send_price_alert_notifications():
     """
-    Send notifications when product prices drop to or below user's target prices.
-    This function should be called periodically by a background task.
+    Reconciliation sweep for price alerts.
+    
+    Alerts are normally triggered by evaluate_price_alerts when a price changes
+    or an alert is created; this catches price changes made outside
+    update_product. This function should be called periodically by
+    a background task.
     """
     from backend.models import Product, PriceAlert
     
     # Find active price alerts where product price is <= target price
-    alerts_to_trigger = db.session.query(PriceAlert).join(Product).filter(
+    alerts_to_trigger = db.session.query(
+        PriceAlert.id, PriceAlert.user_id, PriceAlert.product_id, PriceAlert.target_price,
+        Product.title, Product.price
+    ).join(Product, Product.id == PriceAlert.product_id).filter(
         PriceAlert.status == 'active',
         Product.price <= PriceAlert.target_price
     ).all()
     
-    # Send notifications for each triggered alert
-    for alert in alerts_to_trigger:
-        # Update alert status to prevent duplicate notifications
-        alert.status = 'triggered'
-        alert.triggered_at = datetime.utcnow()
-        
-        # Send notification to user
-        send_notification(
-            user_id=alert.user_id,
-            title="Price Alert Triggered!",
-            message=f"Great news! The price for '{alert.product.title}' has dropped to ${alert.product.price}, which is at or below your target price of ${alert.target_price}.",
-            related_product_id=alert.product_id
-        )
+    _trigger_price_alerts(alerts_to_trigger)
     
     # Commit all changes
-    db.session.commit()
\ No newline at end of file
+    db.session.commit()
@@ -0,0 +1,108 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Offset pagination has to COUNT the whole result set and skip over every earlier
+row, so deep pages get slower the further a client scrolls. A keyset page instead
+continues from the (sort value, id) of the last row the client saw, which an index
+on the sort column can serve directly, and never needs a total count.
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_, DateTime
+
+# Largest page a client may request
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(sort_key, value, row_id):
+    """
+    Encode the position after a row as an opaque, URL-safe cursor.
+
+    Args:
+        sort_key (str): Name of the sort the cursor belongs to
+        value: Sort column value of the last row
+        row_id (int): Primary key of the last row (tie-breaker)
+
+    Returns:
+        str: The cursor string
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort_key, 'v': value, 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_key, column):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Cursor sent by the client
+        sort_key (str): Sort the client is requesting; must match the cursor's
+        column (Column): Sort column, used to restore datetime values
+
+    Returns:
+        tuple: (value, row_id)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for a different sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, row_id = payload['v'], int(payload['id'])
+        if isinstance(column.type, DateTime) and value is not None:
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if payload.get('s') != sort_key:
+        raise ValueError('Cursor does not match the requested sort order')
+
+    return value, row_id
+
+def keyset_page(query, column, id_column, sort_key, descending=True, cursor=None, limit=20):
+    """
+    Fetch one keyset page of a query.
+
+    Any ordering already on the query is replaced by (column, id_column).
+
+    Args:
+        query (Query): Filtered query to paginate
+        column (Column): Column to sort by
+        id_column (Column): Unique column used as tie-breaker (normally the primary key)
+        sort_key (str): Name of the sort, embedded in the cursor
+        descending (bool): Sort direction
+        cursor (str, optional): Cursor from the previous page; None or '' for the first page
+        limit (int): Page size, clamped to 1..MAX_PAGE_SIZE
+
+    Returns:
+        tuple: (items, next_cursor) - next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_key, column)
+        if descending:
+            query = query.filter(or_(column < value, and_(column == value, id_column < row_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, id_column > row_id)))
+
+    if descending:
+        query = query.order_by(None).order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(None).order_by(column.asc(), id_column.asc())
+
+    # Fetch one extra row to find out whether there is a next page without counting
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_key, getattr(last, column.key), getattr(last, id_column.key))
+
+    return items, next_cursor
@@ -0,0 +1,232 @@
+"""
+Saved-search percolator.
+
+Instead of running every saved search against the catalog, each new or updated
+listing is run against the saved searches. Searches are compiled once into
+matchers and bucketed by (category, condition), with each bucket sorted by its
+minimum price. A listing only checks the four buckets it can belong to, and only
+the searches in them whose minimum price it meets. The remaining checks (maximum
+price, auction type, location, search words) are plain Python comparisons. The
+location must be a substring of the listing's location, as in /api/search. Search words
+match the way the catalog search does: every word must prefix a word of the
+title, description, brand or model.
+
+The index lives in process memory. It is rebuilt after saved searches change in
+this process, and at least every INDEX_TTL seconds to pick up changes made by
+other workers.
+"""
+
+import bisect
+import json
+import re
+import threading
+import time
+from backend.models import db, SavedSearch
+from backend.utils.notifications import build_notification, dispatch_notifications
+
+# Seconds before the index is rebuilt to pick up saved searches changed by other workers
+INDEX_TTL = 300
+
+WORD_PATTERN = re.compile(r'\w+')
+
+class CompiledSearch:
+    """A saved search reduced to the checks a single listing needs."""
+
+    __slots__ = ('id', 'user_id', 'name', 'words', 'category_id', 'condition',
+                 'min_price', 'max_price', 'is_auction', 'location')
+
+    def __init__(self, id, user_id, name, words, category_id=None, condition=None,
+                 min_price=None, max_price=None, is_auction=None, location=None):
+        self.id = id
+        self.user_id = user_id
+        self.name = name
+        self.words = words
+        self.category_id = category_id
+        self.condition = condition
+        self.min_price = min_price
+        self.max_price = max_price
+        self.is_auction = is_auction
+        self.location = location
+
+    def matches(self, price, is_auction, location, tokens):
+        """Check the criteria not covered by the index bucket and minimum price."""
+        if self.max_price is not None and price > self.max_price:
+            return False
+        if self.is_auction is not None and bool(is_auction) != self.is_auction:
+            return False
+        if self.location and self.location not in (location or ''):
+            return False
+        for word in self.words:
+            if word not in tokens and not any(token.startswith(word) for token in tokens):
+                return False
+        return True
+
+def _number(value, cast):
+    try:
+        return cast(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def compile_search(search_id, user_id, name, search_query, filters):
+    """
+    Compile a saved search into a matcher.
+
+    Args:
+        search_id (int): ID of the saved search
+        user_id (int): ID of its owner
+        name (str): Display name of the search
+        search_query (str): Free text, matched like the catalog search
+        filters (str): JSON filters saved from the products page
+
+    Returns:
+        CompiledSearch: The matcher
+    """
+    try:
+        filters = json.loads(filters) if filters else {}
+    except ValueError:
+        filters = {}
+    if not isinstance(filters, dict):
+        filters = {}
+
+    is_auction = filters.get('is_auction')
+    if is_auction not in (None, ''):
+        is_auction = str(is_auction).lower() in ('1', 'true', 'yes')
+    else:
+        is_auction = None
+
+    return CompiledSearch(
+        id=search_id,
+        user_id=user_id,
+        name=name,
+        words=tuple(WORD_PATTERN.findall((search_query or '').lower())),
+        category_id=_number(filters.get('category_id'), int),
+        condition=filters.get('condition') or None,
+        min_price=_number(filters.get('min_price'), float),
+        max_price=_number(filters.get('max_price'), float),
+        is_auction=is_auction,
+        location=filters.get('location') or None
+    )
+
+class PercolatorIndex:
+    """Compiled saved searches bucketed by (category_id, condition) and sorted by minimum price."""
+
+    def __init__(self, searches):
+        buckets = {}
+        for search in searches:
+            buckets.setdefault((search.category_id, search.condition), []).append(search)
+
+        self.size = len(searches)
+        self._buckets = {}
+        for key, bucket in buckets.items():
+            bucket.sort(key=lambda search: search.min_price if search.min_price is not None else float('-inf'))
+            min_prices = [search.min_price if search.min_price is not None else float('-inf') for search in bucket]
+            self._buckets[key] = (min_prices, bucket)
+
+    def match(self, category_id, condition, price, is_auction, location, text):
+        """
+        Return the saved searches a listing matches.
+
+        Args:
+            category_id (int): Listing category
+            condition (str): Listing condition
+            price (float): Listing price
+            is_auction (bool): Whether the listing is an auction
+            location (str): Listing location
+            text (str): Searchable text of the listing
+
+        Returns:
+            list: Matching CompiledSearch objects
+        """
+        # Prices may arrive as strings from request data before the row is reloaded
+        price = float(price)
+        tokens = None
+        matched = []
+        for key in ((category_id, condition), (category_id, None), (None, condition), (None, None)):
+            entry = self._buckets.get(key)
+            if entry is None:
+                continue
+            min_prices, bucket = entry
+            # Only searches whose minimum price the listing meets are candidates
+            end = bisect.bisect_right(min_prices, price)
+            for search in bucket[:end]:
+                if search.words and tokens is None:
+                    tokens = set(WORD_PATTERN.findall(text.lower()))
+                if search.matches(price, is_auction, location, tokens or ()):
+                    matched.append(search)
+        return matched
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+def build_index():
+    """Compile every saved search into a fresh index (one query)."""
+    rows = db.session.query(
+        SavedSearch.id, SavedSearch.user_id, SavedSearch.name, SavedSearch.search_query, SavedSearch.filters
+    ).all()
+    return PercolatorIndex([compile_search(*row) for row in rows])
+
+def invalidate_index():
+    """Rebuild the index on next use, e.g. after a saved search was created or deleted."""
+    global _built_at
+    _built_at = 0.0
+
+def get_index():
+    """Return the current index, rebuilding it if it is stale."""
+    global _index, _built_at
+    if _index is None or time.time() - _built_at > INDEX_TTL:
+        with _lock:
+            if _index is None or time.time() - _built_at > INDEX_TTL:
+                _index = build_index()
+                _built_at = time.time()
+    return _index
+
+def percolate(product):
+    """
+    Find the saved searches a listing matches, excluding the seller's own.
+
+    Args:
+        product (Product): The new or updated listing
+
+    Returns:
+        list: Matching CompiledSearch objects
+    """
+    if not product.is_active or product.is_sold:
+        return []
+
+    text = ' '.join(filter(None, [product.title, product.description, product.brand, product.model]))
+    matches = get_index().match(
+        product.category_id, product.condition, product.price, product.is_auction, product.location, text
+    )
+    return [search for search in matches if search.user_id != product.seller_id]
+
+def notify_saved_search_matches(product):
+    """
+    Notify the owners of saved searches a listing matches.
+
+    Each user is notified at most once per listing, however many of their
+    searches match or how often the listing is edited. Runs in the caller's
+    transaction; the caller commits.
+
+    Args:
+        product (Product): The new or updated listing (flushed, so it has an ID)
+    """
+    try:
+        matches = percolate(product)
+    except Exception as e:
+        # Matching is best effort and must never block saving the listing
+        print(f"Error matching saved searches: {e}")
+        return
+
+    notified = {}
+    for search in matches:
+        notified.setdefault(search.user_id, search)
+
+    dispatch_notifications([
+        build_notification(
+            'saved_search_match', user_id,
+            title="New listing matches your saved search",
+            message=f"'{product.title}' for ${product.price} matches your saved search '{search.name}'.",
+            related_product_id=product.id
+        ) for user_id, search in notified.items()
+    ])
@@ -0,0 +1,89 @@
+"""
+Product detail response cache.
+
+Caches the JSON body of /api/products/<id> per product in the Flask-Caching
+instance set up by ``products.init_cache``. Every write that changes what the
+detail page shows (product edits, bids, sales, seller profile or rating changes)
+must invalidate the affected entries. The live view count is not part of the
+cached data; it is merged in from the view counter when the response is served.
+"""
+
+import time
+from backend.models import Product
+
+# Seconds a cached detail body may be served without being invalidated
+DETAIL_TIMEOUT = 600
+
+# Changes whenever buffered views are written, so catalog validators notice new counts
+VIEWS_VERSION_KEY = 'product_views_version'
+
+def _cache():
+    # Looked up at call time because the cache is created when the app starts
+    from backend.blueprints import products
+    return products.cache
+
+def detail_key(product_id):
+    """Cache key of a product's detail body."""
+    return f'product_detail:{product_id}'
+
+def get_product_detail(product_id):
+    """
+    Return the cached detail body of a product.
+
+    Returns:
+        dict: The cached body, or None on a miss or if the cache is unavailable
+    """
+    cache = _cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(detail_key(product_id))
+    except Exception as e:
+        # Treat an unreachable cache backend as a miss
+        print(f"Error reading product cache: {e}")
+        return None
+
+def set_product_detail(product_id, body):
+    """Store the detail body of a product."""
+    cache = _cache()
+    if cache is None:
+        return
+    try:
+        cache.set(detail_key(product_id), body, timeout=DETAIL_TIMEOUT)
+    except Exception as e:
+        print(f"Error writing product cache: {e}")
+
+def invalidate_products(*product_ids):
+    """Drop the cached detail bodies of the given products."""
+    cache = _cache()
+    if cache is None or not product_ids:
+        return
+    try:
+        cache.delete_many(*[detail_key(product_id) for product_id in product_ids])
+    except Exception as e:
+        print(f"Error invalidating product cache: {e}")
+
+def invalidate_seller_products(seller_id):
+    """Drop the cached detail bodies of every product a seller has listed."""
+    product_ids = [row.id for row in Product.query.with_entities(Product.id).filter_by(seller_id=seller_id)]
+    invalidate_products(*product_ids)
+
+def bump_views_version():
+    """Record that stored view counts changed (used by the catalog ETag)."""
+    cache = _cache()
+    if cache is None:
+        return
+    try:
+        cache.set(VIEWS_VERSION_KEY, time.time(), timeout=0)
+    except Exception as e:
+        print(f"Error writing product cache: {e}")
+
+def views_version():
+    """Return the current view count version, or None if unknown."""
+    cache = _cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(VIEWS_VERSION_KEY)
+    except Exception:
+        return None
@@ -0,0 +1,215 @@
+"""
+Prometheus metrics for the EcoFinds application.
+
+``init_prometheus`` times every request per endpoint and serves the metrics in
+the Prometheus text format at ``/metrics``. The other modules record their own
+events through the helpers below:
+
+    ecofind_http_requests_total                 requests by method, endpoint and status
+    ecofind_http_request_duration_seconds       latency histogram by method and endpoint
+    ecofind_db_pool_connections_checked_out     connections currently in use
+    ecofind_db_pool_size                        configured pool size
+    ecofind_cache_requests_total                Flask-Caching gets by cache and hit/miss
+    ecofind_scheduler_job_duration_seconds      APScheduler job run time by job
+    ecofind_scheduler_job_failures_total        APScheduler jobs that raised, by job
+    ecofind_notifications_created_total         notifications committed
+    ecofind_bids_total                          bids by result (accepted/rejected)
+
+Recording is a lock-free increment into a per-process value, cheap enough to
+leave on in production. With several gunicorn workers each worker writes its
+values to a memory-mapped file in ``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics``
+adds up the files of all workers, whichever worker serves the scrape. The
+directory must be set in the environment before the workers start (and emptied
+between deployments), and the gunicorn config should drop the files of exited
+workers::
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+Settings (app config):
+    METRICS_ENABLED        record metrics and serve /metrics (default on)
+    METRICS_TOKEN          bearer token a scraper may send to read /metrics
+    METRICS_ALLOWED_IPS    comma-separated client addresses allowed without the token
+                           (default localhost)
+
+Other clients get a 404, so the endpoint isn't advertised to the public. The
+address check uses ``request.remote_addr``: behind a proxy that is the proxy's
+address, so either scrape the workers directly or use the token.
+
+Without the ``prometheus_client`` package every helper does nothing.
+"""
+
+import hmac
+import os
+import time
+from flask import g, request, Response
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, multiprocess
+except ImportError:
+    prometheus_client = None
+
+# Upper bounds of the request latency buckets, in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Upper bounds of the scheduler job duration buckets, in seconds
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+if prometheus_client:
+    REQUESTS = Counter(
+        'ecofind_http_requests_total', 'HTTP requests handled',
+        ['method', 'endpoint', 'status']
+    )
+    REQUEST_DURATION = Histogram(
+        'ecofind_http_request_duration_seconds', 'Time spent handling HTTP requests',
+        ['method', 'endpoint'], buckets=REQUEST_BUCKETS
+    )
+    POOL_CHECKED_OUT = Gauge(
+        'ecofind_db_pool_connections_checked_out', 'Database connections currently checked out of the pool',
+        multiprocess_mode='livesum'
+    )
+    POOL_SIZE = Gauge(
+        'ecofind_db_pool_size', 'Configured size of the database connection pool',
+        multiprocess_mode='livesum'
+    )
+    CACHE_REQUESTS = Counter(
+        'ecofind_cache_requests_total', 'Cache lookups',
+        ['cache', 'result']
+    )
+    JOB_DURATION = Histogram(
+        'ecofind_scheduler_job_duration_seconds', 'Run time of scheduler jobs',
+        ['job'], buckets=JOB_BUCKETS
+    )
+    JOB_FAILURES = Counter(
+        'ecofind_scheduler_job_failures_total', 'Scheduler job runs that raised',
+        ['job']
+    )
+    NOTIFICATIONS = Counter(
+        'ecofind_notifications_created_total', 'Notifications created'
+    )
+    BIDS = Counter(
+        'ecofind_bids_total', 'Bids placed',
+        ['result']
+    )
+
+def _enabled():
+    return prometheus_client is not None
+
+def bid_placed(accepted):
+    """Count a bid, accepted or rejected."""
+    if _enabled():
+        BIDS.labels(result='accepted' if accepted else 'rejected').inc()
+
+def notifications_inserted(count):
+    """Count notifications committed to the table."""
+    if _enabled() and count:
+        NOTIFICATIONS.inc(count)
+
+def job_finished(job, duration, failed=False):
+    """Record a scheduler job run."""
+    if _enabled():
+        JOB_DURATION.labels(job=job).observe(duration)
+        if failed:
+            JOB_FAILURES.labels(job=job).inc()
+
+def instrument_cache(cache, name):
+    """
+    Count hits and misses of a Flask-Caching instance.
+
+    Wraps the instance's ``get``; a lookup returning None counts as a miss.
+
+    Args:
+        cache (Cache): Flask-Caching instance (None is ignored)
+        name (str): Value of the ``cache`` label
+    """
+    if not _enabled() or cache is None or getattr(cache, '_prometheus_name', None):
+        return
+
+    get = cache.get
+    hits = CACHE_REQUESTS.labels(cache=name, result='hit')
+    misses = CACHE_REQUESTS.labels(cache=name, result='miss')
+
+    def counted_get(*args, **kwargs):
+        value = get(*args, **kwargs)
+        (misses if value is None else hits).inc()
+        return value
+
+    cache.get = counted_get
+    cache._prometheus_name = name
+
+def _instrument_pool(engine):
+    from sqlalchemy import event
+
+    size = getattr(engine.pool, 'size', None)
+    if callable(size):
+        POOL_SIZE.set(size())
+
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def _checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
+
+def _may_scrape(app):
+    token = app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return True
+    allowed = app.config.get('METRICS_ALLOWED_IPS') or ''
+    return request.remote_addr in {address.strip() for address in allowed.split(',') if address.strip()}
+
+def _registry():
+    # In multiprocess mode the default registry only holds this worker's values
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+def init_prometheus(app):
+    """
+    Install the request hooks, pool and cache instrumentation, and the /metrics endpoint.
+
+    Call after the caches are initialized.
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    if not _enabled():
+        print("prometheus_client is not installed; /metrics is disabled")
+        return
+
+    with app.app_context():
+        from backend.models import db
+        _instrument_pool(db.engine)
+
+    from backend.blueprints import products, misc
+    instrument_cache(products.cache, 'products')
+    instrument_cache(misc.cache, 'misc')
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        # The endpoint name rather than the path, so IDs in URLs don't create new series
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start)
+        REQUESTS.labels(method=request.method, endpoint=endpoint, status=str(response.status_code)).inc()
+        return response
+
+    def metrics():
+        if not _may_scrape(app):
+            return Response('Not Found', status=404)
+        return Response(prometheus_client.generate_latest(_registry()), content_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,156 @@
+"""
+Lightweight publish/subscribe used to push live updates to connected clients.
+
+Publishers serialize an event once and hand it to the broker. Each open stream
+holds a subscription with its own bounded queue, so a single publish fans out to
+every watcher in the process. With several workers the Redis broker relays
+events between processes: each worker keeps one Redis connection listening on
+all channels and delivers to its local subscribers.
+"""
+
+import json
+import queue
+import threading
+
+# Active broker, set by init_pubsub
+broker = None
+
+# Events kept per subscriber before new ones are dropped (slow or stalled clients)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class Subscription:
+    """A subscriber's queue of events published on one channel."""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout=None):
+        """Wait for the next event; returns None if nothing arrived within the timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Events carry the current state, so a client that falls behind only misses intermediate ones
+            pass
+
+    def close(self):
+        """Stop receiving events."""
+        self.broker.unsubscribe(self)
+
+class MemoryBroker:
+    """Delivers events to subscribers in this process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+class RedisBroker(MemoryBroker):
+    """Relays events through Redis pub/sub so subscribers on every worker receive them."""
+
+    PREFIX = 'ecofind:'
+
+    def __init__(self, redis_url):
+        import redis
+        super().__init__()
+        self.redis = redis.Redis.from_url(redis_url)
+        self._listener = None
+
+    def subscribe(self, channel):
+        self._start_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel, message):
+        self.redis.publish(self.PREFIX + channel, message)
+
+    def _start_listener(self):
+        # One pattern subscription per process, started when the first client connects
+        with self._lock:
+            if self._listener is not None:
+                return
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(**{self.PREFIX + '*': self._on_message})
+            self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _on_message(self, item):
+        channel = item['channel']
+        message = item['data']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(message, bytes):
+            message = message.decode()
+        self.deliver(channel[len(self.PREFIX):], message)
+
+def init_pubsub(app):
+    """
+    Create the broker configured for the app.
+
+    Uses PUBSUB_BACKEND ('memory' or 'redis').
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        The broker instance
+    """
+    global broker
+
+    if app.config.get('PUBSUB_BACKEND') == 'redis':
+        try:
+            broker = RedisBroker(app.config.get('REDIS_URL'))
+        except ImportError:
+            # Fallback to in-process delivery if redis is not available
+            broker = MemoryBroker()
+    else:
+        broker = MemoryBroker()
+
+    return broker
+
+def publish(channel, event):
+    """
+    Publish an event to everyone subscribed to a channel.
+
+    Args:
+        channel (str): Channel name, e.g. 'auction:12'
+        event (dict): JSON serializable event
+    """
+    if broker is None:
+        return
+    try:
+        broker.publish(channel, json.dumps(event))
+    except Exception as e:
+        # Live updates are best effort; the write that triggered them has already committed
+        print(f"Error publishing to {channel}: {e}")
+
+def subscribe(channel):
+    """Subscribe to a channel; the caller must close the subscription when done."""
+    return broker.subscribe(channel)
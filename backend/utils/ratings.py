@@ -0,0 +1,99 @@
+"""
+Seller rating aggregation.
+
+Each reviewed user has a ``seller_stats`` row with the running sum and count of
+their ratings and how many ratings had each star value. Creating or deleting a
+review adjusts that row with one upsert and copies the new average onto
+``User.rating`` / ``User.total_reviews``, so the cost no longer grows with the
+number of reviews.
+"""
+
+from sqlalchemy import func, case, insert, select
+from backend.models import db, SellerStats, Review, User
+from backend.utils.db import upsert_add
+
+STAR_VALUES = (1, 2, 3, 4, 5)
+
+def _apply(user_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one rating and refresh the user's average."""
+    user_id, rating = int(user_id), int(rating)
+    upsert_add(SellerStats, [{
+        'user_id': user_id,
+        'rating_sum': sign * rating,
+        'rating_count': sign,
+        **{f'stars_{stars}': sign if stars == rating else 0 for stars in STAR_VALUES}
+    }], ['user_id'], ['rating_sum', 'rating_count'] + [f'stars_{stars}' for stars in STAR_VALUES])
+
+    rating_sum, rating_count = db.session.query(SellerStats.rating_sum, SellerStats.rating_count)\
+        .filter(SellerStats.user_id == user_id).one()
+    user = db.session.get(User, user_id)
+    if user:
+        user.rating = rating_sum / rating_count if rating_count > 0 else 0.0
+        user.total_reviews = max(rating_count, 0)
+    return user
+
+def review_added(review):
+    """
+    Count a new review towards the reviewee's rating.
+
+    Runs in the caller's transaction; the caller commits.
+
+    Args:
+        review (Review): The review being created
+
+    Returns:
+        User: The reviewee with the updated rating, or None if they don't exist
+    """
+    return _apply(review.reviewee_id, review.rating, 1)
+
+def review_removed(review):
+    """
+    Take a review being deleted out of the reviewee's rating.
+
+    Runs in the caller's transaction; the caller commits.
+
+    Args:
+        review (Review): The review being deleted
+
+    Returns:
+        User: The reviewee with the updated rating, or None if they don't exist
+    """
+    return _apply(review.reviewee_id, review.rating, -1)
+
+def rating_distribution(user_id):
+    """
+    Average, count and star histogram of a user's ratings (one primary key read).
+
+    Returns:
+        dict: 'average', 'count' and 'distribution' ({'1': n, ..., '5': n})
+    """
+    stats = db.session.get(SellerStats, user_id)
+    if stats is None or stats.rating_count <= 0:
+        return {'average': 0.0, 'count': 0, 'distribution': {str(stars): 0 for stars in STAR_VALUES}}
+    return {
+        'average': stats.rating_sum / stats.rating_count,
+        'count': stats.rating_count,
+        'distribution': {str(stars): getattr(stats, f'stars_{stars}') for stars in STAR_VALUES}
+    }
+
+def rebuild_seller_stats():
+    """
+    Create the stats rows from existing reviews in one INSERT ... SELECT.
+
+    Run at startup; does nothing once stats exist.
+    """
+    if db.session.query(SellerStats.user_id).first() is not None or db.session.query(Review.id).first() is None:
+        db.session.commit()
+        return
+
+    star_count = lambda stars: func.sum(case((Review.rating == stars, 1), else_=0))
+    reviewees = select(
+        Review.reviewee_id, func.sum(Review.rating), func.count(Review.id),
+        *[star_count(stars) for stars in STAR_VALUES]
+    ).group_by(Review.reviewee_id)
+
+    db.session.execute(insert(SellerStats).from_select(
+        ['user_id', 'rating_sum', 'rating_count'] + [f'stars_{stars}' for stars in STAR_VALUES],
+        reviewees
+    ))
+    db.session.commit()
@@ -0,0 +1,245 @@
+"""
+Pre-aggregated metrics for the admin dashboard.
+
+The admin pages used to count whole tables on every load. Instead, site-wide
+totals are kept in ``metric_counter`` and per-day event counts in
+``daily_metric``, both adjusted by a flush listener in the same transaction as
+the write that changes them: inserts add to the totals and to the day's bucket,
+and changes to a user's ``active`` flag, a product's ``is_active``/``is_sold`` or
+a dispute's ``status`` move the object between counters. Reading the dashboard
+is then a handful of primary key lookups, and a trend chart is one range read.
+
+Bulk UPDATE statements bypass the listener, so a nightly job recomputes the
+totals and the most recent days from the source tables.
+
+Counters:
+    'users.total', 'users.active'
+    'products.total', 'products.active'   (active and not sold)
+    'disputes.total', 'disputes.<status>'
+    'sales.total'
+
+Daily metrics: 'signups', 'listings', 'sales', 'disputes'
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import event, func, case
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from backend.models import db, MetricCounter, DailyMetric, User, UserDetail, Product, Purchase, Dispute
+from backend.utils.db import upsert_add
+
+DISPUTE_STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+DAILY_METRICS = ('signups', 'listings', 'sales', 'disputes')
+
+# Longest trend that can be requested, in days
+MAX_TREND_DAYS = 365
+
+# Source column of each daily metric
+_DAILY_SOURCES = {
+    'signups': UserDetail.created_at,
+    'listings': Product.created_at,
+    'sales': Purchase.purchase_date,
+    'disputes': Dispute.created_at
+}
+
+def _counters(obj, value):
+    """
+    Counters an object contributes to.
+
+    Args:
+        obj: A model instance
+        value (callable): Reads an attribute of obj, so old and new states can be compared
+    """
+    if isinstance(obj, User):
+        return ['users.total'] + (['users.active'] if value('active') else [])
+    if isinstance(obj, Product):
+        active = value('is_active') and not value('is_sold')
+        return ['products.total'] + (['products.active'] if active else [])
+    if isinstance(obj, Dispute):
+        return ['disputes.total', f'disputes.{value("status")}']
+    if isinstance(obj, Purchase):
+        return ['sales.total']
+    return []
+
+def _daily_event(obj):
+    """The (metric, datetime) an inserted object is counted under, or None."""
+    if isinstance(obj, UserDetail):
+        return 'signups', obj.created_at
+    if isinstance(obj, Product):
+        return 'listings', obj.created_at
+    if isinstance(obj, Purchase):
+        return 'sales', obj.purchase_date
+    if isinstance(obj, Dispute):
+        return 'disputes', obj.created_at
+    return None
+
+def _previous(obj):
+    """Attribute reader returning values as they were before the flush."""
+    def value(attribute):
+        history = get_history(obj, attribute)
+        return history.deleted[0] if history.deleted else getattr(obj, attribute)
+    return value
+
+def _current(obj):
+    return lambda attribute: getattr(obj, attribute)
+
+def add_metrics(counters, daily, connection=None):
+    """
+    Apply counter and daily bucket changes in one upsert each.
+
+    Args:
+        counters (dict): {name: amount}
+        daily (dict): {(day, metric): amount}
+        connection (optional): Connection to use instead of the session
+    """
+    upsert_add(MetricCounter, [
+        {'name': name, 'value': amount} for name, amount in counters.items() if amount
+    ], ['name'], 'value', connection=connection)
+    upsert_add(DailyMetric, [
+        {'day': day, 'metric': metric, 'value': amount} for (day, metric), amount in daily.items() if amount
+    ], ['day', 'metric'], 'value', connection=connection)
+
+@event.listens_for(Session, 'after_flush')
+def _track_metrics(session, flush_context):
+    counters = Counter()
+    daily = Counter()
+
+    for obj in session.new:
+        for name in _counters(obj, _current(obj)):
+            counters[name] += 1
+        found = _daily_event(obj)
+        if found:
+            metric, when = found
+            daily[((when or datetime.utcnow()).date(), metric)] += 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, (User, Product, Dispute)) or not session.is_modified(obj):
+            continue
+        for name in _counters(obj, _previous(obj)):
+            counters[name] -= 1
+        for name in _counters(obj, _current(obj)):
+            counters[name] += 1
+
+    for obj in session.deleted:
+        for name in _counters(obj, _previous(obj)):
+            counters[name] -= 1
+
+    if any(counters.values()) or daily:
+        add_metrics(counters, daily, connection=session.connection())
+
+def _as_date(value):
+    # SQLite returns DATE() as a string
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def reconcile_metrics(days=2):
+    """
+    Recompute the counters, and the daily buckets of the last `days` days, from the source tables.
+
+    Runs nightly to repair drift from bulk updates; with days=None every bucket
+    is rebuilt. This function is called periodically by the background scheduler.
+
+    The stored values are read before the source tables and only the difference
+    is added, with the same upsert the flush listener uses. A write that commits
+    while the job runs either shows up in both reads or adds its own increment on
+    top of the correction, so it is never lost.
+
+    Args:
+        days (int, optional): Number of recent days to rebuild; None for all
+
+    Raises:
+        Exception: Any database error, after rolling back, so the job counts as failed
+    """
+    since = datetime.combine(datetime.utcnow().date() - timedelta(days=days), datetime.min.time()) if days else None
+
+    try:
+        # Step 1: Current values, read before the sources they are compared with
+        stored_counters = dict(db.session.query(MetricCounter.name, MetricCounter.value))
+        buckets = db.session.query(DailyMetric.day, DailyMetric.metric, DailyMetric.value)
+        if since:
+            buckets = buckets.filter(DailyMetric.day >= since.date())
+        stored_daily = {(day, metric): value for day, metric, value in buckets}
+
+        # Step 2: Totals, one grouped query per table
+        counters = {}
+        counters['users.total'], counters['users.active'] = db.session.query(
+            func.count(User.id), func.coalesce(func.sum(case((User.active == True, 1), else_=0)), 0)
+        ).one()
+        counters['products.total'], counters['products.active'] = db.session.query(
+            func.count(Product.id),
+            func.coalesce(func.sum(case(((Product.is_active == True) & (Product.is_sold == False), 1), else_=0)), 0)
+        ).one()
+        counters['sales.total'] = db.session.query(func.count(Purchase.id)).scalar()
+        counters.update({f'disputes.{status}': 0 for status in DISPUTE_STATUSES})
+        for status, count in db.session.query(Dispute.status, func.count(Dispute.id)).group_by(Dispute.status):
+            counters[f'disputes.{status}'] = count
+        counters['disputes.total'] = sum(
+            count for name, count in counters.items() if name.startswith('disputes.')
+        )
+
+        # Step 3: Daily buckets of the recent days (or all of them)
+        daily = {}
+        for metric, column in _DAILY_SOURCES.items():
+            day = func.date(column)
+            rows = db.session.query(day, func.count()).filter(column.isnot(None))
+            if since:
+                rows = rows.filter(column >= since)
+            for bucket, count in rows.group_by(day):
+                daily[(_as_date(bucket), metric)] = count
+
+        # Step 4: Add the differences; counters nothing counts any more drop to zero
+        add_metrics(
+            {name: counters.get(name, 0) - stored_counters.get(name, 0) for name in counters.keys() | stored_counters.keys()},
+            {key: daily.get(key, 0) - stored_daily.get(key, 0) for key in daily.keys() | stored_daily.keys()}
+        )
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error reconciling metrics: {e}")
+        raise
+
+def rebuild_metrics():
+    """
+    Build the counters and every daily bucket when the counter table is empty.
+
+    Run at startup, e.g. after upgrading an existing database.
+    """
+    if db.session.query(MetricCounter.name).first() is not None:
+        db.session.commit()
+        return
+    reconcile_metrics(days=None)
+
+def metric_counters():
+    """
+    Read every counter (one small table read).
+
+    Returns:
+        dict: {name: value}
+    """
+    return {name: value for name, value in db.session.query(MetricCounter.name, MetricCounter.value)}
+
+def daily_trends(metrics=DAILY_METRICS, days=30):
+    """
+    Per-day counts of the last `days` days, including today, with empty days as 0.
+
+    Args:
+        metrics (iterable): Daily metric names
+        days (int): Length of the trend, capped at MAX_TREND_DAYS
+
+    Returns:
+        dict: 'days' (ISO dates, oldest first) and 'series' ({metric: [count per day]})
+    """
+    days = min(max(days, 1), MAX_TREND_DAYS)
+    first_day = datetime.utcnow().date() - timedelta(days=days - 1)
+    dates = [first_day + timedelta(days=offset) for offset in range(days)]
+
+    counts = {
+        (day, metric): value for day, metric, value in db.session.query(
+            DailyMetric.day, DailyMetric.metric, DailyMetric.value
+        ).filter(DailyMetric.day >= first_day, DailyMetric.metric.in_(list(metrics)))
+    }
+    return {
+        'days': [day.isoformat() for day in dates],
+        'series': {metric: [counts.get((day, metric), 0) for day in dates] for metric in metrics}
+    }
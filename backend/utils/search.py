@@ -0,0 +1,142 @@
+"""
+Full-text search helpers for product listings.
+
+On SQLite the listings are indexed in an FTS5 virtual table (``product_fts``)
+that is kept in sync with the ``product`` table by triggers, so every code path
+that creates, edits or soft-deletes a product updates the index in the same
+transaction. On PostgreSQL a GIN index over a ``tsvector`` expression is used
+instead, which PostgreSQL maintains by itself. Any other database falls back to
+the original ``LIKE`` filters.
+"""
+
+import re
+from sqlalchemy import text, func, or_, false, literal_column, table, column
+from backend.models import db, Product
+
+# Which full-text engine is active: 'fts5', 'postgres' or None (LIKE fallback)
+search_backend = None
+
+# Lightweight handle on the FTS5 table for joins (not a mapped model)
+product_fts = table('product_fts', column('rowid'))
+
+# Column weights for BM25 ranking (title, description, brand, model)
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+# Text expression indexed on PostgreSQL; queries must use the exact same expression
+PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(product.title, '') || ' ' || coalesce(product.description, '') "
+    "|| ' ' || coalesce(product.brand, '') || ' ' || coalesce(product.model, ''))"
+)
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5(title, description, brand, model)",
+    # Index new listings
+    """CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product WHEN new.is_active
+    BEGIN
+        INSERT INTO product_fts(rowid, title, description, brand, model)
+        VALUES (new.id, new.title, new.description, new.brand, new.model);
+    END""",
+    # Re-index edits and drop soft-deleted listings; view count updates don't fire this
+    """CREATE TRIGGER IF NOT EXISTS product_fts_update AFTER UPDATE OF title, description, brand, model, is_active ON product
+    BEGIN
+        DELETE FROM product_fts WHERE rowid = old.id;
+        INSERT INTO product_fts(rowid, title, description, brand, model)
+        SELECT new.id, new.title, new.description, new.brand, new.model WHERE new.is_active;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product
+    BEGIN
+        DELETE FROM product_fts WHERE rowid = old.id;
+    END""",
+]
+
+def init_search_index():
+    """
+    Create the full-text index for the current database if it doesn't exist yet.
+
+    Must be called inside an application context after the tables have been created.
+
+    Returns:
+        str: The active search backend ('fts5', 'postgres') or None for the LIKE fallback
+    """
+    global search_backend
+    dialect = db.engine.dialect.name
+
+    try:
+        if dialect == 'sqlite':
+            exists = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_fts'")
+            ).first()
+            if not exists:
+                for statement in SQLITE_DDL:
+                    db.session.execute(text(statement))
+                # Backfill listings created before the index existed
+                db.session.execute(text(
+                    "INSERT INTO product_fts(rowid, title, description, brand, model) "
+                    "SELECT id, title, description, brand, model FROM product WHERE is_active"
+                ))
+            db.session.commit()
+            search_backend = 'fts5'
+        elif dialect == 'postgresql':
+            db.session.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_product_fulltext ON product USING GIN ({PG_DOCUMENT})"
+            ))
+            db.session.commit()
+            search_backend = 'postgres'
+    except Exception as e:
+        # e.g. SQLite compiled without FTS5 - keep serving search through LIKE
+        db.session.rollback()
+        print(f"Full-text search unavailable, falling back to LIKE: {e}")
+        search_backend = None
+
+    return search_backend
+
+def build_match_query(term):
+    """
+    Turn free text typed by a user into a safe FTS5 query.
+
+    Every word becomes a quoted prefix term, so "sony cam" matches "Sony camera"
+    and FTS5 operators typed by the user are treated as plain text.
+    """
+    words = re.findall(r'\w+', term.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+def apply_search(query, term, rank=False):
+    """
+    Restrict a Product query to listings matching a search term.
+
+    Args:
+        query (Query): Product query to filter
+        term (str): Search text entered by the user
+        rank (bool): Order the results by relevance (BM25 on SQLite, ts_rank_cd on PostgreSQL)
+
+    Returns:
+        Query: The filtered (and optionally ordered) query
+    """
+    if search_backend == 'fts5':
+        match = build_match_query(term)
+        if not match:
+            # Nothing searchable in the term (e.g. only punctuation): no listing matches
+            return query.filter(false())
+        query = query.join(product_fts, product_fts.c.rowid == Product.id)\
+            .filter(literal_column('product_fts').match(match))
+        if rank:
+            # bm25() is lower for better matches, so ascending order is most relevant first
+            query = query.order_by(func.bm25(literal_column('product_fts'), *FTS_WEIGHTS))
+        return query
+
+    if search_backend == 'postgres':
+        document = literal_column(PG_DOCUMENT)
+        ts_query = func.plainto_tsquery('english', term)
+        query = query.filter(document.op('@@')(ts_query))
+        if rank:
+            query = query.order_by(func.ts_rank_cd(document, ts_query).desc())
+        return query
+
+    return query.filter(
+        or_(
+            Product.title.contains(term),
+            Product.description.contains(term),
+            Product.brand.contains(term),
+            Product.model.contains(term)
+        )
+    )
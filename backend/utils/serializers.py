@@ -0,0 +1,106 @@
+"""
+Serializers for paginated list endpoints (reviews, purchases, sales).
+
+Serializing rows one by one and following their product / user references
+costs a query per reference per row. These serializers collect the referenced
+IDs of the whole page first and load each related table with a single
+``IN (...)`` query, so a page costs the same number of queries whatever its size.
+"""
+
+import json
+from backend.models import db, Product, User
+
+def load_by_id(*columns, ids):
+    """
+    Load rows of one table by primary key in a single IN query.
+
+    Args:
+        *columns: Columns to load; the first must be the primary key
+        ids (iterable): Primary keys to load (None and duplicates are ignored)
+
+    Returns:
+        dict: {id: row} for the rows found
+    """
+    ids = {id for id in ids if id is not None}
+    if not ids:
+        return {}
+    return {row[0]: row for row in db.session.query(*columns).filter(columns[0].in_(ids))}
+
+def _images(images):
+    return json.loads(images) if images else []
+
+def serialize_purchases(purchases):
+    """Serialize a page of the buyer's purchases with their products and sellers."""
+    products = load_by_id(Product.id, Product.title, Product.images, ids=[p.product_id for p in purchases])
+    sellers = load_by_id(User.id, User.username, ids=[p.seller_id for p in purchases])
+
+    return [{
+        'id': purchase.id,
+        'product': {
+            'id': purchase.product_id,
+            'title': products[purchase.product_id].title if purchase.product_id in products else None,
+            'images': _images(products[purchase.product_id].images) if purchase.product_id in products else []
+        },
+        'seller': sellers[purchase.seller_id].username if purchase.seller_id in sellers else None,
+        'amount': purchase.amount,
+        'status': purchase.status,
+        'delivery_address': purchase.delivery_address,
+        'purchase_date': purchase.purchase_date.isoformat()
+    } for purchase in purchases]
+
+def serialize_sales(sales):
+    """Serialize a page of the seller's sales with their products and buyers."""
+    products = load_by_id(Product.id, Product.title, ids=[s.product_id for s in sales])
+    buyers = load_by_id(User.id, User.username, ids=[s.buyer_id for s in sales])
+
+    return [{
+        'id': sale.id,
+        'product': {
+            'id': sale.product_id,
+            'title': products[sale.product_id].title if sale.product_id in products else None
+        },
+        'buyer': buyers[sale.buyer_id].username if sale.buyer_id in buyers else None,
+        'amount': sale.amount,
+        'status': sale.status,
+        'delivery_address': sale.delivery_address,
+        'purchase_date': sale.purchase_date.isoformat()
+    } for sale in sales]
+
+def serialize_received_reviews(reviews):
+    """Serialize a page of reviews a user received, with reviewers and product titles."""
+    reviewers = load_by_id(User.id, User.username, User.rating, ids=[r.reviewer_id for r in reviews])
+    products = load_by_id(Product.id, Product.title, ids=[r.product_id for r in reviews])
+
+    return [{
+        'id': review.id,
+        'reviewer': {
+            'id': review.reviewer_id,
+            'username': reviewers[review.reviewer_id].username if review.reviewer_id in reviewers else None,
+            'rating': reviewers[review.reviewer_id].rating if review.reviewer_id in reviewers else None
+        },
+        'rating': review.rating,
+        'comment': review.comment,
+        'product_title': products[review.product_id].title if review.product_id in products else None,
+        'created_at': review.created_at.isoformat()
+    } for review in reviews]
+
+def serialize_given_reviews(reviews):
+    """Serialize a page of reviews a user wrote, with reviewees and products."""
+    reviewees = load_by_id(User.id, User.username, User.rating, ids=[r.reviewee_id for r in reviews])
+    products = load_by_id(Product.id, Product.title, ids=[r.product_id for r in reviews])
+
+    return [{
+        'id': review.id,
+        'reviewee': {
+            'id': review.reviewee_id,
+            'username': reviewees[review.reviewee_id].username if review.reviewee_id in reviewees else None,
+            'rating': reviewees[review.reviewee_id].rating if review.reviewee_id in reviewees else None
+        },
+        'product': {
+            'id': review.product_id,
+            'title': products[review.product_id].title
+        } if review.product_id in products else None,
+        'rating': review.rating,
+        'comment': review.comment,
+        'created_at': review.created_at.isoformat()
+    } for review in reviews]
@@ -0,0 +1,237 @@
+"""
+Server-Sent Events helpers.
+
+Streams are plain generators wrapped in a ``text/event-stream`` response. While
+no events arrive, a comment line is sent periodically so proxies don't close the
+idle connection and dead clients are noticed when the write fails.
+
+An open stream occupies a worker thread for as long as the client stays
+connected. Serve the app with a worker class that handles many concurrent
+requests, e.g. ``gunicorn --worker-class gevent`` or ``--worker-class gthread``
+with enough threads; a sync worker can only serve one stream and nothing else.
+``open_stream`` caps the streams each process holds open, in total and per
+client, so a burst of connections can't take every thread:
+
+    SSE_MAX_STREAMS              open streams per process
+    SSE_MAX_STREAMS_PER_CLIENT   open streams per user (or address) per process
+
+Clients over a limit, or connecting while the pub/sub broker is unreachable,
+get a 503 with a Retry-After header instead of a stream.
+
+EventSource can't send headers, so private streams authenticate with a stream
+token in the query string rather than the long-lived auth token. A stream
+token is signed for one stream (e.g. 'notifications') and only opens that
+stream for STREAM_TOKEN_SECONDS after it was issued; a stream already open
+stays open. Clients fetch a new token when the browser gives up reconnecting.
+"""
+
+import threading
+from flask import Response, jsonify, current_app
+from itsdangerous import URLSafeTimedSerializer as Serializer
+from backend.models import User
+from backend.utils.pubsub import subscribe
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Milliseconds the browser waits before reconnecting a dropped stream
+RETRY_MILLISECONDS = 3000
+
+# Streams opened with a stream token
+STREAM_NAMES = ('notifications', 'chats')
+
+# Seconds a client should wait before retrying a rejected stream
+FULL_RETRY_SECONDS = 30
+BROKER_RETRY_SECONDS = 5
+
+class StreamRejected(Exception):
+    """The stream can't be opened right now; the client should retry after ``retry_after`` seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Stream:
+    """A pub/sub subscription holding one of the process's stream slots until closed."""
+
+    def __init__(self, subscription, client):
+        self.subscription = subscription
+        self.client = client
+        self.closed = False
+
+    def get(self, timeout=None):
+        return self.subscription.get(timeout=timeout)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.subscription.close()
+        _release(self.client)
+
+_lock = threading.Lock()
+_open_streams = {}
+
+def _acquire(client):
+    config = current_app.config
+    with _lock:
+        if sum(_open_streams.values()) >= config.get('SSE_MAX_STREAMS', 200):
+            raise StreamRejected('Too many live connections, please try again later', FULL_RETRY_SECONDS)
+        if _open_streams.get(client, 0) >= config.get('SSE_MAX_STREAMS_PER_CLIENT', 5):
+            raise StreamRejected('Too many live connections for this client', FULL_RETRY_SECONDS)
+        _open_streams[client] = _open_streams.get(client, 0) + 1
+
+def _release(client):
+    with _lock:
+        remaining = _open_streams.get(client, 0) - 1
+        if remaining > 0:
+            _open_streams[client] = remaining
+        else:
+            _open_streams.pop(client, None)
+
+def open_stream(channel, client):
+    """
+    Take a stream slot for a client and subscribe to a channel.
+
+    Args:
+        channel (str): Pub/sub channel the stream relays
+        client: Key the per-client limit counts by, e.g. the user ID or remote address
+
+    Returns:
+        Stream: The subscription; closing it frees the slot
+
+    Raises:
+        StreamRejected: If a limit is reached or the broker can't be reached
+    """
+    _acquire(client)
+    try:
+        subscription = subscribe(channel)
+    except Exception as e:
+        _release(client)
+        print(f"Error subscribing to {channel}: {e}")
+        raise StreamRejected('Live updates are temporarily unavailable', BROKER_RETRY_SECONDS)
+    return Stream(subscription, client)
+
+def _token_serializer():
+    return Serializer(current_app.config['SECRET_KEY'])
+
+def issue_stream_token(user, stream):
+    """
+    Sign a short-lived token that opens one stream for a user.
+
+    Args:
+        user (User): The authenticated user
+        stream (str): One of STREAM_NAMES
+
+    Returns:
+        str: The token
+    """
+    return _token_serializer().dumps(user.fs_uniquifier, salt=f'stream:{stream}')
+
+def stream_token_user(token, stream):
+    """
+    Resolve a stream token to its user.
+
+    Args:
+        token (str): Token from issue_stream_token
+        stream (str): The stream being opened
+
+    Returns:
+        User: The active user the token was issued to, or None if it is invalid,
+        expired, issued for another stream or the user logged out everywhere since
+    """
+    if not token:
+        return None
+    try:
+        uniquifier = _token_serializer().loads(
+            token, salt=f'stream:{stream}', max_age=current_app.config.get('STREAM_TOKEN_SECONDS', 60)
+        )
+    except Exception:
+        return None
+    return User.query.filter_by(fs_uniquifier=uniquifier, active=True).first()
+
+def rejected_response(error):
+    """
+    Build the response for a stream that couldn't be opened.
+
+    Args:
+        error (StreamRejected): Why the stream was rejected
+
+    Returns:
+        tuple: JSON error response and status 503, with a Retry-After header
+    """
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def format_event(data, event=None, event_id=None, retry=None):
+    """
+    Encode one SSE message.
+
+    Args:
+        data (str): Event payload (already serialized)
+        event (str, optional): Event type for addEventListener
+        event_id: Value the browser sends back as Last-Event-ID on reconnect
+        retry (int, optional): Reconnect delay in milliseconds
+
+    Returns:
+        str: The encoded message
+    """
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    for line in str(data).splitlines() or ['']:
+        lines.append(f'data: {line}')
+    return '\n'.join(lines) + '\n\n'
+
+def stream_subscription(subscription, initial=(), encode=format_event, heartbeat=HEARTBEAT_SECONDS):
+    """
+    Yield encoded messages for a pub/sub subscription until the client disconnects.
+
+    Args:
+        subscription (Stream): Open subscription; closed when the stream ends
+        initial (iterable): Already encoded messages sent before any published event
+        encode (callable): Turns a published message into encoded SSE messages ('' to send nothing)
+        heartbeat (int): Seconds between keep-alive comments
+
+    Yields:
+        str: Encoded SSE messages
+    """
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        for message in initial:
+            if message:
+                yield message
+        while True:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ': keep-alive\n\n'
+                continue
+            encoded = encode(message)
+            if encoded:
+                yield encoded
+    finally:
+        subscription.close()
+
+def sse_response(messages, stream=None):
+    """
+    Wrap a message generator in a streaming response.
+
+    Args:
+        messages (iterable): Encoded SSE messages
+        stream (Stream, optional): Closed with the response, even if the client left before the first message
+
+    Returns:
+        Response: The event stream response
+    """
+    response = Response(messages, mimetype='text/event-stream')
+    if stream is not None:
+        response.call_on_close(stream.close)
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,108 @@
+"""
+Precompiled UI translation bundles.
+
+Translations live in ``backend/translations/<lang>.json``, grouped by namespace
+(header, common, dashboard, ...). They are loaded once, and every bundle a client
+can ask for is serialized to JSON bytes, gzipped and given a content hash ETag up
+front, so /api/translations only has to pick a prepared response.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+TRANSLATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'translations')
+DEFAULT_LANGUAGE = 'en'
+
+# body: JSON bytes, gzipped: gzip of body, etag: content hash
+Bundle = namedtuple('Bundle', ['body', 'gzipped', 'etag'])
+
+# {lang: {namespace: {key: text}}}
+_catalogs = {}
+# {(lang, namespaces): Bundle}; namespaces is None for the full bundle
+_bundles = {}
+_lock = threading.Lock()
+
+def _build_bundle(messages):
+    body = json.dumps(messages, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return Bundle(body, gzip.compress(body, 9), hashlib.sha256(body).hexdigest()[:32])
+
+def _flatten(catalog, namespaces):
+    messages = {}
+    for namespace in namespaces:
+        messages.update(catalog[namespace])
+    return messages
+
+def load_translations(directory=TRANSLATIONS_DIR):
+    """
+    Load every language file and prebuild its full and per-namespace bundles.
+
+    Args:
+        directory (str): Folder containing one <lang>.json file per language
+    """
+    catalogs, bundles = {}, {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        lang = filename[:-len('.json')]
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            catalog = json.load(f)
+        catalogs[lang] = catalog
+        bundles[(lang, None)] = _build_bundle(_flatten(catalog, catalog))
+        for namespace in catalog:
+            bundles[(lang, (namespace,))] = _build_bundle(catalog[namespace])
+
+    with _lock:
+        _catalogs.clear()
+        _catalogs.update(catalogs)
+        _bundles.clear()
+        _bundles.update(bundles)
+
+def init_translations(app):
+    """Load the translation bundles when the app starts."""
+    load_translations(app.config.get('TRANSLATIONS_DIR', TRANSLATIONS_DIR))
+
+def get_bundle(lang, namespace=None):
+    """
+    Return the prepared bundle for a language.
+
+    Args:
+        lang (str): Language code; unknown languages fall back to English
+        namespace (str, optional): Comma separated namespaces to include (all if omitted)
+
+    Returns:
+        Bundle: Serialized, gzipped bundle with its ETag
+
+    Raises:
+        KeyError: If a requested namespace doesn't exist
+    """
+    if not _catalogs:
+        load_translations()
+
+    if lang not in _catalogs:
+        lang = DEFAULT_LANGUAGE
+
+    namespaces = None
+    if namespace:
+        namespaces = tuple(sorted(set(ns.strip() for ns in namespace.split(',') if ns.strip())))
+        unknown = [ns for ns in namespaces if ns not in _catalogs[lang]]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+
+    key = (lang, namespaces or None)
+    bundle = _bundles.get(key)
+    if bundle is None:
+        # Combinations of several namespaces are built on first use and kept
+        bundle = _build_bundle(_flatten(_catalogs[lang], namespaces))
+        with _lock:
+            _bundles[key] = bundle
+    return bundle
+
+def namespaces(lang=DEFAULT_LANGUAGE):
+    """List the namespaces available for a language."""
+    if not _catalogs:
+        load_translations()
+    return list(_catalogs.get(lang, _catalogs.get(DEFAULT_LANGUAGE, {})))
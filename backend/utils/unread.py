@@ -0,0 +1,122 @@
+"""
+Unread counters for notifications and chats.
+
+Badges only need "how many unread", so instead of counting rows on every page
+load the counts are kept in ``unread_counter`` and adjusted in the same
+transaction as the write that changes them: +1 when a notification or message
+is created, minus the number of rows actually marked read.
+
+Counter kinds:
+    'notifications'  unread notifications of the user (key '')
+    'chats'          unread messages over all conversations (key '')
+
+Unread counts of single conversations are kept on the conversation rows
+(see utils/conversations.py).
+"""
+
+from collections import Counter
+from sqlalchemy import event, func, case, or_, and_
+from sqlalchemy.orm import Session
+from backend.models import db, UnreadCounter, Notification, Chat, Conversation
+from backend.utils.db import upsert_add
+
+def conversation_key(peer_id, product_id=None):
+    """Key of the conversation with a peer about a product (or no product) in unread_counts."""
+    return f'{peer_id}:{product_id or 0}'
+
+def add_unread(changes, connection=None):
+    """
+    Apply counter changes in one upsert.
+
+    Args:
+        changes (dict): {(user_id, kind, key): amount}; amounts may be negative
+        connection (optional): Connection to use instead of the session
+    """
+    rows = [
+        {'user_id': user_id, 'kind': kind, 'key': key, 'count': amount}
+        for (user_id, kind, key), amount in changes.items() if amount
+    ]
+    upsert_add(UnreadCounter, rows, ['user_id', 'kind', 'key'], 'count', connection=connection)
+
+def notifications_created(user_ids, connection=None):
+    """Count newly created notifications (one entry per notification)."""
+    add_unread({(user_id, 'notifications', ''): count for user_id, count in Counter(user_ids).items()}, connection)
+
+def notifications_read(user_id, count):
+    """Subtract notifications that were just marked read."""
+    add_unread({(user_id, 'notifications', ''): -count})
+
+def message_sent(receiver_id):
+    """Count a new message for its receiver."""
+    add_unread({(receiver_id, 'chats', ''): 1})
+
+def messages_read(user_id, count):
+    """Subtract messages that were just marked read."""
+    add_unread({(user_id, 'chats', ''): -count})
+
+def unread_counts(user_id):
+    """
+    Read all unread counts of a user.
+
+    The totals come from one primary key range read of the counters, the per
+    conversation counts from the user's conversations that have unread messages.
+
+    Returns:
+        dict: notifications, chats and per conversation counts
+    """
+    counts = {'notifications': 0, 'chats': 0, 'conversations': {}}
+    for kind, count in db.session.query(UnreadCounter.kind, UnreadCounter.count)\
+            .filter(UnreadCounter.user_id == user_id):
+        counts[kind] = max(count, 0)
+
+    is_a = Conversation.user_a_id == user_id
+    threads = db.session.query(
+        case((is_a, Conversation.user_b_id), else_=Conversation.user_a_id),
+        Conversation.product_id,
+        case((is_a, Conversation.unread_a), else_=Conversation.unread_b)
+    ).filter(or_(
+        and_(Conversation.user_a_id == user_id, Conversation.unread_a > 0),
+        and_(Conversation.user_b_id == user_id, Conversation.unread_b > 0)
+    ))
+    for peer_id, product_id, count in threads:
+        counts['conversations'][conversation_key(peer_id, product_id)] = count
+    return counts
+
+def unread_count(user_id, kind, key=''):
+    """Read a single counter."""
+    count = db.session.query(UnreadCounter.count).filter_by(user_id=user_id, kind=kind, key=key).scalar()
+    return max(count or 0, 0)
+
+@event.listens_for(Session, 'after_flush')
+def _count_new_notifications(session, flush_context):
+    # Notifications added through the ORM; bulk dispatches count their inserted rows themselves
+    user_ids = [obj.user_id for obj in session.new if isinstance(obj, Notification) and not obj.is_read]
+    if user_ids:
+        notifications_created(user_ids, connection=session.connection())
+
+def rebuild_unread_counters():
+    """
+    Recompute every counter from the notification and chat tables.
+
+    Run at startup when the counter table is empty, e.g. after upgrading an
+    existing database.
+    """
+    if db.session.query(UnreadCounter.user_id).first() is not None:
+        db.session.commit()
+        return
+
+    changes = {}
+    notifications = db.session.query(Notification.user_id, func.count(Notification.id))\
+        .filter(Notification.is_read == False)\
+        .group_by(Notification.user_id)
+    for user_id, count in notifications:
+        changes[(user_id, 'notifications', '')] = count
+
+    messages = db.session.query(Chat.receiver_id, func.count(Chat.id))\
+        .filter(Chat.is_read == False)\
+        .group_by(Chat.receiver_id)
+    for receiver_id, count in messages:
+        changes[(receiver_id, 'chats', '')] = count
+
+    add_unread(changes)
+    db.session.commit()
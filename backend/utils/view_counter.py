@@ -0,0 +1,192 @@
+"""
+Buffered product view counter.
+
+Product views are counted in memory (or in Redis when several workers run) and
+written to the database in one bulk UPDATE by a periodic scheduler job, instead
+of a write transaction on every product page view. Repeat views from the same
+user or client within a configurable window can be ignored.
+"""
+
+import hashlib
+import threading
+import time
+from sqlalchemy import bindparam
+from flask import request
+from flask_security import current_user
+from backend.models import db, Product
+
+# Active counter, set by init_view_counter
+view_counter = None
+
+class MemoryViewCounter:
+    """Per-process counter; pending views are lost if the process dies before a flush."""
+
+    def __init__(self, dedupe_seconds=0):
+        self.dedupe_seconds = dedupe_seconds
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._seen = {}
+
+    def record(self, product_id, viewer=None):
+        """Count a view; returns False if it was a repeat view inside the dedupe window."""
+        now = time.time()
+        with self._lock:
+            if viewer and self.dedupe_seconds:
+                key = (viewer, product_id)
+                if self._seen.get(key, 0) > now:
+                    return False
+                self._seen[key] = now + self.dedupe_seconds
+            self._pending[product_id] = self._pending.get(product_id, 0) + 1
+        return True
+
+    def pending(self, product_id):
+        """Views recorded for a product that haven't been flushed yet."""
+        return self._pending.get(product_id, 0)
+
+    def drain(self):
+        """Take all pending counts, leaving the counter empty."""
+        now = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # Forget expired dedupe entries so the map doesn't grow forever
+            self._seen = {key: expiry for key, expiry in self._seen.items() if expiry > now}
+        return pending
+
+    def restore(self, counts):
+        """Put counts back after a failed flush."""
+        with self._lock:
+            for product_id, count in counts.items():
+                self._pending[product_id] = self._pending.get(product_id, 0) + count
+
+class RedisViewCounter:
+    """Counter shared by all workers through a Redis hash."""
+
+    PENDING_KEY = 'views:pending'
+
+    def __init__(self, redis_url, dedupe_seconds=0):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.dedupe_seconds = dedupe_seconds
+
+    def record(self, product_id, viewer=None):
+        """Count a view; returns False if it was a repeat view inside the dedupe window."""
+        if viewer and self.dedupe_seconds:
+            # SET NX only succeeds for the first view in the window
+            if not self.redis.set(f'views:seen:{product_id}:{viewer}', 1, nx=True, ex=self.dedupe_seconds):
+                return False
+        self.redis.hincrby(self.PENDING_KEY, product_id, 1)
+        return True
+
+    def pending(self, product_id):
+        """Views recorded for a product that haven't been flushed yet."""
+        return int(self.redis.hget(self.PENDING_KEY, product_id) or 0)
+
+    def drain(self):
+        """Atomically take all pending counts, leaving the hash empty."""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hgetall(self.PENDING_KEY)
+        pipe.delete(self.PENDING_KEY)
+        pending, _ = pipe.execute()
+        return {int(product_id): int(count) for product_id, count in pending.items()}
+
+    def restore(self, counts):
+        """Put counts back after a failed flush."""
+        pipe = self.redis.pipeline()
+        for product_id, count in counts.items():
+            pipe.hincrby(self.PENDING_KEY, product_id, count)
+        pipe.execute()
+
+def init_view_counter(app):
+    """
+    Create the view counter configured for the app.
+
+    Uses VIEW_COUNTER_BACKEND ('memory' or 'redis') and VIEW_DEDUPE_SECONDS.
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        The counter instance
+    """
+    global view_counter
+    dedupe_seconds = app.config.get('VIEW_DEDUPE_SECONDS', 0)
+
+    if app.config.get('VIEW_COUNTER_BACKEND') == 'redis':
+        try:
+            view_counter = RedisViewCounter(app.config.get('REDIS_URL'), dedupe_seconds)
+        except ImportError:
+            # Fallback to in-process counting if redis is not available
+            view_counter = MemoryViewCounter(dedupe_seconds)
+    else:
+        view_counter = MemoryViewCounter(dedupe_seconds)
+
+    return view_counter
+
+def viewer_key():
+    """Identify the viewer of the current request for de-duplication."""
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    agent = hashlib.md5(request.headers.get('User-Agent', '').encode()).hexdigest()[:12]
+    return f'anon:{request.remote_addr}:{agent}'
+
+def record_view(product_id):
+    """Count a view of a product by the current request's viewer."""
+    if view_counter is None:
+        return False
+    try:
+        return view_counter.record(product_id, viewer_key())
+    except Exception as e:
+        # A counter outage must never break the product page
+        print(f"Error recording product view: {e}")
+        return False
+
+def pending_views(product_id):
+    """Views of a product not yet written to the database (0 if unavailable)."""
+    if view_counter is None:
+        return 0
+    try:
+        return view_counter.pending(product_id)
+    except Exception:
+        return 0
+
+def flush_views():
+    """
+    Write all pending view counts to the database in one bulk UPDATE.
+
+    Must run inside an application context. This function is called periodically
+    by the background scheduler.
+
+    Returns:
+        list: IDs of the products whose view count changed
+
+    Raises:
+        Exception: Any database error, after putting the counts back for the next flush
+    """
+    if view_counter is None:
+        return []
+
+    pending = view_counter.drain()
+    if not pending:
+        return []
+
+    table = Product.__table__
+    statement = table.update()\
+        .where(table.c.id == bindparam('product_id'))\
+        .values(
+            views=table.c.views + bindparam('increment'),
+            # Views aren't an edit of the listing, so leave updated_at alone
+            updated_at=table.c.updated_at
+        )
+
+    try:
+        db.session.execute(statement, [
+            {'product_id': product_id, 'increment': count} for product_id, count in pending.items()
+        ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        view_counter.restore(pending)
+        print(f"Error flushing product views: {e}")
+        raise
+
+    return list(pending)
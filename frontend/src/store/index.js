@@ -68,6 +68,22 @@ export default createStore({
         console.error("Error fetching user data:", error);
       }
     },
+    // Short-lived token for opening one event stream; EventSource can't send the auth header
+    async fetchStreamToken({ state }, stream) {
+      const res = await fetch(`${state.backendUrl}/api/stream-token`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: state.authData?.token,
+        },
+        body: JSON.stringify({ stream }),
+      });
+
+      if (!res.ok) throw new Error("Failed to get stream token");
+
+      const data = await res.json();
+      return data.stream_token;
+    },
   },
 
   getters: {
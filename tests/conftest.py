@@ -0,0 +1,33 @@
+"""
+Shared fixtures: the application on a throwaway SQLite database, with the
+background scheduler turned off.
+"""
+
+import os
+import pytest
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # app.py builds the application when imported, reading its settings from the environment
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.sqlite3'}"
+    os.environ['SCHEDULER_ENABLED'] = 'False'
+    from app import app
+    return app
+
+@pytest.fixture(scope='session')
+def create_user(app):
+    """Create a user and return (id, auth headers)."""
+    from flask_security import hash_password
+    from backend.models import db
+
+    def create(username):
+        with app.app_context():
+            user = app.security.datastore.create_user(
+                email=f'{username}@example.com',
+                password=hash_password('secret'),
+                username=username,
+                roles=['User']
+            )
+            db.session.commit()
+            return user.id, {'Authorization': user.get_auth_token()}
+    return create
@@ -0,0 +1,34 @@
+import json
+from types import SimpleNamespace
+
+from backend.utils.percolator import PercolatorIndex, compile_search, percolate
+from backend.utils import percolator
+
+
+def listing(**kwargs):
+    fields = dict(
+        seller_id=99, is_active=True, is_sold=False, category_id=1, condition='good',
+        price=50.0, is_auction=False, location='Berlin Mitte',
+        title='Oak desk', description='Solid wood', brand=None, model=None
+    )
+    fields.update(kwargs)
+    return SimpleNamespace(**fields)
+
+
+def index_of(*filters):
+    return PercolatorIndex([
+        compile_search(i, i, f'search {i}', '', json.dumps(f)) for i, f in enumerate(filters, 1)
+    ])
+
+
+def test_location_filter(monkeypatch):
+    monkeypatch.setattr(percolator, 'get_index', lambda: index_of({'location': 'Berlin'}, {'location': 'Munich'}))
+
+    assert [search.id for search in percolate(listing())] == [1]
+    assert percolate(listing(location=None)) == []
+
+
+def test_string_price(monkeypatch):
+    monkeypatch.setattr(percolator, 'get_index', lambda: index_of({'min_price': '40'}, {'max_price': '45'}))
+
+    assert [search.id for search in percolate(listing(price='50'))] == [1]
@@ -0,0 +1,67 @@
+"""
+The list endpoints serialize a page with a fixed number of queries, however
+many rows the page holds (see backend/utils/serializers.py).
+"""
+
+import pytest
+from sqlalchemy import event
+
+PAGE_SIZES = (1, 20)
+
+@pytest.fixture(scope='module')
+def accounts(app, create_user):
+    """A seller and a buyer with 25 completed, reviewed purchases between them."""
+    from backend.models import db, Category, Product, Purchase, Review
+
+    seller_id, seller = create_user('serializer_seller')
+    buyer_id, buyer = create_user('serializer_buyer')
+    with app.app_context():
+        category = Category(name='Serializer cameras')
+        db.session.add(category)
+        db.session.flush()
+        for i in range(25):
+            product = Product(title=f'Camera {i}', description='camera', price=100, condition='Good',
+                              category_id=category.id, seller_id=seller_id, is_sold=True)
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(Purchase(buyer_id=buyer_id, seller_id=seller_id, product_id=product.id,
+                                    amount=100, status='completed'))
+            db.session.add(Review(reviewer_id=buyer_id, reviewee_id=seller_id, product_id=product.id,
+                                  rating=5, comment='Great'))
+        db.session.commit()
+    return {'seller_id': seller_id, 'seller': seller, 'buyer': buyer}
+
+def count_queries(app, url, headers):
+    """Run a GET request in a fresh application context and return (statements executed, body)."""
+    from backend.models import db
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = app.test_client().get(url, headers=headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200, response.get_json()
+    return len(statements), response.get_json()
+
+@pytest.mark.parametrize('path, user, key', [
+    ('/api/users/{seller_id}/reviews', None, 'reviews'),
+    ('/api/my-reviews', 'buyer', 'reviews'),
+    ('/api/purchases', 'buyer', 'purchases'),
+    ('/api/sales', 'seller', 'sales'),
+])
+def test_query_count_does_not_grow_with_page_size(app, accounts, path, user, key):
+    url = path.format(seller_id=accounts['seller_id'])
+    headers = accounts[user] if user else {}
+
+    counts = []
+    for per_page in PAGE_SIZES:
+        queries, body = count_queries(app, f'{url}?per_page={per_page}', headers)
+        assert len(body[key]) == per_page
+        counts.append(queries)
+
+    assert counts[0] == counts[1]